@@ -3,6 +3,7 @@ import Header from '../components/Header';
 import Sidebar from '../components/Sidebar';
 import './Profile.css';
 import authAxios from '../authAxios';
+import fetchAllPages from '../fetchAllPages';
 
 function FriendsListPage() {
   const [student, setStudent] = useState(null);
@@ -20,8 +21,8 @@ function FriendsListPage() {
         const profileRes = await authAxios.get('get_user_and_student_details/');
         setStudent(profileRes.data.student);
 
-        const allStudents = await authAxios.get('get_all_students/');
-        setStudents(allStudents.data.data);
+        const allStudents = await fetchAllPages('get_all_students/', authAxios);
+        setStudents(allStudents);
 
         const friendshipRes = await authAxios.get('friendship/');
         const incoming = [], sent = [], accepted = [];
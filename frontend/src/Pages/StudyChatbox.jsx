@@ -13,6 +13,8 @@ const StudyChatbox = () => {
   const [lastSavedPlan, setLastSavedPlan] = useState(null);
   const [selectedModule, setSelectedModule] = useState("");
   const [modules, setModules] = useState([]);
+  // Later messages in this session are follow-ups and are answered with the chat history.
+  const [askedThisSession, setAskedThisSession] = useState(false);
   const inputRef = useRef(null);
 
   useEffect(() => {
@@ -76,7 +78,8 @@ const StudyChatbox = () => {
     setMessages(prev => [...prev, { sender: "User", message: userMsg }]);
 
     try {
-      const planRes = await authAxios.post('study_plan/', { prompt: userMsg });
+      const planRes = await authAxios.post('study_plan/', { prompt: userMsg, follow_up: askedThisSession });
+      setAskedThisSession(true);
       const botMsg = planRes.data.data;
 
       setMessages(prev => [...prev, { sender: "Bot", message: botMsg }]);
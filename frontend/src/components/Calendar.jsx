@@ -3,6 +3,7 @@ import Calendar from "react-calendar";
 import "react-calendar/dist/Calendar.css";
 import axios from "axios";
 import api from "../api";
+import fetchAllPages from "../fetchAllPages";
 
 
 // Use the correct API URL based on environment
@@ -35,15 +36,15 @@ const MyCalendar = ({ selectedDate, setSelectedDate }) => {
     try {
       setLoading(true);
       console.log("Fetching events from:", `${API_URL}events/`);
-      const response = await axios.get(`${API_URL}events/`);
-      console.log("API Response:", response.data);
+      const allEvents = await fetchAllPages(`${API_URL}events/`);
+      console.log("API Response:", allEvents);
       
       // Save the raw response for debugging
-      setRawApiResponse(response.data);
+      setRawApiResponse(allEvents);
       
       // Convert the array of events to the format needed by the calendar
       const eventsByDate = {};
-      response.data.forEach(event => {
+      allEvents.forEach(event => {
         // Extract date part from start_datetime
         const dateKey = event.start_datetime.split('T')[0];
         if (!eventsByDate[dateKey]) {
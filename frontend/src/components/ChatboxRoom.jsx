@@ -2,6 +2,7 @@ import React, { useState, useEffect, useRef } from 'react';
 import { Send, Plus, Search, Trash2, X, MoreVertical } from 'lucide-react';
 import { useTheme } from './ThemeProvider';
 import api from "../api";
+import fetchAllPages from "../fetchAllPages";
 
 const ChatBoxRoom = () => {
   const { isDark } = useTheme();
@@ -33,49 +34,37 @@ const ChatBoxRoom = () => {
     const fetchData = async () => {
       setIsLoading(true);
       try {
-        const [studentsRes, groupsRes, discussionsRes] = await Promise.all([
-          fetch(`${BASE_URL}get_all_students/`),
-          fetch(`${BASE_URL}groups/`),
-          fetch(`${BASE_URL}discussions/`)
+        const [studentRows, groupRows, discussionRows] = await Promise.all([
+          fetchAllPages(`${BASE_URL}get_all_students/`),
+          fetchAllPages(`${BASE_URL}groups/`),
+          fetchAllPages(`${BASE_URL}discussions/`)
         ]);
 
-        const studentsData = await studentsRes.json();
-        const groupsData = await groupsRes.json();
-        const discussionsData = await discussionsRes.json();
-
-        const studentMap = studentsData.data && Array.isArray(studentsData.data)
-          ? studentsData.data.reduce((acc, student) => ({
-              ...acc,
-              [student.id]: student.name || `Student ${student.id}`
-            }), {})
-          : {};
-        const studentArray = studentsData.data && Array.isArray(studentsData.data)
-          ? studentsData.data.map(student => ({
-              id: student.id,
-              name: student.name || `Student ${student.id}`
-            }))
-          : [];
-
-        const processedGroups = groupsData.data && Array.isArray(groupsData.data)
-          ? groupsData.data.map(group => ({
-              id: group.id,
-              name: group.name || 'Unnamed Group',
-              description: group.description || '',
-              members: Array.isArray(group.members) ? group.members.map(m => m?.id || m) : []
-            }))
-          : [];
-
-        const messages = discussionsData.data && Array.isArray(discussionsData.data)
-          ? discussionsData.data.map(d => ({
-              id: d.id,
-              sender: d.author === currentStudentId ? 'You' : studentMap[d.author] || `Student ${d.author}`,
-              author: d.author,
-              content: d.message || '',
-              time: new Date(d.timestamp).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' }),
-              group: d.group,
-              timestamp: d.timestamp
-            }))
-          : [];
+        const studentMap = studentRows.reduce((acc, student) => ({
+          ...acc,
+          [student.id]: student.name || `Student ${student.id}`
+        }), {});
+        const studentArray = studentRows.map(student => ({
+          id: student.id,
+          name: student.name || `Student ${student.id}`
+        }));
+
+        const processedGroups = groupRows.map(group => ({
+          id: group.id,
+          name: group.name || 'Unnamed Group',
+          description: group.description || '',
+          members: Array.isArray(group.members) ? group.members.map(m => m?.id || m) : []
+        }));
+
+        const messages = discussionRows.map(d => ({
+          id: d.id,
+          sender: d.author === currentStudentId ? 'You' : studentMap[d.author] || `Student ${d.author}`,
+          author: d.author,
+          content: d.message || '',
+          time: new Date(d.timestamp).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' }),
+          group: d.group,
+          timestamp: d.timestamp
+        }));
 
         console.log('Fetched studentList:', studentArray); // Debug log
         setStudents(studentMap);
@@ -0,0 +1,29 @@
+import axios from 'axios';
+
+// List endpoints are paginated. Viewsets return a bare array with the next page
+// in the Link header; the other list views return { data, next, previous }.
+const nextFromLinkHeader = (header) => {
+  if (!header) return null;
+  const match = header.split(',').map(part => part.match(/<([^>]+)>\s*;\s*rel="next"/)).find(Boolean);
+  return match ? match[1] : null;
+};
+
+// Follows `next` until the last page and returns every row.
+const fetchAllPages = async (url, client = axios) => {
+  const rows = [];
+  let next = url;
+  while (next) {
+    const response = await client.get(next);
+    const body = response.data;
+    if (Array.isArray(body)) {
+      rows.push(...body);
+      next = nextFromLinkHeader(response.headers?.link);
+    } else {
+      rows.push(...(Array.isArray(body?.data) ? body.data : []));
+      next = body?.next || null;
+    }
+  }
+  return rows;
+};
+
+export default fetchAllPages;
@@ -0,0 +1,53 @@
+"""
+Gunicorn settings, picked up automatically from the working directory.
+
+SERVER_MODE selects how Django is served:
+  asgi (default) - uvicorn workers running study_planner.asgi. The async LLM
+                   views (/api/study_plan/async/, /api/wellness/async/) await
+                   the provider instead of pinning a worker per request.
+  wsgi           - classic sync workers running study_planner.wsgi.
+
+Every worker writes its Prometheus metrics to PROMETHEUS_MULTIPROC_DIR so
+/metrics reports totals for the whole server, not just the worker that
+happened to answer the scrape.
+"""
+import os
+import shutil
+
+SERVER_MODE = os.getenv("SERVER_MODE", "asgi").lower()
+
+if SERVER_MODE == "wsgi":
+    wsgi_app = "study_planner.wsgi:application"
+    worker_class = "sync"
+else:
+    wsgi_app = "study_planner.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", "1"))
+# LLM completions can take well over gunicorn's 30s default.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus_multiproc")
+
+
+def on_starting(server):
+    # Workers must share the response cache, or writes served by one leave
+    # the others answering from stale entries.
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "study_planner.settings")
+    from student.response_cache import require_shared_cache
+
+    require_shared_cache(server.cfg.workers)
+
+    # Files left by a previous run would be merged into the new totals.
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,17 +1,20 @@
+import asyncio
 import os
-from langchain.chat_models import ChatOpenAI
-from langchain.schema import HumanMessage
+from asgiref.sync import async_to_sync, sync_to_async
+from langchain.schema import AIMessage, HumanMessage, SystemMessage
+
+from .llm_cache import get_response_cache, make_cache_key
+from .llm_client import LLMClient, LLMUnavailableError
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
-llm = ChatOpenAI(
-    openai_api_key=GROQ_API_KEY,
-    openai_api_base="https://api.groq.com/openai/v1",
-    model="llama3-8b-8192"
-)
+MODEL_NAME = "llama3-8b-8192"
+
+# Bump when the wording of STUDY_PLAN_TEMPLATE changes so cached plans built
+# from the old template are no longer served.
+STUDY_PLAN_TEMPLATE_VERSION = "1"
 
-def generate_study_plan(prompt: str) -> str:
-    structured_prompt = f"""
+STUDY_PLAN_TEMPLATE = """
     You are an AI assistant that creates structured study plans using any of the major study techniques that
     are recognized such as Pomodoro, spaced repetition, Feynman technique etc.
 
@@ -24,11 +27,8 @@ def generate_study_plan(prompt: str) -> str:
     - Techniques:
     - Duration:
     """
-    response = llm.invoke([HumanMessage(content=structured_prompt)])
-    return response.content
 
-def wellness_chatbot_response(user_query: str) -> str:
-    structured_prompt = f"""
+WELLNESS_TEMPLATE = """
     You are a supportive wellness chatbot. Provide motivational and wellness-oriented responses.
     Format:
     Response:
@@ -38,5 +38,158 @@ def wellness_chatbot_response(user_query: str) -> str:
     
     User Query: {user_query}
     """
-    response = llm.invoke([HumanMessage(content=structured_prompt)])
+
+SUMMARY_TEMPLATE = """
+    Summarize the conversation below between a student and a study assistant in at most
+    {max_words} words. Keep the student's goals, constraints, deadlines and the plans agreed so far.
+
+    Summary so far: {previous_summary}
+
+    New conversation turns:
+    {turns}
+    """
+
+llm = LLMClient.from_settings(model=MODEL_NAME, api_key=GROQ_API_KEY)
+
+def _study_plan_cache_key(prompt: str, context=None) -> str:
+    return make_cache_key(
+        prompt, MODEL_NAME, STUDY_PLAN_TEMPLATE_VERSION,
+        context=context.fingerprint() if context else ""
+    )
+
+def _study_plan_messages(prompt: str, context=None):
+    history = context.as_messages() if context else []
+    return history + [HumanMessage(content=STUDY_PLAN_TEMPLATE.format(prompt=prompt))]
+
+def conversation_messages(summary: str, turns):
+    """Chat history as LangChain messages: the summary first, then the recent turns."""
+    messages = []
+    if summary:
+        messages.append(SystemMessage(content=f"Summary of the earlier conversation: {summary}"))
+    for user_message, bot_response in turns:
+        messages.append(HumanMessage(content=user_message))
+        messages.append(AIMessage(content=bot_response))
+    return messages
+
+def summarize_conversation(previous_summary: str, turns, max_words: int = 150) -> str:
+    lines = "\n".join(f"Student: {user}\nAssistant: {bot}" for user, bot in turns)
+    prompt = SUMMARY_TEMPLATE.format(
+        max_words=max_words, previous_summary=previous_summary or "(none)", turns=lines
+    )
+    return llm.invoke([HumanMessage(content=prompt)], operation="summary").content
+
+def _wellness_messages(user_query: str):
+    return [HumanMessage(content=WELLNESS_TEMPLATE.format(user_query=user_query))]
+
+def generate_study_plan(prompt: str, context=None) -> str:
+    """Generate a plan; ``context`` is an optional chat_context.ConversationContext."""
+    cache = get_response_cache()
+    cache_key = _study_plan_cache_key(prompt, context)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    response = llm.invoke(_study_plan_messages(prompt, context), operation="study_plan")
+    cache.set(cache_key, response.content)
+    return response.content
+
+def stream_study_plan(prompt: str, context=None):
+    """Yield the study plan in chunks as the model generates it.
+
+    A cached plan is yielded as a single chunk; a freshly generated one is
+    cached once the stream has been fully consumed.
+    """
+    cache = get_response_cache()
+    cache_key = _study_plan_cache_key(prompt, context)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    for chunk in llm.stream(_study_plan_messages(prompt, context), operation="study_plan"):
+        if chunk.content:
+            parts.append(chunk.content)
+            yield chunk.content
+    cache.set(cache_key, "".join(parts))
+
+async def agenerate_study_plan(prompt: str, context=None) -> str:
+    """Async counterpart of generate_study_plan for views served over ASGI."""
+    cache = get_response_cache()
+    cache_key = _study_plan_cache_key(prompt, context)
+    cached = await sync_to_async(cache.get)(cache_key)
+    if cached is not None:
+        return cached
+
+    response = await llm.ainvoke(_study_plan_messages(prompt, context), operation="study_plan")
+    await sync_to_async(cache.set)(cache_key, response.content)
+    return response.content
+
+async def astream_study_plan(prompt: str, context=None):
+    """Async counterpart of stream_study_plan."""
+    cache = get_response_cache()
+    cache_key = _study_plan_cache_key(prompt, context)
+    cached = await sync_to_async(cache.get)(cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    async for chunk in llm.astream(_study_plan_messages(prompt, context), operation="study_plan"):
+        if chunk.content:
+            parts.append(chunk.content)
+            yield chunk.content
+    await sync_to_async(cache.set)(cache_key, "".join(parts))
+
+async def agenerate_study_plans_batch(prompts, max_concurrency: int = 8):
+    """Generate a plan for every prompt, at most ``max_concurrency`` at a time.
+
+    Prompts that normalize to the same cache key are only generated once.
+    Returns one ``{"prompt", "data"}`` or ``{"prompt", "error"}`` dict per
+    input prompt, in the original order.
+    """
+    unique = {}
+    keys = []
+    for prompt in prompts:
+        key = _study_plan_cache_key(prompt)
+        unique.setdefault(key, prompt)
+        keys.append(key)
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(prompt):
+        async with semaphore:
+            return await agenerate_study_plan(prompt)
+
+    outcomes = await asyncio.gather(*(run(prompt) for prompt in unique.values()), return_exceptions=True)
+    by_key = dict(zip(unique.keys(), outcomes))
+
+    results = []
+    for prompt, key in zip(prompts, keys):
+        outcome = by_key[key]
+        if isinstance(outcome, Exception):
+            results.append({"prompt": prompt, "error": str(outcome)})
+        else:
+            results.append({"prompt": prompt, "data": outcome})
+    return results
+
+generate_study_plans_batch = async_to_sync(agenerate_study_plans_batch)
+
+def wellness_chatbot_response(user_query: str) -> str:
+    response = llm.invoke(_wellness_messages(user_query), operation="wellness")
     return response.content
+
+def stream_wellness_response(user_query: str):
+    """Yield the wellness reply in chunks as the model generates it."""
+    for chunk in llm.stream(_wellness_messages(user_query), operation="wellness"):
+        if chunk.content:
+            yield chunk.content
+
+async def awellness_chatbot_response(user_query: str) -> str:
+    response = await llm.ainvoke(_wellness_messages(user_query), operation="wellness")
+    return response.content
+
+async def astream_wellness_response(user_query: str):
+    async for chunk in llm.astream(_wellness_messages(user_query), operation="wellness"):
+        if chunk.content:
+            yield chunk.content
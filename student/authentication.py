@@ -0,0 +1,154 @@
+"""
+Token authentication with a cache in front of the Token/User/Student lookup.
+
+DRF's TokenAuthentication joins Token to User on every request, and most
+views then load ``request.user.student`` separately. Here the user, with its
+student already attached, is cached under the token: first in a small
+in-process LRU, then, when ``TOKEN_AUTH_CACHE["SHARED_CACHE"]`` names one, in a
+shared Django cache. A warm request authenticates without touching the
+database.
+
+Saving a user, logging out and creating or deleting a student profile drop
+the entry (see signals.py). Those writes clear this process and the shared
+cache; other workers' local copies expire after ``LOCAL_TTL`` seconds, so
+keep it short.
+"""
+import hashlib
+import logging
+import pickle
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .llm_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "ENABLED": True,
+    "TTL": 300,
+    "LOCAL_TTL": 30,
+    "MAX_ENTRIES": 10000,
+    "SHARED_CACHE": None,
+}
+
+
+def auth_cache_settings():
+    return {**DEFAULTS, **getattr(settings, "TOKEN_AUTH_CACHE", {})}
+
+
+class TokenUserCache:
+    """Token key -> pickled user (with ``user.student`` loaded), in two tiers."""
+
+    def __init__(self, enabled=True, ttl=300, local_ttl=30, max_entries=10000, shared_alias=None):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.local = LRUCache(max_entries, local_ttl)
+        self.shared_alias = shared_alias
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    @staticmethod
+    def _token_key(key):
+        # Token keys are credentials; never use them verbatim as cache keys.
+        return "auth:token:" + hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _user_key(user_id):
+        return f"auth:user:{user_id}"
+
+    def _shared_call(self, method, *args, **kwargs):
+        if self.shared is None:
+            return None
+        try:
+            return getattr(self.shared, method)(*args, **kwargs)
+        except Exception:
+            logger.warning("Shared token cache %s failed", method, exc_info=True)
+            return None
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        cache_key = self._token_key(key)
+        payload = self.local.get(cache_key)
+        if payload is None:
+            payload = self._shared_call("get", cache_key)
+            if payload is None:
+                return None
+            self.local.set(cache_key, payload)
+        # Every request gets its own copy, so views can't change a shared instance.
+        return pickle.loads(payload)
+
+    def set(self, key, user):
+        if not self.enabled:
+            return
+        cache_key = self._token_key(key)
+        payload = pickle.dumps(user)
+        self.local.set(cache_key, payload)
+        self.local.set(self._user_key(user.pk), cache_key)
+        self._shared_call("set_many", {cache_key: payload, self._user_key(user.pk): cache_key}, timeout=self.ttl)
+
+    def invalidate_user(self, user_id):
+        user_key = self._user_key(user_id)
+        cache_key = self.local.get(user_key) or self._shared_call("get", user_key)
+        if cache_key is None:
+            return
+        self.local.delete(cache_key)
+        self.local.delete(user_key)
+        self._shared_call("delete_many", [cache_key, user_key])
+
+    def clear(self):
+        self.local.clear()
+
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache() -> TokenUserCache:
+    """Return the process-wide cache, built lazily from ``settings.TOKEN_AUTH_CACHE``."""
+    global _token_cache
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                config = auth_cache_settings()
+                _token_cache = TokenUserCache(
+                    enabled=config["ENABLED"],
+                    ttl=config["TTL"],
+                    local_ttl=config["LOCAL_TTL"],
+                    max_entries=config["MAX_ENTRIES"],
+                    shared_alias=config["SHARED_CACHE"],
+                )
+    return _token_cache
+
+
+def user_for_token(key):
+    """The active user owning token ``key``, with ``user.student`` preloaded, or None."""
+    cache = get_token_cache()
+    user = cache.get(key)
+    if user is None:
+        token = Token.objects.select_related("user__student").filter(key=key).first()
+        if token is None:
+            return None
+        user = token.user
+        cache.set(key, user)
+    return user if user.is_active else None
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that serves repeat requests from the token cache."""
+
+    def authenticate_credentials(self, key):
+        user = user_for_token(key)
+        if user is None:
+            # Same messages as TokenAuthentication; tell the two failures apart.
+            if Token.objects.filter(key=key).exists():
+                raise exceptions.AuthenticationFailed("User inactive or deleted.")
+            raise exceptions.AuthenticationFailed("Invalid token.")
+        return user, Token(key=key, user=user)
@@ -0,0 +1,161 @@
+"""
+Conversation context for StudyChatbox follow-up questions.
+
+Instead of resending the whole history, the model sees the most recent turns
+that fit a token budget plus a rolling summary of everything older. The
+summary is stored in StudyChatSummary and only extended when enough turns
+have fallen out of the window, so each turn is summarized once.
+
+Extending the summary is an LLM call, so it never runs inside the request:
+the request uses the stored summary and, once the transaction commits, hands
+the refresh to a background thread. Until it finishes, follow-ups see the
+previous summary.
+"""
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .ai_utils import conversation_messages, summarize_conversation
+from .models import StudyChatbox, StudyChatSummary
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "MAX_TURNS": 6,
+    "TOKEN_BUDGET": 1500,
+    "MAX_TURN_CHARS": 2000,
+    "SUMMARY_CHUNK": 4,
+    "SUMMARY_MAX_WORDS": 150,
+}
+
+
+def context_settings():
+    return {**DEFAULTS, **getattr(settings, "STUDY_CHAT_CONTEXT", {})}
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+class ConversationContext:
+    def __init__(self, summary, turns):
+        self.summary = summary
+        self.turns = turns
+
+    def __bool__(self):
+        return bool(self.summary or self.turns)
+
+    def as_messages(self):
+        return conversation_messages(self.summary, self.turns)
+
+    def fingerprint(self):
+        raw = "\x1f".join([self.summary] + [f"{user}\x1e{bot}" for user, bot in self.turns])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _clip(text, limit):
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def _recent_window(student, config):
+    """Newest-first rows that fit within MAX_TURNS and TOKEN_BUDGET, returned oldest first."""
+    rows = (
+        StudyChatbox.objects
+        .filter(student=student)
+        .order_by("-id")
+        .values_list("id", "user_message", "bot_response")[:config["MAX_TURNS"]]
+    )
+    window = []
+    used = 0
+    for chat_id, user_message, bot_response in rows:
+        user_message = _clip(user_message, config["MAX_TURN_CHARS"])
+        bot_response = _clip(bot_response, config["MAX_TURN_CHARS"])
+        cost = estimate_tokens(user_message) + estimate_tokens(bot_response)
+        if window and used + cost > config["TOKEN_BUDGET"]:
+            break
+        window.append((chat_id, user_message, bot_response))
+        used += cost
+    window.reverse()
+    return window
+
+
+def _pending_turns(student, record, before_id, limit):
+    return list(
+        StudyChatbox.objects
+        .filter(student=student, id__gt=record.summarized_until, id__lt=before_id)
+        .order_by("id")
+        .values_list("id", "user_message", "bot_response")[:limit]
+    )
+
+
+def _refresh_summary(student, before_id, config):
+    """Fold unsummarized turns older than ``before_id`` into the stored summary."""
+    record, _ = StudyChatSummary.objects.get_or_create(student=student)
+    # A long backlog (e.g. history from before summaries existed) is caught
+    # up a few chunks per refresh rather than in one huge prompt.
+    rows = _pending_turns(student, record, before_id, config["SUMMARY_CHUNK"] * 5)
+    if len(rows) < config["SUMMARY_CHUNK"]:
+        return record.summary
+
+    turns = [(_clip(user, config["MAX_TURN_CHARS"]), _clip(bot, config["MAX_TURN_CHARS"])) for _, user, bot in rows]
+    try:
+        record.summary = summarize_conversation(record.summary, turns, max_words=config["SUMMARY_MAX_WORDS"])
+    except Exception:
+        # Any provider error (unavailable, bad request...) keeps the old summary.
+        logger.warning("Skipping chat summary refresh for student %s", student.id, exc_info=True)
+        return record.summary
+    record.summarized_until = rows[-1][0]
+    record.save(update_fields=["summary", "summarized_until", "updated_at"])
+    return record.summary
+
+
+_summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-summary")
+_scheduled = set()
+_scheduled_lock = threading.Lock()
+
+
+def _run_refresh(student, before_id, config):
+    close_old_connections()
+    try:
+        _refresh_summary(student, before_id, config)
+    except Exception:
+        logger.exception("Chat summary refresh failed for student %s", student.id)
+    finally:
+        with _scheduled_lock:
+            _scheduled.discard(student.id)
+        close_old_connections()
+
+
+def schedule_summary_refresh(student, before_id, config):
+    """Refresh the summary in the background after commit; at most one pending refresh per student."""
+    with _scheduled_lock:
+        if student.id in _scheduled:
+            return
+        _scheduled.add(student.id)
+
+    def submit():
+        try:
+            _summary_executor.submit(_run_refresh, student, before_id, config)
+        except RuntimeError:
+            # The executor is shut down (the process is exiting).
+            with _scheduled_lock:
+                _scheduled.discard(student.id)
+
+    transaction.on_commit(submit)
+
+
+def build_conversation_context(student):
+    """Compact history for ``student``: rolling summary plus the recent turns that fit the budget."""
+    config = context_settings()
+    window = _recent_window(student, config)
+    if not window:
+        return ConversationContext("", [])
+    record = StudyChatSummary.objects.filter(student=student).first() or StudyChatSummary(student=student)
+    if len(_pending_turns(student, record, window[0][0], config["SUMMARY_CHUNK"])) >= config["SUMMARY_CHUNK"]:
+        schedule_summary_refresh(student, window[0][0], config)
+    return ConversationContext(record.summary, [(user, bot) for _, user, bot in window])
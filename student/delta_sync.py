@@ -0,0 +1,169 @@
+"""
+Delta sync: everything a student's client needs to refresh, since a watermark.
+
+``GET /api/sync/?since=<watermark>`` returns the student's decks, flashcards,
+dashboard modules, lessons and events created or updated after ``since``, and
+the ids of rows deleted since then, in one response. The response carries the
+watermark to send next time. Without ``since``, or with one older than the
+tombstone retention window, the client gets a full snapshot (``"full": true``)
+and should replace what it has.
+
+Deletions are recorded as Tombstone rows by signals.py. Rows removed by a
+cascade are not recorded separately: a deleted deck implies its flashcards,
+a deleted module its lessons. Events are shared, so each student who could
+see a deleted event gets their own tombstone, and losing access to one
+(leaving its participants or groups) is recorded the same way. A student
+only ever hears about events they could see.
+
+The watermark is taken when the request starts, minus ``OVERLAP`` seconds, so
+writes still committing while the snapshot was read are sent again next time
+rather than missed. Clients must treat changes as upserts.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.query import QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .eager_loading import eager
+from .models import DashboardModule, Deck, Event, Flashcard, Lesson, Tombstone
+from .serializer import DashboardModuleSerializer, DeckSerializer, EventSerializer, FlashcardSerializer, LessonSerializer
+
+DEFAULTS = {
+    "OVERLAP": 5,
+    "TOMBSTONE_RETENTION_DAYS": 30,
+}
+
+# Response key -> Tombstone.model label.
+COLLECTIONS = {
+    "decks": "deck",
+    "flashcards": "flashcard",
+    "dashboard_modules": "dashboardmodule",
+    "lessons": "lesson",
+    "events": "event",
+}
+
+
+class InvalidWatermark(ValueError):
+    pass
+
+
+def sync_settings():
+    return {**DEFAULTS, **getattr(settings, "SYNC", {})}
+
+
+def parse_watermark(value):
+    """The ``since`` query parameter as a naive local datetime, or None when absent."""
+    if not value:
+        return None
+    try:
+        since = parse_datetime(value)
+    except ValueError:
+        since = None
+    if since is None:
+        raise InvalidWatermark(f"Invalid watermark {value!r}; expected an ISO 8601 datetime")
+    if timezone.is_aware(since):
+        since = timezone.make_naive(since)
+    return since
+
+
+def retention_cutoff():
+    return timezone.now() - timedelta(days=sync_settings()["TOMBSTONE_RETENTION_DAYS"])
+
+
+def is_direct_delete(sender, origin):
+    """Whether a post_delete is for the row the caller deleted, rather than a cascade from its parent."""
+    if isinstance(origin, QuerySet):
+        return origin.model is sender
+    return isinstance(origin, sender)
+
+
+def record_deletion(instance, student_id=None):
+    Tombstone.objects.create(model=instance._meta.model_name, object_id=instance.pk, student_id=student_id)
+
+
+def visible_events(student):
+    return Event.objects.filter(Q(participants=student) | Q(groups__members=student)).distinct()
+
+
+def event_viewers(event_ids):
+    """{event id: ids of the students who can see it} for ``event_ids``."""
+    viewers = defaultdict(set)
+    if not event_ids:
+        return viewers
+    participants = Event.participants.through.objects.filter(event_id__in=event_ids).values_list("event_id", "student_id")
+    members = Event.groups.through.objects.filter(
+        event_id__in=event_ids, group__members__isnull=False
+    ).values_list("event_id", "group__members")
+    for event_id, student_id in participants.union(members):
+        viewers[event_id].add(student_id)
+    return viewers
+
+
+def record_lost_access(before, after):
+    """Tombstone each event for the students in ``before`` who are missing from ``after``."""
+    Tombstone.objects.bulk_create([
+        Tombstone(model="event", object_id=event_id, student_id=student_id)
+        for event_id, students in before.items()
+        for student_id in students - after.get(event_id, set())
+    ])
+
+
+def _changed(queryset, since, *fields):
+    if since is None:
+        return queryset
+    condition = Q()
+    for field in fields or ("updated_at",):
+        condition |= Q(**{f"{field}__gt": since})
+    return queryset.filter(condition)
+
+
+def collect_changes(student, since):
+    """The sync payload for ``student``; ``since=None`` asks for a full snapshot."""
+    config = sync_settings()
+    started = timezone.now()
+    full = since is None or since < retention_cutoff()
+    if full:
+        since = None
+
+    decks = Deck.objects.filter(owner=student)
+    flashcards = Flashcard.objects.filter(deck__owner=student)
+    modules = DashboardModule.objects.filter(student=student)
+    lessons = Lesson.objects.filter(dashboard_module__student=student)
+    events = visible_events(student)
+
+    changes = {
+        "decks": DeckSerializer(_changed(decks, since), many=True).data,
+        "flashcards": FlashcardSerializer(_changed(flashcards, since), many=True).data,
+        # Modules embed their study plan, so a plan edit counts as a module change.
+        "dashboard_modules": DashboardModuleSerializer(
+            eager(DashboardModuleSerializer, _changed(modules, since, "updated_at", "saved_study_plan__updated_at")),
+            many=True,
+        ).data,
+        "lessons": LessonSerializer(_changed(lessons, since), many=True).data,
+        "events": EventSerializer(eager(EventSerializer, _changed(events, since)), many=True).data,
+    }
+
+    deleted = {key: [] for key in COLLECTIONS}
+    if since is not None:
+        labels = {label: key for key, label in COLLECTIONS.items()}
+        tombstones = Tombstone.objects.filter(student=student, deleted_at__gt=since).values_list("model", "object_id")
+        for label, object_id in tombstones:
+            if label in labels:
+                deleted[labels[label]].append(object_id)
+        # An event lost and then regained since the watermark is a change, not a deletion.
+        visible = {event["id"] for event in changes["events"]}
+        deleted["events"] = [event_id for event_id in deleted["events"] if event_id not in visible]
+        deleted = {key: sorted(set(ids)) for key, ids in deleted.items()}
+
+    watermark = started - timedelta(seconds=config["OVERLAP"])
+    return {"watermark": watermark.isoformat(), "full": full, "changes": changes, "deleted": deleted}
+
+
+def prune_tombstones():
+    """Delete tombstones past the retention window; clients that old get a full snapshot instead."""
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=retention_cutoff()).delete()
+    return deleted
@@ -0,0 +1,43 @@
+"""
+Eager loading for serializers that read related objects.
+
+A serializer lists the relations it touches and views build their querysets
+through ``setup_eager_loading``. Rendering a page then hits only the
+``select_related`` join and the prefetch caches, so a list costs the same
+number of queries for 10 rows as for 100 (one per prefetched relation).
+"""
+from django.db.models import Prefetch
+
+
+def pk_only(model, *fields):
+    """Queryset for a prefetch that only needs the related rows' ids (plus ``fields``)."""
+    return model.objects.only("pk", *fields)
+
+
+class EagerLoadingMixin:
+    """Serializer mixin declaring the relations ``to_representation`` reads.
+
+    ``select_related_fields`` lists forward foreign keys to join. Entries in
+    ``prefetch_related_fields`` are either a relation name or a
+    ``(name, queryset)`` pair, which is turned into a ``Prefetch`` object.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        prefetches = [
+            Prefetch(*entry) if isinstance(entry, tuple) else entry
+            for entry in cls.prefetch_related_fields
+        ]
+        if prefetches:
+            queryset = queryset.prefetch_related(*prefetches)
+        return queryset
+
+
+def eager(serializer_class, queryset):
+    """``queryset`` with whatever eager loading ``serializer_class`` declares."""
+    setup = getattr(serializer_class, "setup_eager_loading", None)
+    return setup(queryset) if setup else queryset
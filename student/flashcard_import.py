@@ -0,0 +1,140 @@
+"""
+Bulk flashcard import.
+
+Cards arrive as a JSON array, a CSV file with a header row, or an Anki-style
+tab-separated export (front, back and optional tags, no header). Every row is
+validated up front; bad rows are reported by number and skipped, the rest are
+written in one transaction. Small batches use ``bulk_create``; large ones are
+streamed into the table with Postgres ``COPY``.
+"""
+import csv
+import io
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import Flashcard
+from .response_cache import invalidate
+from .serializer import FlashcardImportSerializer
+
+DEFAULTS = {
+    "MAX_ROWS": 20000,
+    "COPY_THRESHOLD": 1000,
+    "BATCH_SIZE": 500,
+}
+
+# Header aliases accepted in CSV uploads
+COLUMN_ALIASES = {
+    "front": "front_text",
+    "question": "front_text",
+    "back": "back_text",
+    "answer": "back_text",
+    "tags": "category",
+    "difficulty": "difficulty_level",
+}
+
+# Header lines of an Anki plain-text export, e.g. "#separator:tab" or "#tags column:3"
+ANKI_HEADER = re.compile(r"#(separator|html|tags|columns|notetype|deck|guid|if matches)( column)?:")
+
+
+class FlashcardImportError(ValueError):
+    """The upload as a whole could not be read."""
+
+
+def import_settings():
+    return {**DEFAULTS, **getattr(settings, "FLASHCARD_IMPORT", {})}
+
+
+def _read_upload(upload):
+    try:
+        text = upload.read().decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise FlashcardImportError("File must be UTF-8 encoded")
+    # Anki exports start with "#separator:tab"-style header lines. Only those
+    # are dropped; a card whose front starts with "#" is kept.
+    lines = text.splitlines(keepends=True)
+    header = 0
+    while header < len(lines) and ANKI_HEADER.match(lines[header]):
+        header += 1
+    body = "".join(lines[header:])
+    first = next((line for line in lines[header:] if line.strip()), "")
+    name = (upload.name or "").lower()
+    # The csv module reads the text itself, so quoted fields may span lines.
+    if name.endswith((".tsv", ".txt")) or "\t" in first:
+        rows = (row for row in csv.reader(io.StringIO(body), delimiter="\t") if any(field.strip() for field in row))
+        return [
+            {"front_text": row[0], "back_text": row[1] if len(row) > 1 else "", "category": row[2] if len(row) > 2 else None}
+            for row in rows
+        ]
+    reader = csv.DictReader(io.StringIO(body))
+    if not reader.fieldnames:
+        return []
+    reader.fieldnames = [COLUMN_ALIASES.get(name.strip().lower(), name.strip().lower()) for name in reader.fieldnames]
+    if not {"front_text", "back_text"} <= set(reader.fieldnames):
+        raise FlashcardImportError("CSV header must include front_text and back_text columns")
+    return [row for row in reader if any((value or "").strip() for value in row.values() if isinstance(value, str))]
+
+
+def parse_rows(data, files):
+    """Raw row dicts from an uploaded ``file`` or a ``flashcards`` JSON array."""
+    if files.get("file"):
+        rows = _read_upload(files["file"])
+    else:
+        rows = data.get("flashcards")
+        if not isinstance(rows, list):
+            raise FlashcardImportError("Provide a 'flashcards' array or upload a 'file'")
+    if len(rows) > import_settings()["MAX_ROWS"]:
+        raise FlashcardImportError(f"At most {import_settings()['MAX_ROWS']} cards can be imported at once")
+    return rows
+
+
+def validate_rows(rows):
+    """Split rows into valid card data and ``{"row", "errors"}`` entries (rows numbered from 1)."""
+    valid, errors = [], []
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({"row": number, "errors": {"non_field_errors": ["Expected an object"]}})
+            continue
+        serializer = FlashcardImportSerializer(data=row)
+        if serializer.is_valid():
+            valid.append(serializer.validated_data)
+        else:
+            errors.append({"row": number, "errors": serializer.errors})
+    return valid, errors
+
+
+def _copy_value(value):
+    # In COPY's CSV format an unquoted empty field is NULL and "" is an empty string.
+    if value is None:
+        return ""
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _copy_flashcards(cards):
+    """Write cards with COPY; every concrete column but the primary key is sent."""
+    fields = [field for field in Flashcard._meta.concrete_fields if not field.primary_key]
+    buffer = io.StringIO()
+    for card in cards:
+        # pre_save fills auto_now columns, as an INSERT through the ORM would.
+        values = (field.get_db_prep_save(field.pre_save(card, True), connection) for field in fields)
+        buffer.write(",".join(_copy_value(value) for value in values) + "\n")
+    buffer.seek(0)
+    columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+    table = connection.ops.quote_name(Flashcard._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def import_flashcards(deck, card_data):
+    """Create cards in ``deck``; returns the number written."""
+    config = import_settings()
+    cards = [Flashcard(deck=deck, **data) for data in card_data]
+    with transaction.atomic():
+        if connection.vendor == "postgresql" and len(cards) >= config["COPY_THRESHOLD"]:
+            _copy_flashcards(cards)
+        else:
+            Flashcard.objects.bulk_create(cards, batch_size=config["BATCH_SIZE"])
+        # Neither path sends post_save
+        invalidate(f"flashcards:deck:{deck.id}")
+    return len(cards)
@@ -0,0 +1,67 @@
+"""
+Friend graph queries over the symmetric FriendEdge table.
+
+FriendEdge holds both directions of every accepted friendship. sync_edges()
+keeps it in step with Friendship and is called from the signal handlers in
+student/signals.py.
+"""
+from collections import defaultdict
+
+from django.db.models import Count, Exists, OuterRef, Q
+
+from .models import FriendEdge, Friendship
+
+
+def sync_edges(student_id, other_id, accepted):
+    """Create or remove the pair of edges between two students."""
+    if accepted:
+        FriendEdge.objects.bulk_create(
+            [FriendEdge(student_id=student_id, friend_id=other_id), FriendEdge(student_id=other_id, friend_id=student_id)],
+            ignore_conflicts=True,
+        )
+    else:
+        FriendEdge.objects.filter(
+            Q(student_id=student_id, friend_id=other_id) | Q(student_id=other_id, friend_id=student_id)
+        ).delete()
+
+
+def friend_suggestions(student, limit=10):
+    """Friends of friends ranked by mutual friend count.
+
+    Leaves out the student, current friends and anyone the student already has
+    a pending, rejected or blocked Friendship row with.
+    """
+    my_friends = FriendEdge.objects.filter(student=student).values("friend_id")
+    existing = Friendship.objects.filter(
+        Q(sender=student, receiver=OuterRef("friend_id")) | Q(sender=OuterRef("friend_id"), receiver=student)
+    )
+    return (
+        FriendEdge.objects
+        .filter(student_id__in=my_friends)
+        .exclude(friend=student)
+        .exclude(Exists(existing))
+        .values("friend_id", "friend__name", "friend__email")
+        .annotate(mutual_friends=Count("student_id"))
+        .order_by("-mutual_friends", "friend_id")[:limit]
+    )
+
+
+def mutual_friend_counts(student, other_ids):
+    """``{other_id: count}`` of friends ``student`` shares with each of ``other_ids``."""
+    counts = (
+        FriendEdge.objects
+        .filter(student_id__in=other_ids, friend_id__in=FriendEdge.objects.filter(student=student).values("friend_id"))
+        .values("student_id")
+        .annotate(mutual_friends=Count("friend_id"))
+    )
+    result = {other_id: 0 for other_id in other_ids}
+    result.update({row["student_id"]: row["mutual_friends"] for row in counts})
+    return result
+
+
+def load_adjacency(chunk_size=5000):
+    """The whole friend graph as ``{student_id: {friend_id, ...}}``, for batch jobs."""
+    graph = defaultdict(set)
+    for student_id, friend_id in FriendEdge.objects.values_list("student_id", "friend_id").iterator(chunk_size=chunk_size):
+        graph[student_id].add(friend_id)
+    return dict(graph)
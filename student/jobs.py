@@ -0,0 +1,131 @@
+"""
+Database-backed queue for study plan generation.
+
+Jobs live in the StudyPlanJob table, so no broker is needed: workers started
+with ``python manage.py run_study_plan_worker`` claim rows with
+``SELECT ... FOR UPDATE SKIP LOCKED`` and several workers can run side by side.
+A failed attempt is rescheduled with exponential backoff and jitter until the
+job runs out of attempts.
+"""
+import logging
+import random
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils.timezone import now
+
+from .ai_utils import generate_study_plan
+from .models import SavedStudyPlan, StudyPlanJob
+
+logger = logging.getLogger(__name__)
+
+
+def job_settings():
+    defaults = {
+        "DEFAULT_BACKGROUND": False,
+        "MAX_ATTEMPTS": 3,
+        "BACKOFF_BASE": 5,
+        "BACKOFF_MAX": 300,
+        "LOCK_TIMEOUT": 600,
+    }
+    return {**defaults, **getattr(settings, "STUDY_PLAN_JOBS", {})}
+
+
+def enqueue_study_plan(prompt, student=None, dashboard_module=None):
+    return StudyPlanJob.objects.create(
+        prompt=prompt,
+        student=student,
+        dashboard_module=dashboard_module,
+        max_attempts=job_settings()["MAX_ATTEMPTS"],
+        access_key="" if student else secrets.token_urlsafe(32),
+    )
+
+
+def can_read_job(job, student, key):
+    """Jobs belong to their student; anonymous jobs to whoever holds the key returned on enqueue."""
+    if job.student_id:
+        return student is not None and job.student_id == student.id
+    return bool(job.access_key) and secrets.compare_digest(job.access_key, key or "")
+
+
+def retry_delay(attempts):
+    """Seconds to wait before the next attempt: exponential backoff with jitter."""
+    config = job_settings()
+    ceiling = min(config["BACKOFF_MAX"], config["BACKOFF_BASE"] * 2 ** max(attempts - 1, 0))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def claim_next_job():
+    """Lock and mark the next runnable job as running, or return None.
+
+    Jobs stuck in "running" for longer than LOCK_TIMEOUT (e.g. the worker was
+    killed) are picked up again, unless that was their last attempt: a job
+    that keeps crashing its worker is failed instead of reclaimed forever.
+    """
+    current = now()
+    stale_before = current - timedelta(seconds=job_settings()["LOCK_TIMEOUT"])
+    with transaction.atomic():
+        StudyPlanJob.objects.filter(
+            status="running", locked_at__lt=stale_before, attempts__gte=F("max_attempts")
+        ).update(status="failed", error="Worker stopped during the last attempt", locked_at=None, updated_at=current)
+        job = (
+            StudyPlanJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(status="pending", run_after__lte=current)
+                | Q(status="running", locked_at__lt=stale_before),
+                attempts__lt=F("max_attempts"),
+            )
+            .order_by("run_after", "id")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = "running"
+        job.locked_at = current
+        job.attempts += 1
+        job.save(update_fields=["status", "locked_at", "attempts", "updated_at"])
+    return job
+
+
+def save_result_to_module(job):
+    module = job.dashboard_module
+    plan = SavedStudyPlan.objects.create(
+        student=job.student,
+        plan_content=job.result,
+        status="saved"
+    )
+    module.saved_study_plan = plan
+    module.save()
+    return plan
+
+
+def run_job(job):
+    """Generate the plan for a claimed job and record the outcome."""
+    try:
+        job.result = generate_study_plan(job.prompt)
+    except Exception as e:
+        job.error = str(e)
+        job.locked_at = None
+        if job.attempts >= job.max_attempts:
+            job.status = "failed"
+            logger.error("Study plan job %s failed after %s attempts: %s", job.id, job.attempts, e)
+        else:
+            job.status = "pending"
+            job.run_after = now() + timedelta(seconds=retry_delay(job.attempts))
+            logger.warning("Study plan job %s attempt %s failed, retrying: %s", job.id, job.attempts, e)
+        job.save(update_fields=["status", "error", "locked_at", "run_after", "updated_at"])
+        return job
+
+    with transaction.atomic():
+        job.status = "succeeded"
+        job.error = ""
+        job.locked_at = None
+        if job.dashboard_module_id and job.student_id:
+            job.saved_study_plan = save_result_to_module(job)
+        job.save(update_fields=["status", "result", "error", "locked_at", "saved_study_plan", "updated_at"])
+    return job
+
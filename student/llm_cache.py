@@ -0,0 +1,172 @@
+"""
+Response cache for LLM completions.
+
+Keys cover the normalized prompt, the model name and the prompt template
+version, so changing the model or rewording a template never serves stale
+answers. Lookups go through a small in-process LRU first and then, when
+configured, a shared Django cache (the database cache table by default) that
+every worker process can see.
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .metrics import LLM_CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+_LOOKUP_RESULTS = {"local_hits": "local_hit", "shared_hits": "shared_hit", "misses": "miss"}
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Fold case, unicode forms and whitespace so near-identical prompts share a key."""
+    text = unicodedata.normalize("NFKC", prompt).casefold()
+    text = _WHITESPACE.sub(" ", text).strip()
+    return text.rstrip(" .!?")
+
+
+def make_cache_key(prompt: str, model: str, template_version: str, namespace: str = "study_plan", context: str = "") -> str:
+    """``context`` distinguishes the same prompt asked with different conversation history."""
+    raw = "\x1f".join([namespace, model, template_version, context, normalize_prompt(prompt)])
+    return f"llm:{namespace}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+
+class LRUCache:
+    """Thread-safe in-process LRU with a per-entry TTL."""
+
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class LLMResponseCache:
+    """Two-tier cache: local LRU in front of an optional shared Django cache."""
+
+    def __init__(self, enabled=True, ttl=86400, max_entries=1000, shared_alias=None):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.local = LRUCache(max_entries, ttl)
+        self.shared_alias = shared_alias
+        self._counter_lock = threading.Lock()
+        self.hits = 0
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    def _count(self, *names):
+        with self._counter_lock:
+            for name in names:
+                setattr(self, name, getattr(self, name) + 1)
+        # The per-process counters above feed stats(); Prometheus sums across workers.
+        LLM_CACHE_LOOKUPS.labels(_LOOKUP_RESULTS[names[-1]]).inc()
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        value = self.local.get(key)
+        if value is not None:
+            self._count("hits", "local_hits")
+            return value
+        if self.shared is not None:
+            try:
+                value = self.shared.get(key)
+            except Exception:
+                logger.warning("Shared LLM cache lookup failed", exc_info=True)
+                value = None
+            if value is not None:
+                self.local.set(key, value)
+                self._count("hits", "shared_hits")
+                return value
+        self._count("misses")
+        return None
+
+    def set(self, key, value):
+        if not self.enabled or not value:
+            return
+        self.local.set(key, value)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value, timeout=self.ttl)
+            except Exception:
+                logger.warning("Shared LLM cache write failed", exc_info=True)
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "local_entries": len(self.local),
+        }
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> LLMResponseCache:
+    """Return the process-wide cache, built lazily from ``settings.LLM_CACHE``."""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                config = getattr(settings, "LLM_CACHE", {})
+                _response_cache = LLMResponseCache(
+                    enabled=config.get("ENABLED", True),
+                    ttl=config.get("TTL", 86400),
+                    max_entries=config.get("MAX_ENTRIES", 1000),
+                    shared_alias=config.get("SHARED_CACHE"),
+                )
+    return _response_cache
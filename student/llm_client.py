@@ -0,0 +1,492 @@
+"""
+Managed client for the OpenAI-compatible LLM backend (Groq).
+
+Wraps LangChain's ChatOpenAI with the plumbing a shared provider needs under
+load:
+
+* pooled keep-alive HTTP connections with explicit timeouts,
+* a per-process concurrency limit and an optional cluster-wide limit built on
+  Postgres advisory locks,
+* retries with jittered exponential backoff on 429/5xx and network errors,
+* a circuit breaker that fails fast while the provider is degraded.
+
+When the provider is saturated or failing, calls raise LLMUnavailableError,
+which views turn into a 503 instead of tying up a worker.
+"""
+import asyncio
+import collections
+import logging
+import random
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+
+import httpx
+import openai
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from langchain.chat_models import ChatOpenAI
+
+from .metrics import LLM_IN_FLIGHT, track_llm_call
+from .profiling import llm_timer
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "BASE_URL": "https://api.groq.com/openai/v1",
+    "CONNECT_TIMEOUT": 5.0,
+    "READ_TIMEOUT": 60.0,
+    "WRITE_TIMEOUT": 10.0,
+    "POOL_TIMEOUT": 10.0,
+    "MAX_CONNECTIONS": 20,
+    "MAX_KEEPALIVE_CONNECTIONS": 10,
+    "KEEPALIVE_EXPIRY": 30.0,
+    "MAX_CONCURRENCY": 8,
+    "GLOBAL_MAX_CONCURRENCY": 0,
+    "ACQUIRE_TIMEOUT": 30.0,
+    "MAX_RETRIES": 3,
+    "RETRY_BACKOFF_BASE": 0.5,
+    "RETRY_BACKOFF_MAX": 8.0,
+    "CIRCUIT_FAILURE_THRESHOLD": 5,
+    "CIRCUIT_RESET_TIMEOUT": 30.0,
+}
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APIConnectionError,
+)
+
+
+class LLMUnavailableError(Exception):
+    """The LLM provider is degraded or saturated; callers should fail fast."""
+
+
+class CircuitBreaker:
+    """Opens after consecutive provider failures and lets one trial call through after a cool-down."""
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """None if the call must fail fast, else a ticket to hand back to ``record``.
+
+        The ticket is "trial" for the single call let through while half-open.
+        """
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return None
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self._trial_in_flight:
+                    return None
+                self._trial_in_flight = True
+                return "trial"
+            return "call"
+
+    def record(self, outcome, ticket="call"):
+        """Record a call outcome: "success", "failure" or None when it was neither."""
+        with self._lock:
+            # Calls that started before the breaker opened finish here too;
+            # only the trial itself may let the next trial through.
+            if ticket == "trial":
+                self._trial_in_flight = False
+            if outcome == "success":
+                self.state = "closed"
+                self.failures = 0
+            elif outcome == "failure":
+                self.failures += 1
+                if self.state == "half_open" or self.failures >= self.failure_threshold:
+                    if self.state != "open":
+                        logger.error("LLM circuit opened after %s failures", self.failures)
+                    self.state = "open"
+                    self.opened_at = time.monotonic()
+
+
+class _Waiter:
+    def __init__(self, loop=None):
+        self.loop = loop
+        self.granted = False
+        self.event = threading.Event() if loop is None else None
+        self.future = loop.create_future() if loop is not None else None
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(lambda: self.future.done() or self.future.set_result(None))
+
+
+class SlotPool:
+    """Process-wide counting semaphore that threads and event loops can both wait on.
+
+    Sync callers block on an Event and async callers await a Future; a
+    released slot is handed straight to the oldest waiter, so nobody polls.
+    """
+
+    def __init__(self, size):
+        self._free = size
+        self._waiters = collections.deque()
+        self._lock = threading.Lock()
+
+    def _try_take(self, loop=None):
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return None
+            waiter = _Waiter(loop)
+            self._waiters.append(waiter)
+            return waiter
+
+    def _give_up(self, waiter):
+        """Stop waiting; True if the slot was handed over meanwhile and is now ours."""
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+            return False
+
+    def acquire(self, timeout):
+        waiter = self._try_take()
+        if waiter is None:
+            return True
+        if waiter.event.wait(timeout):
+            return True
+        return self._give_up(waiter)
+
+    async def aacquire(self, timeout):
+        waiter = self._try_take(asyncio.get_running_loop())
+        if waiter is None:
+            return True
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return self._give_up(waiter)
+        except asyncio.CancelledError:
+            if self._give_up(waiter):
+                self.release()
+            raise
+
+    def release(self):
+        while True:
+            with self._lock:
+                if not self._waiters:
+                    self._free += 1
+                    return
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+            try:
+                waiter.wake()
+                return
+            except RuntimeError:
+                # Its event loop has closed, so nobody is waiting there any more.
+                continue
+
+
+class GlobalConcurrencyLimit:
+    """Cluster-wide concurrency slots held as Postgres session advisory locks.
+
+    Session locks need a real server session, so behind a transaction pooler
+    they are taken on ``settings.SESSION_DATABASE_ALIAS``.
+    """
+
+    LOCK_NAMESPACE = 760401
+
+    def __init__(self, slots):
+        self.slots = slots
+
+    @property
+    def connection(self):
+        return connections[getattr(settings, "SESSION_DATABASE_ALIAS", DEFAULT_DB_ALIAS)]
+
+    def try_acquire(self):
+        with self.connection.cursor() as cursor:
+            for slot in random.sample(range(self.slots), self.slots):
+                cursor.execute("SELECT pg_try_advisory_lock(%s, %s)", [self.LOCK_NAMESPACE, slot])
+                if cursor.fetchone()[0]:
+                    return slot
+        return None
+
+    def release(self, slot):
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s, %s)", [self.LOCK_NAMESPACE, slot])
+
+
+async def _close_on_loop_shutdown(http_client, forget):
+    """Parked after its first step; the loop finalizes it on shutdown, closing ``http_client``.
+
+    asyncio.run() (and so async_to_sync) shuts down async generators before
+    closing the loop, so per-loop clients don't leak their connections.
+    """
+    try:
+        yield
+    finally:
+        forget()
+        await http_client.aclose()
+
+
+class LLMClient:
+    """Drop-in replacement for a ChatOpenAI instance: invoke, ainvoke, stream and astream."""
+
+    def __init__(self, model, api_key, **options):
+        self.config = {**DEFAULTS, **options}
+        self.model = model
+        self.api_key = api_key
+        self.timeout = httpx.Timeout(
+            connect=self.config["CONNECT_TIMEOUT"],
+            read=self.config["READ_TIMEOUT"],
+            write=self.config["WRITE_TIMEOUT"],
+            pool=self.config["POOL_TIMEOUT"],
+        )
+        self.limits = httpx.Limits(
+            max_connections=self.config["MAX_CONNECTIONS"],
+            max_keepalive_connections=self.config["MAX_KEEPALIVE_CONNECTIONS"],
+            keepalive_expiry=self.config["KEEPALIVE_EXPIRY"],
+        )
+        self.breaker = CircuitBreaker(
+            self.config["CIRCUIT_FAILURE_THRESHOLD"], self.config["CIRCUIT_RESET_TIMEOUT"]
+        )
+        self._local_slots = SlotPool(self.config["MAX_CONCURRENCY"])
+        global_slots = self.config["GLOBAL_MAX_CONCURRENCY"]
+        self._global_slots = GlobalConcurrencyLimit(global_slots) if global_slots else None
+        self._llm = self._build_chat_model(
+            client=openai.OpenAI(
+                http_client=httpx.Client(limits=self.limits, timeout=self.timeout), **self._openai_params()
+            ).chat.completions
+        )
+        # httpx.AsyncClient connections belong to the event loop that opened them.
+        self._async_llms = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def from_settings(cls, model, api_key):
+        return cls(model, api_key, **getattr(settings, "LLM_CLIENT", {}))
+
+    def _openai_params(self):
+        return {
+            "api_key": self.api_key,
+            "base_url": self.config["BASE_URL"],
+            "timeout": self.timeout,
+            "max_retries": 0,
+        }
+
+    def _build_chat_model(self, **clients):
+        return ChatOpenAI(
+            openai_api_key=self.api_key,
+            openai_api_base=self.config["BASE_URL"],
+            model=self.model,
+            max_retries=0,
+            **clients
+        )
+
+    async def _async_llm(self):
+        loop = asyncio.get_running_loop()
+        entry = self._async_llms.get(loop)
+        if entry is None:
+            http_client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+            llm = self._build_chat_model(
+                async_client=openai.AsyncOpenAI(http_client=http_client, **self._openai_params()).chat.completions
+            )
+            closer = _close_on_loop_shutdown(http_client, lambda: self._async_llms.pop(loop, None))
+            await closer.asend(None)
+            entry = self._async_llms[loop] = (llm, closer)
+        return entry[0]
+
+    def _retry_delay(self, attempt, error):
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            if retry_after is not None:
+                return min(float(retry_after), self.config["RETRY_BACKOFF_MAX"])
+        except ValueError:
+            pass
+        ceiling = min(self.config["RETRY_BACKOFF_MAX"], self.config["RETRY_BACKOFF_BASE"] * 2 ** attempt)
+        return random.uniform(0, ceiling)
+
+    def _check_circuit(self):
+        ticket = self.breaker.allow()
+        if ticket is None:
+            raise LLMUnavailableError("LLM provider is temporarily unavailable")
+        return ticket
+
+    @contextmanager
+    def _slot(self):
+        if not self._local_slots.acquire(timeout=self.config["ACQUIRE_TIMEOUT"]):
+            raise LLMUnavailableError("Too many concurrent LLM requests")
+        try:
+            slot = None
+            if self._global_slots is not None:
+                deadline = time.monotonic() + self.config["ACQUIRE_TIMEOUT"]
+                while (slot := self._global_slots.try_acquire()) is None:
+                    if time.monotonic() > deadline:
+                        raise LLMUnavailableError("Too many concurrent LLM requests")
+                    time.sleep(random.uniform(0.05, 0.25))
+            try:
+                with LLM_IN_FLIGHT.track_inprogress():
+                    yield
+            finally:
+                if slot is not None:
+                    self._global_slots.release(slot)
+        finally:
+            self._local_slots.release()
+
+    @asynccontextmanager
+    async def _aslot(self):
+        deadline = time.monotonic() + self.config["ACQUIRE_TIMEOUT"]
+        if not await self._local_slots.aacquire(self.config["ACQUIRE_TIMEOUT"]):
+            raise LLMUnavailableError("Too many concurrent LLM requests")
+        try:
+            slot = None
+            if self._global_slots is not None:
+                while (slot := await sync_to_async(self._global_slots.try_acquire)()) is None:
+                    if time.monotonic() > deadline:
+                        raise LLMUnavailableError("Too many concurrent LLM requests")
+                    await asyncio.sleep(random.uniform(0.05, 0.25))
+            try:
+                with LLM_IN_FLIGHT.track_inprogress():
+                    yield
+            finally:
+                if slot is not None:
+                    await sync_to_async(self._global_slots.release)(slot)
+        finally:
+            self._local_slots.release()
+
+    def invoke(self, messages, operation="chat"):
+        """``operation`` names the caller (e.g. "study_plan") in the LLM metrics."""
+        with llm_timer(), track_llm_call(operation) as call:
+            return call.record_usage(self._invoke(messages))
+
+    async def ainvoke(self, messages, operation="chat"):
+        with llm_timer(), track_llm_call(operation) as call:
+            return call.record_usage(await self._ainvoke(messages))
+
+    def stream(self, messages, operation="chat"):
+        """Yield chunks; a failed call is only retried if nothing was yielded yet.
+
+        Only the waits for chunks count as LLM time, not the caller's work between them.
+        """
+        with track_llm_call(operation):
+            chunks = self._stream(messages)
+            try:
+                first = True
+                while True:
+                    with llm_timer(count=first):
+                        chunk = next(chunks, None)
+                    if chunk is None:
+                        return
+                    first = False
+                    yield chunk
+            finally:
+                chunks.close()
+
+    async def astream(self, messages, operation="chat"):
+        with track_llm_call(operation):
+            chunks = self._astream(messages)
+            try:
+                first = True
+                while True:
+                    with llm_timer(count=first):
+                        chunk = await anext(chunks, None)
+                    if chunk is None:
+                        return
+                    first = False
+                    yield chunk
+            finally:
+                await chunks.aclose()
+
+    def _invoke(self, messages):
+        ticket = self._check_circuit()
+        outcome = None
+        try:
+            with self._slot():
+                for attempt in range(self.config["MAX_RETRIES"] + 1):
+                    try:
+                        result = self._llm.invoke(messages)
+                        break
+                    except RETRYABLE_ERRORS as e:
+                        if attempt == self.config["MAX_RETRIES"]:
+                            raise
+                        time.sleep(self._retry_delay(attempt, e))
+            outcome = "success"
+            return result
+        except RETRYABLE_ERRORS as e:
+            outcome = "failure"
+            raise LLMUnavailableError(str(e)) from e
+        finally:
+            self.breaker.record(outcome, ticket)
+
+    async def _ainvoke(self, messages):
+        ticket = self._check_circuit()
+        outcome = None
+        try:
+            async with self._aslot():
+                for attempt in range(self.config["MAX_RETRIES"] + 1):
+                    try:
+                        result = await (await self._async_llm()).ainvoke(messages)
+                        break
+                    except RETRYABLE_ERRORS as e:
+                        if attempt == self.config["MAX_RETRIES"]:
+                            raise
+                        await asyncio.sleep(self._retry_delay(attempt, e))
+            outcome = "success"
+            return result
+        except RETRYABLE_ERRORS as e:
+            outcome = "failure"
+            raise LLMUnavailableError(str(e)) from e
+        finally:
+            self.breaker.record(outcome, ticket)
+
+    def _stream(self, messages):
+        ticket = self._check_circuit()
+        outcome = None
+        try:
+            with self._slot():
+                started = False
+                for attempt in range(self.config["MAX_RETRIES"] + 1):
+                    try:
+                        for chunk in self._llm.stream(messages):
+                            started = True
+                            yield chunk
+                        break
+                    except RETRYABLE_ERRORS as e:
+                        if started or attempt == self.config["MAX_RETRIES"]:
+                            raise
+                        time.sleep(self._retry_delay(attempt, e))
+            outcome = "success"
+        except RETRYABLE_ERRORS as e:
+            outcome = "failure"
+            raise LLMUnavailableError(str(e)) from e
+        finally:
+            self.breaker.record(outcome, ticket)
+
+    async def _astream(self, messages):
+        ticket = self._check_circuit()
+        outcome = None
+        try:
+            async with self._aslot():
+                started = False
+                for attempt in range(self.config["MAX_RETRIES"] + 1):
+                    try:
+                        async for chunk in (await self._async_llm()).astream(messages):
+                            started = True
+                            yield chunk
+                        break
+                    except RETRYABLE_ERRORS as e:
+                        if started or attempt == self.config["MAX_RETRIES"]:
+                            raise
+                        await asyncio.sleep(self._retry_delay(attempt, e))
+            outcome = "success"
+        except RETRYABLE_ERRORS as e:
+            outcome = "failure"
+            raise LLMUnavailableError(str(e)) from e
+        finally:
+            self.breaker.record(outcome, ticket)
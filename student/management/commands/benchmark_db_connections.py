@@ -0,0 +1,62 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request database latency with a new connection for every request "
+        "(CONN_MAX_AGE=0) against a persistent, health-checked connection."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Simulated requests per mode.")
+        parser.add_argument("--queries", type=int, default=3, help="Queries run by each simulated request.")
+        parser.add_argument("--database", action="append", dest="databases",
+                            help="Alias to benchmark; repeat to compare, e.g. default (pooler) and direct.")
+
+    def handle(self, *args, **options):
+        aliases = options["databases"] or [DEFAULT_DB_ALIAS]
+        for alias in aliases:
+            if alias not in connections:
+                raise CommandError(f"Unknown database alias {alias!r}")
+
+        self.stdout.write(f"{'database':<10} {'mode':<30} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+        for alias in aliases:
+            results = {}
+            for mode, max_age in (("new connection per request", 0), ("persistent + health checks", None)):
+                timings = self.run(connections[alias], max_age, options["requests"], options["queries"])
+                results[mode] = statistics.median(timings)
+                p95 = statistics.quantiles(timings, n=20)[-1]
+                self.stdout.write(
+                    f"{alias:<10} {mode:<30} {results[mode]:>8.2f} {p95:>8.2f} {statistics.fmean(timings):>8.2f}"
+                )
+            fresh, persistent = results.values()
+            self.stdout.write(f"{alias}: persistent connections cut p50 by {fresh - persistent:.2f} ms "
+                              f"({fresh / persistent:.1f}x)\n")
+
+    def run(self, connection, max_age, requests, queries):
+        """Time ``requests`` simulated requests, with Django's request-boundary connection handling."""
+        settings_dict = connection.settings_dict
+        original = settings_dict["CONN_MAX_AGE"], settings_dict["CONN_HEALTH_CHECKS"]
+        settings_dict["CONN_MAX_AGE"] = 0 if max_age == 0 else 600
+        settings_dict["CONN_HEALTH_CHECKS"] = max_age is None
+        connection.close()
+        timings = []
+        try:
+            for _ in range(requests):
+                started = time.perf_counter()
+                # What the request_started and request_finished signals do.
+                connection.close_if_unusable_or_obsolete()
+                with connection.cursor() as cursor:
+                    for _ in range(queries):
+                        cursor.execute("SELECT 1")
+                        cursor.fetchone()
+                connection.close_if_unusable_or_obsolete()
+                timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            connection.close()
+            settings_dict["CONN_MAX_AGE"], settings_dict["CONN_HEALTH_CHECKS"] = original
+        return timings
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from student.delta_sync import prune_tombstones, sync_settings
+
+
+class Command(BaseCommand):
+    help = "Delete delta sync tombstones older than SYNC['TOMBSTONE_RETENTION_DAYS']."
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+        days = sync_settings()["TOMBSTONE_RETENTION_DAYS"]
+        self.stdout.write(f"Deleted {deleted} tombstones older than {days} days")
@@ -0,0 +1,40 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from student.jobs import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = "Process queued study plan generation jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--poll-interval", type=float, default=1.0,
+                            help="Seconds to sleep when the queue is empty.")
+        parser.add_argument("--burst", action="store_true",
+                            help="Exit once the queue is empty instead of polling.")
+
+    def handle(self, *args, **options):
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        self.stdout.write("Study plan worker started")
+
+        while self.running:
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                if options["burst"]:
+                    break
+                time.sleep(options["poll_interval"])
+                continue
+            job = run_job(job)
+            self.stdout.write(f"Job {job.id}: {job.status} (attempt {job.attempts})")
+
+        self.stdout.write("Study plan worker stopped")
+
+    def stop(self, signum, frame):
+        # Let the current job finish before exiting.
+        self.running = False
@@ -0,0 +1,193 @@
+"""
+Prometheus metrics for the API, the database and the LLM provider.
+
+MetricsMiddleware counts requests and observes per-route latency and query
+counts; LLMClient reports call durations, outcomes and token usage; the LLM
+response cache counts hits by tier. ``/metrics`` serves everything in the
+text exposition format.
+
+Under gunicorn each worker is its own process, so metrics are written to
+``PROMETHEUS_MULTIPROC_DIR`` (set in gunicorn.conf.py) and merged at scrape
+time; without it the process-local registry is served.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connection
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+
+from .profiling import install_query_recorder, request_profile, route_label
+
+DEFAULTS = {
+    "ENABLED": True,
+    # When set, scrapes must send "Authorization: Bearer <TOKEN>".
+    "TOKEN": "",
+}
+
+LLM_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests served", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time to build the response, per route", ["method", "route"]
+)
+HTTP_QUERIES = Histogram(
+    "http_request_db_queries", "Database queries run per request", ["route"], buckets=QUERY_COUNT_BUCKETS
+)
+HTTP_DB_TIME = Histogram(
+    "http_request_db_duration_seconds", "Time spent in database queries per request", ["route"]
+)
+
+LLM_REQUESTS = Counter(
+    "llm_requests_total", "LLM provider calls by outcome", ["operation", "outcome"]
+)
+LLM_LATENCY = Histogram(
+    "llm_request_duration_seconds", "LLM call duration including retries and queueing for a slot",
+    ["operation"], buckets=LLM_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "Tokens reported by the provider", ["operation", "kind"]
+)
+LLM_IN_FLIGHT = Gauge(
+    "llm_requests_in_flight", "LLM calls holding a concurrency slot", multiprocess_mode="livesum"
+)
+
+LLM_CACHE_LOOKUPS = Counter(
+    "llm_cache_lookups_total", "LLM response cache lookups", ["result"]
+)
+
+
+def metrics_settings():
+    return {**DEFAULTS, **getattr(settings, "METRICS", {})}
+
+
+def _outcome(error):
+    from .llm_client import LLMUnavailableError
+
+    if isinstance(error, LLMUnavailableError):
+        return "unavailable"
+    if isinstance(error, Exception):
+        return "error"
+    return "cancelled"
+
+
+class LLMCall:
+    def __init__(self, operation):
+        self.operation = operation
+
+    def record_usage(self, message):
+        """Count the tokens in an AIMessage's ``token_usage`` metadata, when the provider sends it."""
+        metadata = getattr(message, "response_metadata", None) or {}
+        usage = metadata.get("token_usage") or {}
+        for kind in ("prompt_tokens", "completion_tokens"):
+            if usage.get(kind):
+                LLM_TOKENS.labels(self.operation, kind.removesuffix("_tokens")).inc(usage[kind])
+        return message
+
+
+@contextmanager
+def track_llm_call(operation):
+    started = time.perf_counter()
+    outcome = "success"
+    try:
+        yield LLMCall(operation)
+    except BaseException as e:
+        outcome = _outcome(e)
+        raise
+    finally:
+        LLM_LATENCY.labels(operation).observe(time.perf_counter() - started)
+        LLM_REQUESTS.labels(operation, outcome).inc()
+
+
+class DatabaseConnectionCollector:
+    """Server-side connection counts by state, read from pg_stat_activity at scrape time.
+
+    Covers every worker, the job runner and anything else connected to the
+    database, which is what matters when sizing worker counts or a pooler.
+    """
+
+    def collect(self):
+        gauge = GaugeMetricFamily(
+            "db_connections", "Connections to this database by state", labels=["state"]
+        )
+        if connection.vendor == "postgresql":
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT coalesce(state, 'unknown'), count(*) FROM pg_stat_activity "
+                        "WHERE datname = current_database() GROUP BY 1"
+                    )
+                    for state, count in cursor.fetchall():
+                        gauge.add_metric([state], count)
+            except DatabaseError:
+                pass
+        yield gauge
+
+
+# Kept out of the default registry so the query only runs when /metrics is scraped.
+database_registry = CollectorRegistry(auto_describe=False)
+database_registry.register(DatabaseConnectionCollector())
+
+
+def application_registry():
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_view(request):
+    token = metrics_settings()["TOKEN"]
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponseForbidden()
+    body = generate_latest(application_registry()) + generate_latest(database_registry)
+    return HttpResponse(body, content_type=CONTENT_TYPE_LATEST)
+
+
+class MetricsMiddleware:
+    """Per-route request counters, latency and query-count histograms."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not metrics_settings()["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        install_query_recorder()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with request_profile() as profile:
+            response = self.get_response(request)
+            self.observe(request, response, profile, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with request_profile() as profile:
+            response = await self.get_response(request)
+            self.observe(request, response, profile, time.perf_counter() - started)
+        return response
+
+    def observe(self, request, response, profile, duration):
+        route = route_label(request)
+        if route == "/metrics":
+            return
+        HTTP_REQUESTS.labels(request.method, route, response.status_code).inc()
+        HTTP_LATENCY.labels(request.method, route).observe(duration)
+        HTTP_QUERIES.labels(route).observe(len(profile.queries))
+        HTTP_DB_TIME.labels(route).observe(profile.db_time)
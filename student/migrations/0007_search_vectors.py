@@ -0,0 +1,85 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:42
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# table -> [(column, weight), ...]
+SEARCH_COLUMNS = {
+    'student_flashcard': [('front_text', 'A'), ('back_text', 'B')],
+    'student_deck': [('name', 'A'), ('description', 'B')],
+    'student_discussion': [('message', 'A')],
+}
+
+
+def vector_expression(columns, row):
+    return ' || '.join(
+        f"setweight(to_tsvector('english', coalesce({row}{column}, '')), '{weight}')"
+        for column, weight in columns
+    )
+
+
+def trigger_sql(table, columns):
+    column_list = ', '.join(column for column, _ in columns)
+    return f"""
+        CREATE FUNCTION {table}_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {vector_expression(columns, 'NEW.')};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER {table}_search_vector_trigger
+            BEFORE INSERT OR UPDATE OF {column_list} ON {table}
+            FOR EACH ROW EXECUTE FUNCTION {table}_search_vector_update();
+
+        UPDATE {table} SET search_vector = {vector_expression(columns, '')};
+    """
+
+
+def drop_trigger_sql(table):
+    return f"""
+        DROP TRIGGER IF EXISTS {table}_search_vector_trigger ON {table};
+        DROP FUNCTION IF EXISTS {table}_search_vector_update();
+    """
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0006_reviewsyncbatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deck',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='discussion',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='flashcard',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+    ] + [
+        migrations.RunSQL(trigger_sql(table, columns), drop_trigger_sql(table))
+        for table, columns in SEARCH_COLUMNS.items()
+    ] + [
+        migrations.AddIndex(
+            model_name='deck',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='deck_search_vector'),
+        ),
+        migrations.AddIndex(
+            model_name='discussion',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='discussion_search_vector'),
+        ),
+        migrations.AddIndex(
+            model_name='flashcard',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='flashcard_search_vector'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def backfill_friend_edges(apps, schema_editor):
+    Friendship = apps.get_model('student', 'Friendship')
+    FriendEdge = apps.get_model('student', 'FriendEdge')
+    edges = []
+    for sender_id, receiver_id in Friendship.objects.filter(status='accepted').values_list('sender_id', 'receiver_id').iterator():
+        edges.append(FriendEdge(student_id=sender_id, friend_id=receiver_id))
+        edges.append(FriendEdge(student_id=receiver_id, friend_id=sender_id))
+    FriendEdge.objects.bulk_create(edges, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0008_student_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FriendEdge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('friend', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='student.student')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='friend_edges', to='student.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['friend', 'student'], name='friendedge_friend_student')],
+                'unique_together': {('student', 'friend')},
+            },
+        ),
+        migrations.RunPython(backfill_friend_edges, migrations.RunPython.noop),
+    ]
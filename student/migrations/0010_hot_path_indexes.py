@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0009_friendedge'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dashboardmodule',
+            index=models.Index(fields=['student', 'is_active'], name='dashboardmodule_student_active'),
+        ),
+        migrations.AddIndex(
+            model_name='dashboardmodule',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['student'], name='dashboardmodule_active'),
+        ),
+        migrations.AddIndex(
+            model_name='friendship',
+            index=models.Index(fields=['sender', 'status'], name='friendship_sender_status'),
+        ),
+        migrations.AddIndex(
+            model_name='friendship',
+            index=models.Index(fields=['receiver', 'status'], name='friendship_receiver_status'),
+        ),
+        migrations.AddIndex(
+            model_name='friendship',
+            index=models.Index(condition=models.Q(('status', 'blocked')), fields=['sender'], name='friendship_blocked_sender'),
+        ),
+        migrations.AddIndex(
+            model_name='friendship',
+            index=models.Index(condition=models.Q(('status', 'blocked')), fields=['receiver'], name='friendship_blocked_receiver'),
+        ),
+        migrations.AddIndex(
+            model_name='savedstudyplan',
+            index=models.Index(fields=['student', 'status'], name='savedstudyplan_student_status'),
+        ),
+        migrations.AddIndex(
+            model_name='studychatbox',
+            index=models.Index(fields=['student', 'timestamp', 'id'], name='studychatbox_student_time'),
+        ),
+        migrations.AddIndex(
+            model_name='wellnesschat',
+            index=models.Index(fields=['student', 'timestamp', 'id'], name='wellnesschat_student_time'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:14
+
+from django.db import migrations, models
+
+from student.recurrence import series_end
+
+
+def backfill_series_end(apps, schema_editor):
+    Event = apps.get_model('student', 'Event')
+    events = list(Event.objects.all().only('start_datetime', 'end_datetime', 'recurring_rule'))
+    for event in events:
+        event.series_end = series_end(event.recurring_rule, event.start_datetime, event.end_datetime)
+    Event.objects.bulk_update(events, ['series_end'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0011_delta_sync'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='series_end',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['end_datetime', 'start_datetime'], name='event_end_start'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('recurring_rule__gt', '')), fields=['series_end', 'start_datetime'], name='event_recurring_series'),
+        ),
+        migrations.RunPython(backfill_series_end, migrations.RunPython.noop),
+    ]
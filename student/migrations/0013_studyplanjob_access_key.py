@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0012_event_recurrence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studyplanjob',
+            name='access_key',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
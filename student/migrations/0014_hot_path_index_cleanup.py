@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0013_studyplanjob_access_key'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='dashboardmodule',
+            name='dashboardmodule_active',
+        ),
+        migrations.AlterField(
+            model_name='dashboardmodule',
+            name='student',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_modules', to='student.student'),
+        ),
+        migrations.AlterField(
+            model_name='friendship',
+            name='receiver',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='received_relationships', to='student.student'),
+        ),
+        migrations.AlterField(
+            model_name='friendship',
+            name='sender',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='sent_relationships', to='student.student'),
+        ),
+        migrations.AlterField(
+            model_name='savedstudyplan',
+            name='student',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='saved_study_plans', to='student.student'),
+        ),
+        migrations.AlterField(
+            model_name='studychatbox',
+            name='student',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='study_chatboxes', to='student.student'),
+        ),
+        migrations.AlterField(
+            model_name='wellnesschat',
+            name='student',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='wellness_chat', to='student.student'),
+        ),
+    ]
@@ -1,8 +1,13 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models.functions import Upper
 from django.utils.timezone import now
 from enum import Enum
 from django.contrib.auth.models import User
 
+from . import recurrence
+
 
 class Student(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True)
@@ -11,6 +16,12 @@ class Student(models.Model):
     course_name = models.CharField(max_length=100, default="Unknown")
     created_at = models.DateTimeField(default=now)
     updated_at = models.DateTimeField(auto_now=True)
+    class Meta:
+        indexes = [
+            # Trigram indexes for the typeahead lookup (student.search.typeahead_students)
+            GinIndex(OpClass(Upper("name"), name="gin_trgm_ops"), name="student_name_trgm"),
+            GinIndex(OpClass(Upper("email"), name="gin_trgm_ops"), name="student_email_trgm"),
+        ]
     def __str__(self):
         return self.name
 
@@ -20,6 +31,13 @@ class Deck(models.Model):
     created_at = models.DateTimeField(default=now)
     updated_at = models.DateTimeField(auto_now=True)
     owner = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="decks")
+    # Maintained by a database trigger (see migration 0007_search_vectors)
+    search_vector = SearchVectorField(null=True, editable=False)
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="deck_search_vector"),
+            models.Index(fields=["owner", "updated_at"], name="deck_owner_updated_at"),
+        ]
     def __str__(self):
         return self.name
     
@@ -30,14 +48,28 @@ class StudyCategory(Enum):
     GENERAL = "GENERAL"
 # --- Study Chatbox ---
 class StudyChatbox(models.Model):
-    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="study_chatboxes", null=True)
+    # Covered by studychatbox_student_time, which leads with student
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="study_chatboxes", null=True, db_index=False)
     user_message = models.TextField()
     bot_response = models.TextField()
     category = models.CharField(max_length=50, choices=[(tag.value, tag.name) for tag in StudyCategory])
     timestamp = models.DateTimeField(default=now)
+    class Meta:
+        indexes = [
+            models.Index(fields=["student", "timestamp", "id"], name="studychatbox_student_time"),
+        ]
     def __str__(self):
         return f"Chat - {self.student.name}"
 
+class StudyChatSummary(models.Model):
+    """Rolling summary of a student's older StudyChatbox turns, reused across follow-ups."""
+    student = models.OneToOneField(Student, on_delete=models.CASCADE, related_name="study_chat_summary")
+    summary = models.TextField(blank=True)
+    summarized_until = models.BigIntegerField(default=0, help_text="Highest StudyChatbox id folded into the summary")
+    updated_at = models.DateTimeField(auto_now=True)
+    def __str__(self):
+        return f"Chat summary - {self.student.name}"
+
 class Flashcard(models.Model):
     front_text = models.TextField(max_length=1000)
     back_text = models.TextField(max_length=1000)
@@ -47,8 +79,30 @@ class Flashcard(models.Model):
     created_date = models.DateTimeField(default=now)
     category = models.CharField(max_length=50, blank=True, null=True)
     deck = models.ForeignKey(Deck, on_delete=models.CASCADE, related_name="flashcards")
+    # Spaced-repetition state, maintained by student.srs
+    ease_factor = models.FloatField(default=2.5)
+    interval_days = models.PositiveIntegerField(default=0)
+    repetitions = models.PositiveIntegerField(default=0)
+    due_at = models.DateTimeField(default=now, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Maintained by a database trigger (see migration 0007_search_vectors)
+    search_vector = SearchVectorField(null=True, editable=False)
+    class Meta:
+        indexes = [
+            models.Index(fields=["deck", "due_at"], name="flashcard_deck_due_at"),
+            models.Index(fields=["deck", "updated_at"], name="flashcard_deck_updated_at"),
+            GinIndex(fields=["search_vector"], name="flashcard_search_vector"),
+        ]
     def __str__(self):
         return f"Flashcard ({self.front_text[:30]}...)"
+class ReviewSyncBatch(models.Model):
+    """A batch of offline reviews, keyed by the client's idempotency key so a retried sync is applied once."""
+    idempotency_key = models.CharField(max_length=64, unique=True)
+    payload_hash = models.CharField(max_length=64)
+    result = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=now)
+    def __str__(self):
+        return f"Review sync {self.idempotency_key}"
 class Friendship(models.Model):
     STATUS_CHOICES = [
         ("pending", "Pending"),
@@ -56,13 +110,21 @@ class Friendship(models.Model):
         ("rejected", "Rejected"),
         ("blocked", "Blocked"),
     ]
-    sender = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="sent_relationships")
-    receiver = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="received_relationships")
+    # Covered by the (sender, status) and (receiver, status) indexes below
+    sender = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="sent_relationships", db_index=False)
+    receiver = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="received_relationships", db_index=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
     created_at = models.DateTimeField(default=now)
     updated_at = models.DateTimeField(auto_now=True)
     class Meta:
         unique_together = ('sender', 'receiver')
+        indexes = [
+            models.Index(fields=["sender", "status"], name="friendship_sender_status"),
+            models.Index(fields=["receiver", "status"], name="friendship_receiver_status"),
+            # Block checks run on every friend request and typeahead lookup
+            models.Index(fields=["sender"], condition=models.Q(status="blocked"), name="friendship_blocked_sender"),
+            models.Index(fields=["receiver"], condition=models.Q(status="blocked"), name="friendship_blocked_receiver"),
+        ]
     def clean(self):
         if self.sender == self.receiver:
             raise Exception("A student cannot have a relationship with themselves.")
@@ -87,6 +149,24 @@ class FriendshipHistory(models.Model):
     def __str__(self):
         return f"{self.student.name} - {self.action}"
 
+class FriendEdge(models.Model):
+    """One direction of an accepted friendship; every friendship has both rows.
+
+    Derived from Friendship by the signal handlers in student/signals.py, so
+    friend lookups are a single-column scan instead of an OR over sender and
+    receiver.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="friend_edges")
+    friend = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField(default=now)
+    class Meta:
+        unique_together = ('student', 'friend')
+        indexes = [
+            models.Index(fields=["friend", "student"], name="friendedge_friend_student"),
+        ]
+    def __str__(self):
+        return f"{self.student_id} -> {self.friend_id}"
+
 class Group(models.Model):
     name = models.CharField(max_length=50, unique=True)
     description = models.TextField(max_length=500, blank=True)
@@ -103,10 +183,29 @@ class Event(models.Model):
     start_datetime = models.DateTimeField()
     end_datetime = models.DateTimeField()
     recurring_rule = models.CharField(max_length=255, blank=True, null=True)
+    # End of the last occurrence; null for unbounded series (see student/recurrence.py)
+    series_end = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(default=now)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     participants = models.ManyToManyField(Student, related_name="events", blank=True)
     groups = models.ManyToManyField(Group, related_name="events", blank=True)
+    class Meta:
+        indexes = [
+            # Window queries: GET /api/events/?start=&end=
+            models.Index(fields=["end_datetime", "start_datetime"], name="event_end_start"),
+            models.Index(
+                fields=["series_end", "start_datetime"], condition=models.Q(recurring_rule__gt=""),
+                name="event_recurring_series",
+            ),
+        ]
+    def save(self, *args, **kwargs):
+        start = self._meta.get_field("start_datetime").to_python(self.start_datetime)
+        end = self._meta.get_field("end_datetime").to_python(self.end_datetime)
+        self.series_end = recurrence.series_end(self.recurring_rule, start, end)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "series_end" not in update_fields:
+            kwargs["update_fields"] = {*update_fields, "series_end"}
+        super().save(*args, **kwargs)
     def __str__(self):
         return self.event_title
 
@@ -115,6 +214,12 @@ class Discussion(models.Model):
     group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name="discussions")
     message = models.TextField()
     timestamp = models.DateTimeField(default=now)
+    # Maintained by a database trigger (see migration 0007_search_vectors)
+    search_vector = SearchVectorField(null=True, editable=False)
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="discussion_search_vector"),
+        ]
     def __str__(self):
         return f"Discussion by {self.author.name}"
 
@@ -125,21 +230,32 @@ class SavedStudyPlan(models.Model):
         ('unsaved', 'Unsaved'),
         ('saved', 'Saved'),
     )
-    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="saved_study_plans")
+    # Covered by savedstudyplan_student_status
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="saved_study_plans", db_index=False)
     plan_content = models.TextField(help_text="Final approved study plan", blank=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='unsaved')
     created_at = models.DateTimeField(default=now)
     updated_at = models.DateTimeField(auto_now=True)
+    class Meta:
+        indexes = [
+            models.Index(fields=["student", "status"], name="savedstudyplan_student_status"),
+        ]
     def __str__(self):
         return f"Study Plan for {self.student.name} ({self.status})"
 
 class DashboardModule(models.Model):
-    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="dashboard_modules")
+    # Covered by dashboardmodule_student_active
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="dashboard_modules", db_index=False)
     title = models.CharField(max_length=200)
     saved_study_plan = models.ForeignKey(SavedStudyPlan, on_delete=models.SET_NULL, null=True, blank=True, related_name="dashboard_modules")
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(default=now)
     updated_at = models.DateTimeField(auto_now=True)
+    class Meta:
+        indexes = [
+            models.Index(fields=["student", "is_active"], name="dashboardmodule_student_active"),
+            models.Index(fields=["student", "updated_at"], name="dashboardmodule_student_upd"),
+        ]
     def __str__(self):
         return self.title.upper()
 
@@ -149,9 +265,63 @@ class Lesson(models.Model):
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(default=now)
     updated_at = models.DateTimeField(auto_now=True)
+    class Meta:
+        indexes = [
+            models.Index(fields=["dashboard_module", "updated_at"], name="lesson_module_updated_at"),
+        ]
     def __str__(self):
         return self.title.upper()
 
+
+class Tombstone(models.Model):
+    """Marks a deleted row so delta sync (GET /api/sync/) can tell clients to drop it.
+
+    ``student`` is who should hear about the deletion. A shared event gets
+    one tombstone per student who could see it.
+    """
+    model = models.CharField(max_length=32)
+    object_id = models.BigIntegerField()
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    deleted_at = models.DateTimeField(default=now)
+    class Meta:
+        indexes = [
+            models.Index(fields=["student", "deleted_at"], name="tombstone_student_deleted_at"),
+            models.Index(fields=["deleted_at"], name="tombstone_deleted_at"),
+        ]
+    def __str__(self):
+        return f"Deleted {self.model} {self.object_id}"
+
+
+class StudyPlanJob(models.Model):
+    """A study plan generation request processed by the run_study_plan_worker command."""
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("succeeded", "Succeeded"),
+        ("failed", "Failed"),
+    ]
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="study_plan_jobs", null=True, blank=True)
+    prompt = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    result = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    dashboard_module = models.ForeignKey(DashboardModule, on_delete=models.SET_NULL, null=True, blank=True, related_name="study_plan_jobs")
+    saved_study_plan = models.ForeignKey(SavedStudyPlan, on_delete=models.SET_NULL, null=True, blank=True, related_name="jobs")
+    # Lets an anonymous requester read back a job that has no student
+    access_key = models.CharField(max_length=64, blank=True, editable=False)
+    created_at = models.DateTimeField(default=now)
+    updated_at = models.DateTimeField(auto_now=True)
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="studyplanjob_status_run_after"),
+        ]
+    def __str__(self):
+        return f"Study plan job {self.id} ({self.status})"
+
       
 # #Alag's wellnessmodels    
 # class WellnessChatSession(models.Model):
@@ -173,11 +343,16 @@ class Lesson(models.Model):
 
 #Heng Wellness model
 class WellnessChat(models.Model):
+    # Covered by wellnesschat_student_time
     student = models.ForeignKey(Student, on_delete=models.CASCADE, 
-              related_name="wellness_chat", null=True)
+              related_name="wellness_chat", null=True, db_index=False)
     message = models.TextField()
     timestamp = models.DateTimeField(default=now)
     is_bot = models.BooleanField(default=False) 
+    class Meta:
+        indexes = [
+            models.Index(fields=["student", "timestamp", "id"], name="wellnesschat_student_time"),
+        ]
     def __str__(self):
         return f"Chat - {self.student.name}"
 
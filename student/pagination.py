@@ -0,0 +1,111 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+Pages are selected with ``WHERE id > <last seen id> ORDER BY id LIMIT n``
+rather than OFFSET, so each request reads a bounded number of rows however
+big the table grows. The ``cursor`` query parameter is opaque to clients;
+they just follow the ``next`` link.
+
+Relevance-ranked results have no stable key to page on, so search endpoints
+use RankedPagination instead: plain page numbers, with a look-ahead row in
+place of a COUNT query.
+"""
+from django.conf import settings
+from rest_framework import pagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .eager_loading import eager
+
+
+class CursorPagination(pagination.CursorPagination):
+    ordering = "id"
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+    def get_link_header(self):
+        links = [
+            f'<{url}>; rel="{rel}"'
+            for rel, url in (("next", self.get_next_link()), ("prev", self.get_previous_link()))
+            if url
+        ]
+        return ", ".join(links)
+
+    def get_paginated_response(self, data):
+        # Viewsets keep returning a bare list; page links go in the Link header.
+        response = Response(data)
+        link_header = self.get_link_header()
+        if link_header:
+            response["Link"] = link_header
+        return response
+
+
+class RankedPagination(pagination.BasePagination):
+    page_size = settings.API_PAGE_SIZE
+    page_query_param = "page"
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            self.page = max(int(request.query_params.get(self.page_query_param, 1)), 1)
+        except ValueError:
+            self.page = 1
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+            self.size = min(max(size, 1), self.max_page_size)
+        except ValueError:
+            self.size = self.page_size
+        offset = (self.page - 1) * self.size
+        rows = list(queryset[offset:offset + self.size + 1])
+        self.has_next = len(rows) > self.size
+        return rows[:self.size]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.page_query_param, self.page + 1)
+
+    def get_previous_link(self):
+        if self.page == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page - 1)
+
+    get_link_header = CursorPagination.get_link_header
+
+
+class PaginatedResponseMixin:
+    """Adds ``paginated_response`` to plain APIViews that list a queryset.
+
+    The serializer's eager loading is applied before the page is fetched.
+    """
+    pagination_class = None
+
+    def paginated_response(self, queryset, serializer_class, message=None):
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(eager(serializer_class, queryset), self.request, view=self)
+        body = {
+            "data": serializer_class(page, many=True).data,
+            "next": paginator.get_next_link(),
+            "previous": paginator.get_previous_link(),
+        }
+        if message:
+            body = {"message": message, **body}
+        response = Response(body, status=200)
+        link_header = paginator.get_link_header()
+        if link_header:
+            response["Link"] = link_header
+        return response
+
+
+class CursorPaginationMixin(PaginatedResponseMixin):
+    pagination_class = CursorPagination
+
+
+class RankedPaginationMixin(PaginatedResponseMixin):
+    pagination_class = RankedPagination
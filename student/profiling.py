@@ -0,0 +1,290 @@
+"""
+Per-request profiling: wall time, SQL time and count, duplicate queries and
+time spent waiting on the LLM.
+
+ProfilingMiddleware is opt-in (``PROFILING["ENABLED"]``). For each request it
+adds a ``Server-Timing`` header that browser dev tools display, logs
+requests over the slow thresholds as one JSON line with their SQL, and keeps
+per-route totals that admins can read from ``/api/metrics/profiling/``.
+
+The active profile lives in a context variable, so queries run from
+``sync_to_async`` threads and LLM calls made deep inside ``ai_utils`` are
+attributed to the request that caused them.
+"""
+import json
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "ENABLED": False,
+    "SLOW_REQUEST_MS": 500,
+    "SLOW_QUERY_COUNT": 50,
+    "LOGGED_QUERIES": 10,
+}
+
+_current = ContextVar("request_profile", default=None)
+
+
+def profiling_settings():
+    return {**DEFAULTS, **getattr(settings, "PROFILING", {})}
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.wall = 0.0
+        self.queries = []
+        self.llm_time = 0.0
+        self.llm_calls = 0
+
+    def finish(self):
+        self.wall = time.perf_counter() - self.started
+
+    @property
+    def db_time(self):
+        return sum(duration for _, _, duration in self.queries)
+
+    @property
+    def duplicate_queries(self):
+        """Queries that repeat an earlier statement with the same parameters."""
+        counts = Counter((sql, repr(params)) for sql, params, _ in self.queries)
+        return sum(count - 1 for count in counts.values())
+
+    def server_timing(self):
+        metrics = [
+            f"total;dur={self.wall * 1000:.1f}",
+            f'db;dur={self.db_time * 1000:.1f};desc="{len(self.queries)} queries, {self.duplicate_queries} duplicate"',
+        ]
+        if self.llm_calls:
+            metrics.append(f'llm;dur={self.llm_time * 1000:.1f};desc="{self.llm_calls} calls"')
+        return ", ".join(metrics)
+
+
+def _record_query(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.queries.append((sql, params, time.perf_counter() - started))
+
+
+def _install_query_recorder(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def install_query_recorder():
+    """Record queries on every connection, current and future, while a profile is active."""
+    connection_created.connect(_install_query_recorder, dispatch_uid="profiling_query_recorder")
+    for connection in connections.all(initialized_only=True):
+        _install_query_recorder(connection)
+
+
+@contextmanager
+def request_profile():
+    """The profile of the request being served; starts one if no outer middleware has."""
+    profile = _current.get()
+    if profile is not None:
+        yield profile
+        return
+    token = _current.set(RequestProfile())
+    try:
+        yield _current.get()
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def llm_timer(count=True):
+    """Charge the enclosed LLM call to the current request, if it is being profiled.
+
+    Streams time each wait for a chunk separately and count the call once.
+    """
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.llm_time += time.perf_counter() - started
+        profile.llm_calls += int(count)
+
+
+class RouteStats:
+    """Process-wide totals per URL route."""
+
+    FIELDS = ("requests", "wall_ms", "max_wall_ms", "db_ms", "queries", "duplicate_queries", "llm_ms", "slow")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = defaultdict(lambda: dict.fromkeys(self.FIELDS, 0))
+
+    def record(self, route, profile, slow):
+        wall_ms = profile.wall * 1000
+        with self._lock:
+            stats = self._routes[route]
+            stats["requests"] += 1
+            stats["wall_ms"] += wall_ms
+            stats["max_wall_ms"] = max(stats["max_wall_ms"], wall_ms)
+            stats["db_ms"] += profile.db_time * 1000
+            stats["queries"] += len(profile.queries)
+            stats["duplicate_queries"] += profile.duplicate_queries
+            stats["llm_ms"] += profile.llm_time * 1000
+            stats["slow"] += int(slow)
+
+    def snapshot(self):
+        """Routes with their totals and per-request means, slowest total first."""
+        with self._lock:
+            routes = {route: dict(stats) for route, stats in self._routes.items()}
+        rows = []
+        for route, stats in routes.items():
+            count = stats["requests"]
+            rows.append({
+                "route": route,
+                **{field: round(value, 1) for field, value in stats.items()},
+                "mean_wall_ms": round(stats["wall_ms"] / count, 1),
+                "mean_queries": round(stats["queries"] / count, 1),
+            })
+        return sorted(rows, key=lambda row: row["wall_ms"], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+
+route_stats = RouteStats()
+
+
+def route_label(request):
+    """The URL pattern that served ``request``, e.g. ``/api/decks/update/<int:deck_id>/``."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<unresolved>"
+    return "/" + match.route if match.route else match.view_name
+
+
+class ProfilingMiddleware:
+    """Opt-in request profiling; removes itself when ``PROFILING["ENABLED"]`` is off."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.config = profiling_settings()
+        if not self.config["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        install_query_recorder()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with request_profile() as profile:
+            response = self.get_response(request)
+            return self.process_response(request, response, profile)
+
+    async def __acall__(self, request):
+        with request_profile() as profile:
+            response = await self.get_response(request)
+            return self.process_response(request, response, profile)
+
+    def process_response(self, request, response, profile):
+        profile.finish()
+        existing = response.get("Server-Timing")
+        # A streamed body is produced after the headers are sent, so its header
+        # only covers the time to the first byte.
+        timing = profile.server_timing()
+        response["Server-Timing"] = f"{existing}, {timing}" if existing else timing
+        if response.streaming:
+            stream = self.aprofile_stream if response.is_async else self.profile_stream
+            response.streaming_content = stream(request, response, profile, response.streaming_content)
+        else:
+            self.record(request, response, profile)
+        return response
+
+    def profile_stream(self, request, response, profile, content):
+        """Keep the profile active while the body is generated and record the request once it ends."""
+        try:
+            while True:
+                token = _current.set(profile)
+                try:
+                    chunk = next(content, None)
+                finally:
+                    _current.reset(token)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            profile.finish()
+            self.record(request, response, profile)
+
+    async def aprofile_stream(self, request, response, profile, content):
+        content = aiter(content)
+        try:
+            while True:
+                token = _current.set(profile)
+                try:
+                    chunk = await anext(content, None)
+                finally:
+                    _current.reset(token)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            profile.finish()
+            self.record(request, response, profile)
+
+    def record(self, request, response, profile):
+        route = route_label(request)
+        slow = (
+            profile.wall * 1000 >= self.config["SLOW_REQUEST_MS"]
+            or len(profile.queries) >= self.config["SLOW_QUERY_COUNT"]
+        )
+        route_stats.record(route, profile, slow)
+        if slow:
+            self.log_slow_request(request, response, route, profile)
+        return response
+
+    def log_slow_request(self, request, response, route, profile):
+        slowest = sorted(profile.queries, key=lambda query: query[2], reverse=True)
+        repeated = Counter(sql for sql, _, _ in profile.queries)
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "route": route,
+            "status": response.status_code,
+            "wall_ms": round(profile.wall * 1000, 1),
+            "db_ms": round(profile.db_time * 1000, 1),
+            "llm_ms": round(profile.llm_time * 1000, 1),
+            "queries": len(profile.queries),
+            "duplicate_queries": profile.duplicate_queries,
+            "slowest_queries": [
+                {"sql": sql, "ms": round(duration * 1000, 2)}
+                for sql, _, duration in slowest[:self.config["LOGGED_QUERIES"]]
+            ],
+            # The same statement run many times with different parameters is
+            # usually an N+1 loop.
+            "repeated_statements": [
+                {"sql": sql, "count": count}
+                for sql, count in repeated.most_common(self.config["LOGGED_QUERIES"]) if count > 1
+            ],
+        }
+        logger.warning("Slow request %s", json.dumps(record, default=str))
@@ -0,0 +1,153 @@
+"""
+Expansion of ``Event.recurring_rule`` into occurrences inside a time window.
+
+Rules are RFC 5545 recurrence text as accepted by ``dateutil.rrule.rrulestr``:
+a bare ``FREQ=WEEKLY;BYDAY=MO,WE`` or ``RRULE:`` line, optionally with
+``EXDATE``/``RDATE`` lines. The event's start is DTSTART and every occurrence
+lasts as long as the first one.
+
+Expansion is lazy: occurrences are generated from the window start onwards
+and generation stops at the window end, so an unbounded daily rule costs the
+same as a weekly one. Expansions are cached per event, keyed on its
+``updated_at``, so editing an event (or its participants) makes the old entry
+unreachable.
+
+``Event.series_end`` stores when a finite series finishes (null for unbounded
+ones) so ``overlapping()`` can find candidate events with an index range scan
+instead of expanding every recurring event in the table.
+"""
+import functools
+import hashlib
+import itertools
+import logging
+
+from dateutil.rrule import rrulestr
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "CACHE": "default",
+    "TTL": 3600,
+    # Occurrences returned per event per window, and counted when working out
+    # series_end; a longer finite series is treated as unbounded.
+    "MAX_OCCURRENCES": 1000,
+    "MAX_WINDOW_DAYS": 366,
+}
+
+
+class InvalidRule(ValueError):
+    pass
+
+
+def recurrence_settings():
+    return {**DEFAULTS, **getattr(settings, "RECURRENCE", {})}
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_rule(rule, dtstart):
+    """The occurrence set of ``rule`` starting at ``dtstart``; raises InvalidRule."""
+    try:
+        return rrulestr(rule.strip(), dtstart=dtstart, forceset=True)
+    except (ValueError, TypeError) as e:
+        raise InvalidRule(f"Invalid recurring rule: {e}") from None
+
+
+def is_bounded(rule):
+    """Whether every RRULE in ``rule`` ends, through COUNT or UNTIL."""
+    lines = [line.upper() for line in rule.strip().splitlines() if line.strip()]
+    rrules = [line for line in lines if line.startswith(("RRULE:", "FREQ="))]
+    return all("COUNT=" in line or "UNTIL=" in line for line in rrules)
+
+
+def validate_rule(rule, dtstart):
+    """Parse ``rule`` and generate its first occurrence, which is where bad UNTIL values surface."""
+    occurrences = parse_rule(rule, dtstart)
+    try:
+        next(iter(occurrences), None)
+    except (ValueError, TypeError) as e:
+        raise InvalidRule(f"Invalid recurring rule: {e}") from None
+
+
+def series_end(rule, start, end):
+    """When the last occurrence of a series ends, or None if it never does (or runs past the cap)."""
+    if not rule:
+        return end
+    if not is_bounded(rule):
+        return None
+    try:
+        occurrences = parse_rule(rule, start)
+        limit = recurrence_settings()["MAX_OCCURRENCES"]
+        last = None
+        for count, last in enumerate(occurrences, 1):
+            if count > limit:
+                return None
+    except (InvalidRule, ValueError, TypeError):
+        return None
+    return (last or start) + (end - start)
+
+
+def overlapping(queryset, window_start, window_end):
+    """Events in ``queryset`` that may have an occurrence inside the window."""
+    single = Q(start_datetime__lt=window_end, end_datetime__gt=window_start)
+    recurring = Q(recurring_rule__gt="", start_datetime__lt=window_end) & (
+        Q(series_end__isnull=True) | Q(series_end__gt=window_start)
+    )
+    return queryset.filter(single | recurring)
+
+
+def _overlaps(start, end, window_start, window_end):
+    return start < window_end and end > window_start
+
+
+def _recurring_starts(event, window_start, window_end, limit):
+    duration = event.end_datetime - event.start_datetime
+    try:
+        occurrences = parse_rule(event.recurring_rule, event.start_datetime)
+        # Occurrences that started before the window but are still running count too.
+        starts = occurrences.xafter(window_start - duration, inc=False)
+        return list(itertools.islice(itertools.takewhile(lambda start: start < window_end, starts), limit))
+    except (InvalidRule, ValueError, TypeError):
+        logger.warning("Event %s has an unusable recurring rule %r", event.pk, event.recurring_rule)
+        if _overlaps(event.start_datetime, event.end_datetime, window_start, window_end):
+            return [event.start_datetime]
+        return []
+
+
+def _cache_key(event, window_start, window_end):
+    fingerprint = f"{event.pk}|{event.updated_at.isoformat()}|{window_start.isoformat()}|{window_end.isoformat()}"
+    return "recurrence:" + hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+
+def expand(events, window_start, window_end):
+    """(event, start, end) for every occurrence overlapping the window, in start order.
+
+    Recurring events' expansions are cached until the event changes.
+    """
+    config = recurrence_settings()
+    cache = caches[config["CACHE"]]
+    recurring = [event for event in events if event.recurring_rule]
+    keys = {event.pk: _cache_key(event, window_start, window_end) for event in recurring}
+    cached = cache.get_many(keys.values()) if keys else {}
+    missing = {}
+
+    occurrences = []
+    for event in events:
+        duration = event.end_datetime - event.start_datetime
+        if not event.recurring_rule:
+            starts = [event.start_datetime]
+        elif keys[event.pk] in cached:
+            starts = cached[keys[event.pk]]
+        else:
+            starts = _recurring_starts(event, window_start, window_end, config["MAX_OCCURRENCES"])
+            missing[keys[event.pk]] = starts
+        occurrences.extend(
+            (event, start, start + duration) for start in starts
+            if _overlaps(start, start + duration, window_start, window_end)
+        )
+    if missing:
+        cache.set_many(missing, timeout=config["TTL"])
+    occurrences.sort(key=lambda occurrence: (occurrence[1], occurrence[0].pk))
+    return occurrences
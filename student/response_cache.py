@@ -0,0 +1,132 @@
+"""
+Response cache with ETags for read-heavy GET endpoints.
+
+A cached view names the scopes its output depends on, e.g.
+``decks:student:7`` for one student's decks. Each scope has an opaque version
+token in the cache. The response key and ETag are a hash of the request path,
+the renderer format and those tokens, so:
+
+* a repeat GET is served from the cache without touching the database, and a
+  request whose ``If-None-Match`` matches gets a 304 straight away;
+* a write invalidates by giving the affected scopes new tokens (see
+  ``signals.py``), once its transaction commits. Stale entries are never
+  read again and simply age out.
+
+Version tokens must be visible to every worker, so in a multi-worker
+deployment ``RESPONSE_CACHE["CACHE"]`` has to name a shared cache such as
+Redis, memcached or the database cache. The default in-process cache is only
+correct with a single worker; ``gunicorn.conf.py`` refuses to start more than
+one worker with it (see ``require_shared_cache``).
+"""
+import functools
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+DEFAULTS = {
+    "ENABLED": True,
+    "CACHE": "default",
+    "TTL": 300,
+}
+
+# Response headers kept with the cached body (page links for paginated lists).
+CACHED_HEADERS = ("Link",)
+
+
+def response_cache_settings():
+    return {**DEFAULTS, **getattr(settings, "RESPONSE_CACHE", {})}
+
+
+def _cache():
+    return caches[response_cache_settings()["CACHE"]]
+
+
+def require_shared_cache(workers):
+    """Raise ImproperlyConfigured if ``workers`` processes would each get their own response cache.
+
+    A write only rotates the version tokens of the worker that served it, so
+    the others would keep answering with the old body, or a 304, until TTL.
+    """
+    config = response_cache_settings()
+    if workers > 1 and config["ENABLED"] and isinstance(_cache(), LocMemCache):
+        raise ImproperlyConfigured(
+            f"RESPONSE_CACHE['CACHE'] ({config['CACHE']!r}) is a per-process LocMemCache, which "
+            f"{workers} workers cannot share. Point RESPONSE_CACHE_ALIAS at a shared cache, set "
+            "RESPONSE_CACHE_ENABLED=False or run a single worker."
+        )
+
+
+def _version_key(scope):
+    return f"respcache:version:{scope}"
+
+
+def scope_versions(scopes):
+    """Current version token of each scope, creating tokens for new scopes."""
+    cache = _cache()
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in versions}
+    if missing:
+        # add() so two workers creating the same scope agree on one token.
+        for key, token in missing.items():
+            if not cache.add(key, token, timeout=None):
+                token = cache.get(key) or token
+            versions[key] = token
+    return [versions[key] for key in keys]
+
+
+def invalidate(*scopes):
+    """Give ``scopes`` new version tokens once the current transaction commits."""
+    if not scopes:
+        return
+
+    def rotate():
+        _cache().set_many({_version_key(scope): uuid.uuid4().hex for scope in scopes}, timeout=None)
+
+    transaction.on_commit(rotate)
+
+
+def cache_response(scopes):
+    """Cache a GET handler's 200 responses under ``scopes(request, **kwargs)``.
+
+    Works on APIView methods and ViewSet actions; ``scopes`` receives the
+    same arguments as the handler.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            config = response_cache_settings()
+            if not config["ENABLED"] or request.method != "GET":
+                return handler(view, request, *args, **kwargs)
+
+            view_scopes = scopes(request, *args, **kwargs)
+            fingerprint = "\x1f".join(
+                [request.get_full_path(), request.accepted_renderer.format, *view_scopes, *scope_versions(view_scopes)]
+            )
+            digest = hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+            etag = f'"{digest[:32]}"'
+            if etag in [tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")]:
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+            cache = _cache()
+            cache_key = f"respcache:response:{digest}"
+            cached = cache.get(cache_key)
+            if cached is not None:
+                data, headers = cached
+                return Response(data, headers={**headers, "ETag": etag})
+
+            response = handler(view, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                headers = {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+                cache.set(cache_key, (response.data, headers), timeout=config["TTL"])
+                response["ETag"] = etag
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,64 @@
+"""
+Full-text search over flashcards, decks and discussions.
+
+Each searchable model has a ``search_vector`` column that a database trigger
+keeps current (see migration 0007_search_vectors), with a GIN index on it.
+Queries use websearch syntax ("quoted phrases", -exclusions, OR) and come
+back ordered by relevance.
+
+Student lookup is a typeahead instead: substring and fuzzy (pg_trgm) matches
+on name and email, served by trigram indexes on UPPER(name) and UPPER(email).
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity, TrigramWordSimilarity
+from django.db.models import Case, Exists, F, IntegerField, OuterRef, Q, Value, When
+from django.db.models.functions import Greatest, Upper
+
+from .models import Friendship, Student
+
+# Must match the text search configuration used by the triggers.
+SEARCH_CONFIG = "english"
+
+
+def search(queryset, text):
+    query = SearchQuery(text, search_type="websearch", config=SEARCH_CONFIG)
+    return (
+        queryset
+        .filter(search_vector=query)
+        .annotate(rank=SearchRank(F("search_vector"), query))
+        .defer("search_vector")
+        .order_by("-rank", "-id")
+    )
+
+
+def typeahead_students(student, text, limit=10):
+    """Students matching ``text``, prefix matches first, then by trigram similarity.
+
+    Leaves out ``student`` and anyone on either side of a block with them,
+    since a friend request to those would be refused anyway.
+    """
+    text = text.upper()
+    blocked = Friendship.objects.filter(
+        Q(sender=OuterRef("pk"), receiver=student) | Q(sender=student, receiver=OuterRef("pk")),
+        status="blocked",
+    )
+    return (
+        Student.objects
+        .alias(name_upper=Upper("name"), email_upper=Upper("email"))
+        # The expressions match the index definitions, so each branch is a trigram index scan.
+        .filter(
+            Q(name_upper__contains=text)
+            | Q(email_upper__contains=text)
+            | Q(name_upper__trigram_word_similar=text)
+        )
+        .exclude(pk=student.pk)
+        .exclude(Exists(blocked))
+        .annotate(
+            prefix_match=Case(
+                When(Q(name_upper__startswith=text) | Q(email_upper__startswith=text), then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+            similarity=Greatest(TrigramWordSimilarity(text, "name_upper"), TrigramSimilarity("email_upper", text)),
+        )
+        .order_by("-prefix_match", "-similarity", "name", "id")[:limit]
+    )
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from .models import *
 from django.contrib.auth.models import User
+from .eager_loading import EagerLoadingMixin, pk_only
+from .recurrence import InvalidRule, validate_rule
 import re
 
 class UserSerializer(serializers.ModelSerializer):
@@ -26,7 +28,7 @@ class StudentSerializer(serializers.ModelSerializer):
 class DeckSerializer(serializers.ModelSerializer):
     class Meta:
         model = Deck
-        fields = "__all__"
+        exclude = ['search_vector']
 
 class StudyChatboxSerializer(serializers.ModelSerializer):
     student = serializers.PrimaryKeyRelatedField(queryset=Student.objects.all())
@@ -40,7 +42,26 @@ class StudyChatboxSerializer(serializers.ModelSerializer):
 class FlashcardSerializer(serializers.ModelSerializer):
     class Meta:
         model = Flashcard
-        fields = "__all__"
+        exclude = ['search_vector']
+        read_only_fields = ['ease_factor', 'interval_days', 'repetitions', 'due_at']
+
+
+class ReviewResultSerializer(serializers.Serializer):
+    flashcard = serializers.IntegerField()
+    quality = serializers.IntegerField(min_value=0, max_value=5)
+    reviewed_at = serializers.DateTimeField()
+
+
+class ReviewBatchSerializer(serializers.Serializer):
+    idempotency_key = serializers.CharField(max_length=64)
+    reviews = ReviewResultSerializer(many=True, allow_empty=False, max_length=1000)
+
+
+class FlashcardImportSerializer(serializers.ModelSerializer):
+    """One row of a bulk import; the deck is given once for the whole batch."""
+    class Meta:
+        model = Flashcard
+        fields = ['front_text', 'back_text', 'difficulty_level', 'category']
 
 
 class FriendshipSerializer(serializers.ModelSerializer):
@@ -61,38 +82,65 @@ class FriendshipHistorySerializer(serializers.ModelSerializer):
         fields = ['id', 'sender', 'receiver', 'action', 'action_student', 'timestamp']
         read_only_fields = ['timestamp']
 
-class GroupSerializer(serializers.ModelSerializer):
+class GroupSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     members = serializers.PrimaryKeyRelatedField(many=True, queryset=Student.objects.all(), required=False)
 
+    prefetch_related_fields = [("members", pk_only(Student))]
+
     class Meta:
         model = Group
         fields = ['id', 'name', 'description', 'members', 'is_private', 'created_at', 'max_students']
         read_only_fields = ['created_at']
 
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    prefetch_related_fields = [("participants", pk_only(Student)), ("groups", pk_only(Group))]
+
     class Meta:
         model = Event
         fields = ['id', 'event_title', 'event_description', 'start_datetime', 'end_datetime', 'recurring_rule', 'created_at', 'updated_at', 'participants', 'groups']
 
+    def validate(self, data):
+        start = data.get('start_datetime', getattr(self.instance, 'start_datetime', None))
+        end = data.get('end_datetime', getattr(self.instance, 'end_datetime', None))
+        if start and end and end < start:
+            raise serializers.ValidationError({"end_datetime": "End must not be before start."})
+        rule = data.get('recurring_rule', getattr(self.instance, 'recurring_rule', None))
+        if rule and start:
+            try:
+                validate_rule(rule, start)
+            except InvalidRule as e:
+                raise serializers.ValidationError({"recurring_rule": str(e)})
+        return data
+
 class DiscussionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Discussion
-        fields = "__all__"
+        exclude = ['search_vector']
 
 class SavedStudyPlanSerializer(serializers.ModelSerializer):
     class Meta:
         model = SavedStudyPlan
         fields = '__all__'
 
-class DashboardModuleSerializer(serializers.ModelSerializer):
+class DashboardModuleSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     saved_study_plan = SavedStudyPlanSerializer(read_only=True)
 
+    select_related_fields = ["saved_study_plan"]
+
     class Meta:
         model = DashboardModule
         fields = ['id', 'title', 'student', 'saved_study_plan']
 
 
 
+class StudyPlanJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StudyPlanJob
+        fields = ['id', 'status', 'prompt', 'result', 'error', 'attempts', 'max_attempts',
+                  'run_after', 'dashboard_module', 'saved_study_plan', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+
 class LessonSerializer(serializers.ModelSerializer):
     class Meta:
         model = Lesson
@@ -0,0 +1,229 @@
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils.timezone import now
+from rest_framework.authtoken.models import Token
+
+from .authentication import get_token_cache
+from .delta_sync import event_viewers, is_direct_delete, record_deletion, record_lost_access
+from .friend_graph import sync_edges
+from .models import DashboardModule, Deck, Event, Flashcard, Friendship, Group, Lesson, Student
+from .response_cache import invalidate
+
+
+@receiver(post_save, sender=Friendship)
+def update_friend_edges(sender, instance, **kwargs):
+    sync_edges(instance.sender_id, instance.receiver_id, accepted=instance.status == "accepted")
+
+
+@receiver(post_delete, sender=Friendship)
+def remove_friend_edges(sender, instance, **kwargs):
+    sync_edges(instance.sender_id, instance.receiver_id, accepted=False)
+
+
+# Cached token lookups hold the user and their student; drop them when either changes.
+
+@receiver(post_save, sender=User)
+def forget_saved_user(sender, instance, **kwargs):
+    get_token_cache().invalidate_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def forget_logged_out_user(sender, request, user, **kwargs):
+    if user is not None:
+        get_token_cache().invalidate_user(user.pk)
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def forget_student_user(sender, instance, **kwargs):
+    if instance.user_id:
+        get_token_cache().invalidate_user(instance.user_id)
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    get_token_cache().invalidate_user(instance.user_id)
+
+
+# Response cache scopes (see response_cache.py and the @cache_response views).
+
+def _remember_previous(instance, field, update_fields):
+    """Stash the stored value of ``field`` before an update can move the row to another owner."""
+    if instance._state.adding or (update_fields and field not in update_fields):
+        instance._previous_owner = None
+        return
+    column = instance._meta.get_field(field).attname
+    instance._previous_owner = type(instance).objects.filter(pk=instance.pk).values_list(column, flat=True).first()
+
+
+@receiver(pre_save, sender=Deck)
+def remember_deck_owner(sender, instance, update_fields=None, **kwargs):
+    _remember_previous(instance, "owner", update_fields)
+
+
+@receiver(pre_save, sender=Flashcard)
+def remember_flashcard_deck(sender, instance, update_fields=None, **kwargs):
+    _remember_previous(instance, "deck", update_fields)
+
+
+@receiver(post_save, sender=Deck)
+def invalidate_saved_deck(sender, instance, **kwargs):
+    owners = {instance.owner_id, getattr(instance, "_previous_owner", None)} - {None}
+    invalidate(*(f"decks:student:{owner}" for owner in owners))
+
+
+@receiver(post_delete, sender=Deck)
+def invalidate_deleted_deck(sender, instance, **kwargs):
+    invalidate(f"decks:student:{instance.owner_id}", f"flashcards:deck:{instance.pk}")
+
+
+@receiver(post_save, sender=Flashcard)
+@receiver(post_delete, sender=Flashcard)
+def invalidate_flashcard(sender, instance, **kwargs):
+    decks = {instance.deck_id, getattr(instance, "_previous_owner", None)} - {None}
+    invalidate(*(f"flashcards:deck:{deck}" for deck in decks))
+
+
+@receiver(post_save, sender=Group)
+def invalidate_saved_group(sender, instance, **kwargs):
+    invalidate("groups")
+
+
+@receiver(post_delete, sender=Group)
+def invalidate_deleted_group(sender, instance, **kwargs):
+    invalidate("groups", f"group:{instance.pk}:members", "group-removals")
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_event(sender, instance, **kwargs):
+    invalidate("events", f"event:{instance.pk}")
+
+
+@receiver(post_save, sender=Student)
+def invalidate_student_profile(sender, instance, **kwargs):
+    invalidate("student-profiles")
+
+
+@receiver(post_delete, sender=Student)
+def invalidate_deleted_student(sender, instance, **kwargs):
+    invalidate("student-profiles", "student-removals")
+
+
+def _changed_ids(instance, reverse, action, pk_set, related_name):
+    """Ids on the forward side of an m2m change (the groups or events that changed)."""
+    if not reverse:
+        return {instance.pk}
+    if action == "pre_clear":
+        return set(getattr(instance, related_name).values_list("pk", flat=True))
+    return set(pk_set or ())
+
+
+@receiver(m2m_changed, sender=Group.members.through)
+def invalidate_group_members(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    groups = _changed_ids(instance, reverse, action, pk_set, "groups")
+    invalidate("groups", *(f"group:{group}:members" for group in groups))
+
+
+@receiver(m2m_changed, sender=Event.participants.through)
+@receiver(m2m_changed, sender=Event.groups.through)
+def invalidate_event_relations(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    events = _changed_ids(instance, reverse, action, pk_set, "events")
+    invalidate("events", *(f"event:{event}" for event in events))
+
+
+# Delta sync (see delta_sync.py): tombstones for deletions, and updated_at
+# bumps for relation changes that alter who can see an event.
+
+@receiver(post_delete, sender=Deck)
+def tombstone_deck(sender, instance, origin=None, **kwargs):
+    if is_direct_delete(sender, origin):
+        record_deletion(instance, instance.owner_id)
+
+
+@receiver(post_delete, sender=Flashcard)
+def tombstone_flashcard(sender, instance, origin=None, **kwargs):
+    if is_direct_delete(sender, origin):
+        owner = Deck.objects.filter(pk=instance.deck_id).values_list("owner_id", flat=True).first()
+        record_deletion(instance, owner)
+
+
+@receiver(post_delete, sender=DashboardModule)
+def tombstone_dashboard_module(sender, instance, origin=None, **kwargs):
+    if is_direct_delete(sender, origin):
+        record_deletion(instance, instance.student_id)
+
+
+@receiver(post_delete, sender=Lesson)
+def tombstone_lesson(sender, instance, origin=None, **kwargs):
+    if is_direct_delete(sender, origin):
+        student = (
+            DashboardModule.objects.filter(pk=instance.dashboard_module_id).values_list("student_id", flat=True).first()
+        )
+        record_deletion(instance, student)
+
+
+# Events are shared: everyone who could see an event when it was deleted, or
+# who stops seeing it, gets a tombstone of their own. Who could see it is read
+# before the change, since the relation rows are gone afterwards.
+
+@receiver(pre_delete, sender=Event)
+def remember_event_viewers(sender, instance, **kwargs):
+    instance._event_viewers = event_viewers([instance.pk])
+
+
+@receiver(post_delete, sender=Event)
+def tombstone_event(sender, instance, **kwargs):
+    record_lost_access(getattr(instance, "_event_viewers", {}), {})
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_event_viewers(sender, instance, **kwargs):
+    instance._event_viewers = event_viewers(instance.events.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Group)
+def tombstone_group_events(sender, instance, **kwargs):
+    before = getattr(instance, "_event_viewers", {})
+    record_lost_access(before, event_viewers(list(before)))
+
+
+def _affected_events(sender, instance, reverse, action, pk_set):
+    if sender is Group.members.through:
+        groups = _changed_ids(instance, reverse, action, pk_set, "groups")
+        return list(Event.objects.filter(groups__in=groups).values_list("pk", flat=True).distinct())
+    return list(_changed_ids(instance, reverse, action, pk_set, "events"))
+
+
+@receiver(m2m_changed, sender=Event.participants.through)
+@receiver(m2m_changed, sender=Event.groups.through)
+@receiver(m2m_changed, sender=Group.members.through)
+def tombstone_lost_events(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("pre_remove", "pre_clear"):
+        instance._event_viewers = event_viewers(_affected_events(sender, instance, reverse, action, pk_set))
+    elif action in ("post_remove", "post_clear"):
+        before = instance.__dict__.pop("_event_viewers", {})
+        record_lost_access(before, event_viewers(list(before)))
+
+
+@receiver(m2m_changed, sender=Event.participants.through)
+@receiver(m2m_changed, sender=Event.groups.through)
+def touch_event_relations(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    events = _changed_ids(instance, reverse, action, pk_set, "events")
+    Event.objects.filter(pk__in=events).update(updated_at=now())
+
+
+@receiver(m2m_changed, sender=Group.members.through)
+def touch_group_events(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    groups = _changed_ids(instance, reverse, action, pk_set, "groups")
+    Event.objects.filter(groups__in=groups).update(updated_at=now())
@@ -0,0 +1,133 @@
+"""
+Spaced-repetition scheduling for flashcards (SM-2).
+
+Each review is graded 0-5. A grade of 3 or more counts as recalled and
+pushes the next review further out (1 day, 6 days, then the previous interval
+times the card's ease factor); anything lower starts the card over. The ease
+factor drifts with every grade and never drops below 1.3.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils.timezone import now
+
+from .models import Flashcard, ReviewSyncBatch
+from .response_cache import invalidate
+
+MIN_EASE_FACTOR = 1.3
+PASSING_QUALITY = 3
+
+
+def next_state(ease_factor, interval_days, repetitions, quality):
+    """SM-2 step: return the new (ease_factor, interval_days, repetitions)."""
+    if not 0 <= quality <= 5:
+        raise ValueError("quality must be between 0 and 5")
+    if quality < PASSING_QUALITY:
+        repetitions = 0
+        interval_days = 1
+    else:
+        if repetitions == 0:
+            interval_days = 1
+        elif repetitions == 1:
+            interval_days = 6
+        else:
+            interval_days = round(interval_days * ease_factor)
+        repetitions += 1
+    ease_factor += 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+    return max(ease_factor, MIN_EASE_FACTOR), interval_days, repetitions
+
+
+def schedule(card, quality, reviewed_at=None):
+    """Apply a review to ``card`` in memory; the caller saves it."""
+    reviewed_at = reviewed_at or now()
+    card.ease_factor, card.interval_days, card.repetitions = next_state(
+        card.ease_factor, card.interval_days, card.repetitions, quality
+    )
+    card.due_at = reviewed_at + timedelta(days=card.interval_days)
+    card.times_reviewed += 1
+    card.last_reviewed_date = reviewed_at
+    # bulk_update skips auto_now; delta sync relies on updated_at moving.
+    card.updated_at = now()
+    return card
+
+
+SCHEDULING_FIELDS = [
+    "ease_factor", "interval_days", "repetitions", "due_at", "times_reviewed", "last_reviewed_date", "updated_at",
+]
+
+
+def review_card(card_id, quality, reviewed_at=None):
+    """Record a review, locking the row so concurrent submissions don't overwrite each other."""
+    with transaction.atomic():
+        card = Flashcard.objects.select_for_update().get(id=card_id)
+        schedule(card, quality, reviewed_at)
+        card.save(update_fields=SCHEDULING_FIELDS)
+    return card
+
+
+class IdempotencyConflict(Exception):
+    """The idempotency key was already used for a different batch of reviews."""
+
+
+def _payload_hash(reviews):
+    canonical = sorted(
+        (review["flashcard"], review["quality"], review["reviewed_at"].isoformat()) for review in reviews
+    )
+    return hashlib.sha256(json.dumps(canonical).encode("utf-8")).hexdigest()
+
+
+def _apply_reviews(reviews):
+    cards = {
+        card.id: card
+        for card in Flashcard.objects.select_for_update().filter(id__in={r["flashcard"] for r in reviews}).order_by("id")
+    }
+    applied, conflicts, touched = 0, [], {}
+    for review in sorted(reviews, key=lambda r: r["reviewed_at"]):
+        card = cards.get(review["flashcard"])
+        if card is None:
+            conflicts.append({"flashcard": review["flashcard"], "reason": "not_found"})
+        elif card.last_reviewed_date and review["reviewed_at"] <= card.last_reviewed_date:
+            # Already reviewed more recently, e.g. online from another device.
+            conflicts.append({"flashcard": card.id, "reason": "stale"})
+        else:
+            touched[card.id] = schedule(card, review["quality"], review["reviewed_at"])
+            applied += 1
+    if touched:
+        Flashcard.objects.bulk_update(touched.values(), SCHEDULING_FIELDS)
+        # bulk_update sends no signals
+        invalidate(*{f"flashcards:deck:{card.deck_id}" for card in touched.values()})
+    return {"applied": applied, "conflicts": conflicts}
+
+
+def apply_review_batch(idempotency_key, reviews):
+    """Apply offline reviews in one transaction; returns ``(result, replayed)``.
+
+    Reviews are replayed oldest first. A review older than the card's last
+    recorded review is reported as stale and skipped. Sending the same key
+    again returns the stored result without touching any card.
+    """
+    payload_hash = _payload_hash(reviews)
+    try:
+        with transaction.atomic():
+            batch = ReviewSyncBatch.objects.create(idempotency_key=idempotency_key, payload_hash=payload_hash)
+            batch.result = _apply_reviews(reviews)
+            batch.save(update_fields=["result"])
+        return batch.result, False
+    except IntegrityError:
+        batch = ReviewSyncBatch.objects.filter(idempotency_key=idempotency_key).first()
+        if batch is None:
+            raise
+    if batch.payload_hash != payload_hash:
+        raise IdempotencyConflict(idempotency_key)
+    return batch.result, True
+
+
+def due_cards(student_id, limit, at=None):
+    """The ``limit`` most overdue cards across the student's decks."""
+    return (
+        Flashcard.objects
+        .filter(deck__owner_id=student_id, due_at__lte=at or now())
+        .order_by("due_at", "id")[:limit]
+    )
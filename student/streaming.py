@@ -0,0 +1,139 @@
+"""
+Helpers for streaming responses back to the client while they are produced.
+"""
+import json
+import logging
+
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+logger = logging.getLogger(__name__)
+
+
+def is_asgi_request(request):
+    """Whether ``request`` (a Django or DRF request) is being served over ASGI."""
+    return isinstance(getattr(request, "_request", request), ASGIRequest)
+
+
+def _sse(data, event=None):
+    payload = json.dumps(data, cls=DjangoJSONEncoder)
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
+
+
+def event_stream_response(chunks, on_complete=None):
+    """Stream text chunks to the client as Server-Sent Events.
+
+    Every chunk is sent as a ``data`` event carrying ``{"token": ...}``. Once
+    the iterator is exhausted ``on_complete`` is called with the full text and
+    whatever it returns is sent as the payload of the final ``done`` event.
+    A failure part-way through is reported as an ``error`` event because the
+    status line has already gone out.
+
+    Under ASGI Django reads a sync iterator in full before sending any of it,
+    so views served there should use async_event_stream_response instead.
+    """
+    def generate():
+        parts = []
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                yield _sse({"token": chunk})
+            text = "".join(parts)
+            extra = on_complete(text) if on_complete else None
+            yield _sse({"data": text, **(extra or {})}, event="done")
+        except Exception as e:
+            logger.exception("Streaming response failed")
+            yield _sse({"error": str(e)}, event="error")
+
+    response = StreamingHttpResponse(generate(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx-style proxies from buffering the whole stream.
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def async_event_stream_response(chunks, on_complete=None):
+    """Same as event_stream_response for an async iterator and async ``on_complete``."""
+    async def generate():
+        parts = []
+        try:
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield _sse({"token": chunk})
+            text = "".join(parts)
+            extra = await on_complete(text) if on_complete else None
+            yield _sse({"data": text, **(extra or {})}, event="done")
+        except Exception as e:
+            logger.exception("Streaming response failed")
+            yield _sse({"error": str(e)}, event="error")
+
+    response = StreamingHttpResponse(generate(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _encode_rows(rows, fmt):
+    """NDJSON lines, or the pieces of one JSON array, for an iterable of dicts."""
+    if fmt == "ndjson":
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+        return
+    yield "["
+    separator = ""
+    for row in rows:
+        yield separator + json.dumps(row, cls=DjangoJSONEncoder)
+        separator = ","
+    yield "]"
+
+
+async def _aencode_rows(rows, fmt):
+    if fmt == "ndjson":
+        async for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+        return
+    yield "["
+    separator = ""
+    async for row in rows:
+        yield separator + json.dumps(row, cls=DjangoJSONEncoder)
+        separator = ","
+    yield "]"
+
+
+def queryset_export_response(request, queryset, fields, filename, fmt="json", rename=None, chunk_size=500):
+    """Stream ``queryset.values(*fields)`` as a JSON array or NDJSON download.
+
+    Rows are read through a server-side cursor ``chunk_size`` at a time, so
+    memory stays flat and the first bytes go out before the query finishes.
+    Under ASGI the async iterator is used, since Django would otherwise
+    buffer a sync iterator in full before sending it.
+    """
+    rename = rename or {}
+    rows = queryset.values(*fields)
+
+    def relabel(row):
+        return {rename.get(key, key): value for key, value in row.items()}
+
+    if is_asgi_request(request):
+        async def arows():
+            async for row in rows.aiterator(chunk_size=chunk_size):
+                yield relabel(row)
+        content = _aencode_rows(arows(), fmt)
+    else:
+        content = _encode_rows((relabel(row) for row in rows.iterator(chunk_size=chunk_size)), fmt)
+
+    content_type = "application/x-ndjson" if fmt == "ndjson" else "application/json"
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+
+def is_truthy(value):
+    return value in (True, "true", "True", "1", 1, "yes")
+
+
+def wants_stream(request):
+    return is_truthy(request.data.get("stream", request.query_params.get("stream")))
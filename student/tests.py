@@ -1,3 +1,1853 @@
-from django.test import TestCase
- 
-# Create your tests here.
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import asyncio
+import json
+import re
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from langchain.schema import AIMessage, HumanMessage
+import httpx
+import openai
+from prometheus_client import REGISTRY
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from . import ai_utils
+from .ai_utils import generate_study_plans_batch
+from .authentication import get_token_cache
+from .chat_context import build_conversation_context
+from .llm_cache import LLMResponseCache, LRUCache, get_response_cache, make_cache_key, normalize_prompt
+from .jobs import claim_next_job
+from .delta_sync import COLLECTIONS
+from .friend_graph import friend_suggestions, load_adjacency, mutual_friend_counts
+from . import flashcard_import
+from .recurrence import expand
+from .search import search, typeahead_students
+from .response_cache import require_shared_cache
+from . import llm_client
+from .llm_client import CircuitBreaker, LLMClient, LLMUnavailableError, SlotPool
+from .pagination import CursorPagination
+from .profiling import llm_timer, route_stats
+from .srs import MIN_EASE_FACTOR, IdempotencyConflict, apply_review_batch, next_state, schedule
+from .models import (
+    DashboardModule, Deck, Discussion, Event, Flashcard, FriendEdge, Friendship, Group, Lesson, SavedStudyPlan,
+    Student, StudyChatbox, StudyChatSummary, StudyPlanJob, Tombstone, WellnessChat,
+)
+
+
+class HotPathIndexTests(TestCase):
+    """The hot list endpoints must be answered from the indexes added for them.
+
+    Each endpoint's queries are re-run under EXPLAIN with sequential scans
+    disabled, and the named indexes must appear in the plans. Only naming the
+    index catches a plan that falls back to a plain foreign key index.
+    """
+
+    INDEXED_TABLES = [
+        "student_friendship",
+        "student_dashboardmodule",
+        "student_studychatbox",
+        "student_wellnesschat",
+        "student_savedstudyplan",
+        "student_event",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("explain", password="explain-password")
+        cls.student = Student.objects.create(user=cls.user, name="Explain", email="explain@example.com")
+        others = Student.objects.bulk_create(
+            [Student(name=f"Student {i}", email=f"student{i}@example.com") for i in range(300)]
+        )
+        statuses = ["pending", "accepted", "rejected", "blocked"]
+        Friendship.objects.bulk_create(
+            [Friendship(sender=others[i], receiver=others[i + 1], status=statuses[i % 4]) for i in range(299)]
+            + [
+                Friendship(sender=cls.student, receiver=others[0], status="blocked"),
+                Friendship(sender=others[1], receiver=cls.student, status="accepted"),
+            ]
+        )
+        DashboardModule.objects.bulk_create(
+            [DashboardModule(student=student, title=f"Module {i}", is_active=i % 3 == 0)
+             for student in others for i in range(5)]
+            + [DashboardModule(student=cls.student, title="Mine", is_active=True)]
+        )
+        SavedStudyPlan.objects.bulk_create(
+            [SavedStudyPlan(student=student, plan_content="plan", status="saved") for student in others for _ in range(3)]
+        )
+        StudyChatbox.objects.bulk_create(
+            [StudyChatbox(student=student, user_message="q", bot_response="a", category="GENERAL")
+             for student in others for _ in range(10)]
+        )
+        WellnessChat.objects.bulk_create(
+            [WellnessChat(student=student, message="hello") for student in others for _ in range(10)]
+        )
+        Event.objects.bulk_create(
+            [Event(event_title=f"Event {i}", start_datetime=datetime(2030, 1, 1) + timedelta(hours=i),
+                   end_datetime=datetime(2030, 1, 1) + timedelta(hours=i, minutes=50)) for i in range(3000)]
+            + [Event(event_title="Weekly", start_datetime=datetime(2029, 1, 1, 9), end_datetime=datetime(2029, 1, 1, 10),
+                     recurring_rule="FREQ=WEEKLY")]
+        )
+        with connection.cursor() as cursor:
+            for table in cls.INDEXED_TABLES:
+                cursor.execute(f"ANALYZE {table}")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assert_uses_indexes(self, url, *indexes):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+
+        plans = []
+        with connection.cursor() as cursor:
+            cursor.execute("SET enable_seqscan = off")
+            try:
+                for query in queries.captured_queries:
+                    sql = query["sql"]
+                    if sql.startswith("SELECT") and any(f'"{table}"' in sql for table in self.INDEXED_TABLES):
+                        cursor.execute("EXPLAIN " + sql)
+                        plans.append(sql + "\n" + "\n".join(row[0] for row in cursor.fetchall()))
+            finally:
+                cursor.execute("RESET enable_seqscan")
+        self.assertTrue(plans, f"{url} ran no queries against the indexed tables")
+        plan = "\n\n".join(plans)
+        for index in indexes:
+            self.assertRegex(plan, rf"Index (Only )?Scan (using|on) {index}\b", f"{url}\n{plan}")
+
+    def test_friendship_lists_use_indexes(self):
+        self.assert_uses_indexes("/api/friendship/", "friendship_sender_status", "friendship_receiver_status")
+        self.assert_uses_indexes("/api/friendship/get_blocked/", "friendship_blocked_sender", "friendship_blocked_receiver")
+
+    def test_dashboard_module_lists_use_indexes(self):
+        self.assert_uses_indexes("/api/dashboard-modules/", "dashboardmodule_student_active")
+        self.assert_uses_indexes("/api/dashboard-modules/available/", "dashboardmodule_student_active")
+
+    def test_saved_study_plans_use_index(self):
+        self.assert_uses_indexes("/api/study-plans/", "savedstudyplan_student_status")
+
+    def test_event_window_uses_indexes(self):
+        self.assert_uses_indexes("/api/events/?start=2030-02-01T00:00:00&end=2030-02-08T00:00:00", "event_end_start", "event_recurring_series")
+
+    def test_chat_histories_use_indexes(self):
+        other = Student.objects.exclude(id=self.student.id).first()
+        self.assert_uses_indexes(f"/api/studychatbox/student/{other.id}/", "studychatbox_student_time")
+        self.assert_uses_indexes(f"/api/wellness_message/{other.id}/", "wellnesschat_student_time")
+
+
+class Endpoint:
+    def __init__(self, method, path, data=None, max_queries=10):
+        self.method = method
+        self.path = path
+        self.data = data
+        self.max_queries = max_queries
+
+    def __str__(self):
+        return f"{self.method.upper()} {self.path}"
+
+
+# Every route in student/urls.py. Paths and bodies are templates filled in
+# from the fixture, e.g. "{deck}" becomes the id of fixture.deck.
+ENDPOINTS = {
+    "index": Endpoint("get", "/api/"),
+    "register": Endpoint("post", "/api/register/", {"username": "newcomer", "password": "a-long-password-1"}),
+    "login": Endpoint("post", "/api/login/", {"username": "me", "password": "me-password-123"}, max_queries=15),
+    "logout": Endpoint("post", "/api/logout/"),
+    "reset_password": Endpoint("post", "/api/reset-password/", {"username": "me", "new_password": "another-password-1"}),
+    "user_details": Endpoint("get", "/api/get_user_and_student_details/"),
+    "create_student": Endpoint("post", "/api/create_student/", {"name": "Again", "email": "again@example.com"}),
+    "update_student": Endpoint("put", "/api/update_student/{student}/", {"name": "Me", "email": "me@example.com"}),
+    "delete_student": Endpoint("delete", "/api/delete_student/{spare}/", max_queries=40),
+    "all_students": Endpoint("get", "/api/get_all_students/"),
+
+    "dashboard_modules": Endpoint("get", "/api/dashboard-modules/"),
+    "dashboard_modules_available": Endpoint("get", "/api/dashboard-modules/available/"),
+    "dashboard_module_create": Endpoint("post", "/api/dashboard-modules/create/", {"title": "New module"}),
+    "dashboard_module_toggle": Endpoint("post", "/api/dashboard-modules/toggle/{module}/"),
+    "dashboard_module_detail": Endpoint("get", "/api/dashboard-modules/{module}/"),
+    "module_study_plan": Endpoint("get", "/api/modules/{module}/study-plan/"),
+    "lesson_create": Endpoint("post", "/api/lessons/create/", {"dashboard_module": "{module}", "title": "Lesson"}),
+    "lessons_by_module": Endpoint("get", "/api/lessons/module/{module}/"),
+    "lesson_detail": Endpoint("get", "/api/lessons/{lesson}/"),
+    "lesson_update": Endpoint("put", "/api/lessons/{lesson}/", {"title": "Renamed"}),
+
+    "friendship_send": Endpoint("post", "/api/friendship/send/", {"receiver_id": "{stranger}"}),
+    "friendship_respond": Endpoint("post", "/api/friendship/respond/{pending}/", {"action": "accepted"}),
+    "friendship_block": Endpoint("post", "/api/friendship/block/{friendship}/"),
+    "friendships": Endpoint("get", "/api/friendship/"),
+    "friendship_blocked": Endpoint("get", "/api/friendship/get_blocked/"),
+    "friend_suggestions": Endpoint("get", "/api/friendship/suggestions/"),
+    "mutual_friends": Endpoint("get", "/api/friendship/mutual/?ids={stranger},{spare}"),
+    "friendship_unblock": Endpoint("post", "/api/friendship/unblock/{blocked}/"),
+    "friendship_delete": Endpoint("delete", "/api/friendship/delete/{friendship}/"),
+
+    "decks": Endpoint("get", "/api/decks/"),
+    "decks_by_student": Endpoint("get", "/api/decks/student/{student}/"),
+    "deck_create": Endpoint("post", "/api/decks/create/", {"name": "Fresh deck", "owner": "{student}"}),
+    "deck_update": Endpoint("put", "/api/decks/update/{deck}/", {"name": "Renamed deck", "owner": "{student}"}),
+    "deck_delete": Endpoint("delete", "/api/decks/delete/{deck}/"),
+
+    "flashcards": Endpoint("get", "/api/flashcards/"),
+    "flashcards_by_deck": Endpoint("get", "/api/flashcards/deck/{deck}/"),
+    "flashcards_due": Endpoint("get", "/api/flashcards/due/{student}/"),
+    "flashcard_review": Endpoint("post", "/api/flashcards/review/{card}/", {"quality": 4}),
+    "flashcard_review_sync": Endpoint("post", "/api/flashcards/review/sync/", {
+        "idempotency_key": "session-1",
+        "reviews": [{"flashcard": "{card}", "quality": 3, "reviewed_at": "2030-01-01T10:00:00"}],
+    }),
+    "flashcard_create": Endpoint("post", "/api/flashcards/create/", {"front_text": "Q", "back_text": "A", "deck": "{deck}"}),
+    "flashcard_bulk": Endpoint("post", "/api/flashcards/bulk/", {
+        "deck": "{deck}", "flashcards": [{"front_text": f"Q{i}", "back_text": "A"} for i in range(5)],
+    }),
+    "flashcard_update": Endpoint("put", "/api/flashcards/update/{card}/", {"front_text": "Q", "back_text": "A", "deck": "{deck}"}),
+    "flashcard_delete": Endpoint("delete", "/api/flashcards/delete/{card}/"),
+
+    "study_plan": Endpoint("post", "/api/study_plan/", {"prompt": "Plan my week", "background": False}),
+    "study_plan_async": Endpoint("post", "/api/study_plan/async/", {"prompt": "Plan my week"}),
+    "study_plan_batch": Endpoint("post", "/api/study_plan/batch/", {"prompts": ["Plan A", "Plan B"]}),
+    "study_plan_job": Endpoint("get", "/api/study_plan/jobs/{job}/"),
+
+    "discussions": Endpoint("get", "/api/discussions/"),
+    "search_students": Endpoint("get", "/api/search/students/?q=student"),
+    "search_flashcards": Endpoint("get", "/api/search/flashcards/?q=question"),
+    "search_decks": Endpoint("get", "/api/search/decks/?q=deck"),
+    "search_discussions": Endpoint("get", "/api/search/discussions/?q=hello"),
+    "discussion_create": Endpoint("post", "/api/create_discussion/", {"author": "{student}", "group": "{group}", "message": "Hi"}),
+    "discussion_detail": Endpoint("get", "/api/get_discussion_by_id/{discussion}/"),
+    "discussion_update": Endpoint("put", "/api/update_discussion/{discussion}/", {"message": "Edited"}),
+    "discussion_delete": Endpoint("delete", "/api/delete_discussion/{discussion}/"),
+    "study_plan_save": Endpoint("post", "/api/study-plans/save/", {"plan_content": "Plan", "dashboard_module": "{module}"}),
+    "study_plan_approve": Endpoint("post", "/api/study-plans/approve/{plan}/"),
+    "saved_study_plans": Endpoint("get", "/api/study-plans/"),
+
+    "study_chats": Endpoint("get", "/api/studychatbox/all/"),
+    "study_chat_create": Endpoint("post", "/api/studychatbox/create/", {
+        "student": "{student}", "user_message": "Q", "bot_response": "A", "category": "GENERAL",
+    }),
+    "study_chats_by_student": Endpoint("get", "/api/studychatbox/student/{student}/"),
+    "study_chats_export": Endpoint("get", "/api/studychatbox/student/{student}/export/"),
+    "study_chat_delete": Endpoint("delete", "/api/studychatbox/delete/{study_chat}/"),
+
+    "groups": Endpoint("get", "/api/groups/"),
+    "group_create": Endpoint("post", "/api/create_group/", {"name": "New group", "max_students": 5, "student_id": "{student}"}),
+    "group_detail": Endpoint("get", "/api/get_group_by_id/{group}/"),
+    "group_update": Endpoint("put", "/api/update_group/{group}/", {"description": "Updated"}),
+    "group_delete": Endpoint("delete", "/api/delete_group/{group}/", max_queries=20),
+    "group_member_add": Endpoint("post", "/api/add_member/{group}/", {"student_id": "{stranger}"}),
+    "group_member_remove": Endpoint("delete", "/api/remove_member/{group}/", {"student_id": "{student}"}),
+    "group_members": Endpoint("get", "/api/group_members/{group}/"),
+
+    "wellness_chats": Endpoint("get", "/api/wellness_chats/"),
+    "wellness_chat_create": Endpoint("post", "/api/wellness_create/", {"student": "{student}", "message": "Hello"}),
+    "wellness_chats_by_student": Endpoint("get", "/api/wellness_message/{student}/"),
+    "wellness_chats_export": Endpoint("get", "/api/wellness_message/{student}/export/"),
+    "wellness_chat_update": Endpoint("put", "/api/wellness_update/{wellness_chat}/", {"message": "Edited"}),
+    "wellness_chat_delete": Endpoint("delete", "/api/wellness_delete/{wellness_chat}/"),
+    "wellness": Endpoint("post", "/api/wellness/", {"query": "I feel stressed"}),
+    "wellness_async": Endpoint("post", "/api/wellness/async/", {"query": "I feel stressed"}),
+
+    "events": Endpoint("get", "/api/events/"),
+    "events_window": Endpoint("get", "/api/events/?start=2030-01-01T00:00:00&end=2030-01-31T00:00:00"),
+    "event_detail": Endpoint("get", "/api/events/{event}/"),
+    "event_create": Endpoint("post", "/api/events/", {
+        "event_title": "Exam", "start_datetime": "2030-01-01T09:00:00", "end_datetime": "2030-01-01T11:00:00",
+        "participants": ["{student}"], "groups": ["{group}"],
+    }, max_queries=14),
+    "event_update": Endpoint("put", "/api/events/{event}/", {
+        "event_title": "Exam", "start_datetime": "2030-01-01T09:00:00", "end_datetime": "2030-01-01T11:00:00",
+        "participants": ["{student}"], "groups": [],
+    }, max_queries=20),
+    "event_delete": Endpoint("delete", "/api/events/{event}/"),
+
+    "profiling_metrics": Endpoint("get", "/api/metrics/profiling/"),
+    "sync": Endpoint("get", "/api/sync/"),
+    "sync_delta": Endpoint("get", f"/api/sync/?since={(datetime.now() - timedelta(hours=1)).isoformat()}"),
+}
+
+def _fill(template, fixture):
+    if isinstance(template, str):
+        if template.startswith("{") and template.endswith("}") and template.count("{") == 1:
+            return getattr(fixture, template[1:-1])
+        return template.format(**vars(fixture))
+    if isinstance(template, list):
+        return [_fill(item, fixture) for item in template]
+    if isinstance(template, dict):
+        return {key: _fill(value, fixture) for key, value in template.items()}
+    return template
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class QueryCountTests(TestCase):
+    """Each endpoint runs against a small and a large fixture.
+
+    A request may not run more queries on the large fixture than on the small
+    one, so nothing loops over rows, and never more than its budget.
+    """
+
+    SMALL = 2
+    LARGE = 12
+
+    def setUp(self):
+        patches = [
+            mock.patch("student.views.generate_study_plan", return_value="A plan"),
+            mock.patch("student.views.agenerate_study_plan", new=mock.AsyncMock(return_value="A plan")),
+            mock.patch("student.views.generate_study_plans_batch",
+                       side_effect=lambda prompts, **kwargs: [{"prompt": p, "data": "A plan"} for p in prompts]),
+            mock.patch("student.views.wellness_chatbot_response", return_value="Take a break"),
+            mock.patch("student.views.awellness_chatbot_response", new=mock.AsyncMock(return_value="Take a break")),
+            mock.patch("student.chat_context.summarize_conversation", return_value="Summary"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def seed(self, n):
+        """A student with ``n`` of everything: friends, decks of ``n`` cards, groups of ``n`` members..."""
+        user = User.objects.create_user("me", password="me-password-123")
+        me = Student.objects.create(user=user, name="Me", email="me@example.com")
+        others = Student.objects.bulk_create(
+            [Student(name=f"Student {i}", email=f"student{i}@example.com") for i in range(n + 4)]
+        )
+        friends, pending_from, blocked, stranger, spare = others[:n], others[n], others[n + 1], others[n + 2], others[n + 3]
+        friendships = [Friendship.objects.create(sender=me, receiver=friend, status="accepted") for friend in friends]
+        for a, b in zip(friends, friends[1:]):
+            Friendship.objects.create(sender=a, receiver=b, status="accepted")
+        pending = Friendship.objects.create(sender=pending_from, receiver=me)
+        block = Friendship.objects.create(sender=me, receiver=blocked, status="blocked")
+
+        decks = Deck.objects.bulk_create([Deck(name=f"Deck {i}", owner=me) for i in range(n)])
+        Flashcard.objects.bulk_create(
+            [Flashcard(deck=deck, front_text=f"Question {i}", back_text="Answer") for deck in decks for i in range(n)]
+        )
+        groups = Group.objects.bulk_create([Group(name=f"Group {i}", max_students=n + 5) for i in range(n)])
+        Group.members.through.objects.bulk_create(
+            [Group.members.through(group=group, student=student) for group in groups for student in friends + [me]]
+        )
+        discussions = Discussion.objects.bulk_create(
+            [Discussion(author=me, group=groups[0], message=f"hello {i}") for i in range(n)]
+        )
+        events = Event.objects.bulk_create([
+            Event(event_title=f"Event {i}", start_datetime="2030-01-01T09:00:00", end_datetime="2030-01-01T10:00:00")
+            for i in range(n)
+        ])
+        Event.participants.through.objects.bulk_create(
+            [Event.participants.through(event=event, student=student) for event in events for student in friends]
+        )
+        Event.groups.through.objects.bulk_create(
+            [Event.groups.through(event=event, group=group) for event in events for group in groups]
+        )
+        plans = SavedStudyPlan.objects.bulk_create(
+            [SavedStudyPlan(student=me, plan_content=f"Plan {i}") for i in range(2 * n)]
+        )
+        modules = DashboardModule.objects.bulk_create([
+            DashboardModule(student=me, title=f"Module {i}", saved_study_plan=plan, is_active=i % 2 == 0)
+            for i, plan in enumerate(plans)
+        ])
+        lessons = Lesson.objects.bulk_create([Lesson(dashboard_module=modules[0], title=f"Lesson {i}") for i in range(n)])
+        study_chats = StudyChatbox.objects.bulk_create(
+            [StudyChatbox(student=me, user_message="Q", bot_response="A", category="GENERAL") for _ in range(n)]
+        )
+        # History older than the context window is already summarized, as it is
+        # in steady state, so the summary refresh doesn't depend on fixture size.
+        StudyChatSummary.objects.create(student=me, summary="Earlier turns", summarized_until=study_chats[-1].id)
+        wellness_chats = WellnessChat.objects.bulk_create([WellnessChat(student=me, message="Hi") for _ in range(n)])
+        job = StudyPlanJob.objects.create(student=me, prompt="Plan")
+
+        with connection.cursor() as cursor:
+            # Feed the planner real statistics for the search and lookup queries.
+            cursor.execute("ANALYZE")
+        return SimpleNamespace(
+            user=user, student=me.id, stranger=stranger.id, spare=spare.id, friendship=friendships[0].id,
+            pending=pending.id, blocked=block.id, deck=decks[0].id,
+            card=Flashcard.objects.filter(deck=decks[0]).values_list("id", flat=True).first(),
+            group=groups[0].id, discussion=discussions[0].id, event=events[0].id, plan=plans[0].id,
+            module=modules[0].id, lesson=lessons[0].id, study_chat=study_chats[0].id,
+            wellness_chat=wellness_chats[0].id, job=job.id,
+        )
+
+    def count_queries(self, endpoint, size):
+        for cache in caches.all():
+            cache.clear()
+        with transaction.atomic():
+            fixture = self.seed(size)
+            client = APIClient()
+            client.force_authenticate(fixture.user)
+            path = _fill(endpoint.path, fixture)
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(client, endpoint.method)(path, _fill(endpoint.data, fixture), format="json")
+                if response.streaming:
+                    b"".join(response.streaming_content)
+            self.assertLess(response.status_code, 500, f"{endpoint}: {getattr(response, 'data', '')}")
+            transaction.set_rollback(True)
+        return len(queries)
+
+    def assert_query_count_bounded(self, name, endpoint):
+        with self.subTest(name):
+            small = self.count_queries(endpoint, self.SMALL)
+            large = self.count_queries(endpoint, self.LARGE)
+            self.assertLessEqual(
+                large, small,
+                f"{endpoint} ran {small} queries with {self.SMALL} rows per table but {large} with {self.LARGE}",
+            )
+            self.assertLessEqual(large, endpoint.max_queries, f"{endpoint} exceeded its query budget")
+
+    def test_endpoints_run_a_bounded_number_of_queries(self):
+        for name, endpoint in ENDPOINTS.items():
+            self.assert_query_count_bounded(name, endpoint)
+
+    def test_every_route_is_covered(self):
+        from .urls import urlpatterns
+
+        covered = set()
+        for endpoint in ENDPOINTS.values():
+            path = re.sub(r"\{\w+\}", "1", endpoint.path.split("?")[0])
+            covered.add(resolve(path).url_name)
+        # The router's api-root is shadowed by the "index" route on the same path.
+        routes = {pattern.name for pattern in urlpatterns} - {"api-root"}
+        self.assertNotIn(None, routes, "Every route needs a name")
+        self.assertEqual(routes - covered, set(), "No query-count case for these routes")
+
+
+@override_settings(PROFILING={"ENABLED": True, "SLOW_REQUEST_MS": 60000})
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        route_stats.clear()
+        self.user = User.objects.create_user("admin", password="admin-password", is_staff=True)
+        self.student = Student.objects.create(user=self.user, name="Admin", email="admin@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing_header(self):
+        response = self.client.get("/api/decks/")
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response["Server-Timing"], r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries, 0 duplicate"$')
+
+    def test_llm_time_is_reported(self):
+        def fake_study_plan(prompt, context=None):
+            with llm_timer():
+                return "A plan"
+
+        with mock.patch("student.views.generate_study_plan", side_effect=fake_study_plan):
+            response = self.client.post("/api/study_plan/", {"prompt": "Plan", "background": False}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('llm;dur=', response["Server-Timing"])
+        self.assertIn('desc="1 calls"', response["Server-Timing"])
+
+    def test_streamed_llm_time_is_recorded_when_the_stream_ends(self):
+        llm = LLMClient("test-model", "test-key")
+        llm._llm = mock.Mock()
+
+        def slow_chunks(messages):
+            time.sleep(0.05)
+            yield AIMessage(content="A plan")
+
+        def fake_stream(prompt, context=None):
+            for chunk in llm.stream([HumanMessage(content=prompt)], operation="study_plan"):
+                yield chunk.content
+
+        llm._llm.stream.side_effect = slow_chunks
+        with mock.patch("student.views.stream_study_plan", side_effect=fake_stream):
+            response = self.client.post("/api/study_plan/", {"prompt": "Plan", "stream": True}, format="json")
+            self.assertEqual(route_stats.snapshot(), [])
+            self.assertIn(b"A plan", b"".join(response.streaming_content))
+        [row] = route_stats.snapshot()
+        self.assertEqual((row["route"], row["requests"]), ("/api/study_plan/", 1))
+        self.assertGreaterEqual(row["llm_ms"], 50)
+
+    async def test_async_streamed_llm_time_is_recorded(self):
+        llm = LLMClient("test-model", "test-key")
+        llm._async_llm = mock.AsyncMock(return_value=mock.Mock())
+
+        async def slow_chunks(messages):
+            await asyncio.sleep(0.05)
+            yield AIMessage(content="A plan")
+
+        async def fake_stream(prompt, context=None):
+            async for chunk in llm.astream([HumanMessage(content=prompt)], operation="study_plan"):
+                yield chunk.content
+
+        (await llm._async_llm()).astream.side_effect = slow_chunks
+        with mock.patch("student.views.astream_study_plan", new=fake_stream):
+            response = await AsyncClient().post(
+                "/api/study_plan/", {"prompt": "Plan", "stream": True}, content_type="application/json"
+            )
+            self.assertIn(b"A plan", b"".join([chunk async for chunk in response]))
+        [row] = route_stats.snapshot()
+        self.assertEqual(row["route"], "/api/study_plan/")
+        self.assertGreaterEqual(row["llm_ms"], 50)
+
+    @override_settings(PROFILING={"ENABLED": True, "SLOW_REQUEST_MS": 0})
+    def test_slow_requests_are_logged_with_their_sql(self):
+        with self.assertLogs("student.profiling", "WARNING") as logs:
+            self.client.get("/api/decks/")
+        record = json.loads(logs.records[0].getMessage().removeprefix("Slow request "))
+        self.assertEqual(record["route"], "/api/decks/")
+        self.assertEqual(record["status"], 200)
+        self.assertEqual(record["queries"], len(record["slowest_queries"]))
+        self.assertTrue(any('"student_deck"' in query["sql"] for query in record["slowest_queries"]))
+
+    def test_metrics_endpoint_aggregates_routes(self):
+        self.client.get("/api/decks/")
+        self.client.get("/api/decks/")
+        response = self.client.get("/api/metrics/profiling/")
+        self.assertEqual(response.status_code, 200)
+        routes = {row["route"]: row for row in response.data["routes"]}
+        self.assertEqual(routes["/api/decks/"]["requests"], 2)
+        self.assertGreater(routes["/api/decks/"]["queries"], 0)
+
+
+class MetricsTests(TestCase):
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_requests_are_counted_per_route(self):
+        labels = {"method": "GET", "route": "/api/get_all_students/", "status": "200"}
+        before = self.sample("http_requests_total", **labels)
+        queries_before = self.sample("http_request_db_queries_sum", route="/api/get_all_students/")
+        self.client.get("/api/get_all_students/")
+        self.assertEqual(self.sample("http_requests_total", **labels), before + 1)
+        self.assertGreater(self.sample("http_request_db_queries_sum", route="/api/get_all_students/"), queries_before)
+
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('http_request_duration_seconds_bucket{le="0.005",method="GET",route="/api/get_all_students/"}', body)
+        self.assertIn("db_connections{state=", body)
+
+    @override_settings(METRICS={"ENABLED": True, "TOKEN": "scrape-secret"})
+    def test_scrape_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-secret").status_code, 200)
+
+    def test_llm_calls_record_outcome_and_tokens(self):
+        client = LLMClient("test-model", "test-key")
+        client._llm = mock.Mock()
+        client._llm.invoke.return_value = AIMessage(
+            content="A plan", response_metadata={"token_usage": {"prompt_tokens": 12, "completion_tokens": 30}}
+        )
+        before = self.sample("llm_requests_total", operation="test", outcome="success")
+        tokens_before = self.sample("llm_tokens_total", operation="test", kind="completion")
+        client.invoke([HumanMessage(content="Plan")], operation="test")
+        self.assertEqual(self.sample("llm_requests_total", operation="test", outcome="success"), before + 1)
+        self.assertEqual(self.sample("llm_tokens_total", operation="test", kind="completion"), tokens_before + 30)
+
+        client._llm.invoke.side_effect = ValueError("bad request")
+        errors_before = self.sample("llm_requests_total", operation="test", outcome="error")
+        with self.assertRaises(ValueError):
+            client.invoke([HumanMessage(content="Plan")], operation="test")
+        self.assertEqual(self.sample("llm_requests_total", operation="test", outcome="error"), errors_before + 1)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = User.objects.create_user("cached", password="cached-password")
+        self.student = Student.objects.create(user=self.user, name="Cached", email="cached@example.com")
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def details(self):
+        return self.client.get("/api/get_user_and_student_details/")
+
+    def test_warm_cache_authenticates_without_queries(self):
+        with CaptureQueriesContext(connection) as cold:
+            self.assertEqual(self.details().status_code, 200)
+        self.assertEqual(len(cold), 1)
+        with self.assertNumQueries(0):
+            response = self.details()
+        self.assertEqual(response.data["student"]["id"], self.student.id)
+
+    def test_invalid_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token not-a-token")
+        self.assertEqual(self.client.get("/api/friendship/").status_code, 401)
+
+    def test_deleting_the_student_invalidates(self):
+        self.details()
+        self.client.delete(f"/api/delete_student/{self.student.id}/")
+        self.assertEqual(self.details().status_code, 404)
+
+    def test_creating_a_student_invalidates(self):
+        self.student.delete()
+        self.assertEqual(self.details().status_code, 404)
+        self.client.post("/api/create_student/", {"name": "Again", "email": "again@example.com"}, format="json")
+        self.assertEqual(self.details().status_code, 200)
+
+    def test_password_reset_and_logout_invalidate(self):
+        self.details()
+        self.client.post("/api/reset-password/", {"username": "cached", "new_password": "another-password"}, format="json")
+        self.assertIsNone(get_token_cache().local.get(f"auth:user:{self.user.pk}"))
+        self.details()
+        self.client.post("/api/logout/")
+        self.assertIsNone(get_token_cache().local.get(f"auth:user:{self.user.pk}"))
+
+    def test_deactivated_user_is_rejected(self):
+        self.details()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.details().status_code, 401)
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.owner = Student.objects.create(name="Owner", email="owner@example.com")
+        self.deck = Deck.objects.create(name="Biology", owner=self.owner)
+        self.card = Flashcard.objects.create(deck=self.deck, front_text="Cell", back_text="Unit of life")
+        self.group = Group.objects.create(name="Study group", max_students=5)
+        self.group.members.add(self.owner)
+        self.event = Event.objects.create(
+            event_title="Exam", start_datetime="2030-01-01T09:00:00", end_datetime="2030-01-01T11:00:00"
+        )
+        self.client = APIClient()
+
+    def test_several_workers_need_a_shared_cache(self):
+        require_shared_cache(1)
+        with self.assertRaises(ImproperlyConfigured):
+            require_shared_cache(4)
+        with override_settings(RESPONSE_CACHE={"CACHE": "llm"}):
+            require_shared_cache(4)
+        with override_settings(RESPONSE_CACHE={"ENABLED": False}):
+            require_shared_cache(4)
+
+    def assert_cached(self, url):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+        return first
+
+    def assert_changed(self, url, before):
+        after = self.client.get(url, HTTP_IF_NONE_MATCH=before["ETag"])
+        self.assertEqual(after.status_code, 200)
+        self.assertNotEqual(after["ETag"], before["ETag"])
+        return after
+
+    def test_decks_by_student(self):
+        url = f"/api/decks/student/{self.owner.id}/"
+        before = self.assert_cached(url)
+        other = Student.objects.create(name="Other", email="other@example.com")
+        with self.captureOnCommitCallbacks(execute=True):
+            Deck.objects.create(name="Other deck", owner=other)
+        self.assert_cached(url)  # another owner's deck leaves this list alone
+        self.assertEqual(self.client.get(url)["ETag"], before["ETag"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Deck.objects.create(name="Chemistry", owner=self.owner)
+        after = self.assert_changed(url, before)
+        self.assertEqual(len(after.data["data"]), 2)
+
+    def test_moving_a_deck_invalidates_both_owners(self):
+        other = Student.objects.create(name="Other", email="other@example.com")
+        mine = self.assert_cached(f"/api/decks/student/{self.owner.id}/")
+        theirs = self.assert_cached(f"/api/decks/student/{other.id}/")
+        self.deck.owner = other
+        with self.captureOnCommitCallbacks(execute=True):
+            self.deck.save()
+        self.assert_changed(f"/api/decks/student/{self.owner.id}/", mine)
+        self.assert_changed(f"/api/decks/student/{other.id}/", theirs)
+
+    def test_flashcards_by_deck_after_review(self):
+        url = f"/api/flashcards/deck/{self.deck.id}/"
+        before = self.assert_cached(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/flashcards/review/{self.card.id}/", {"quality": 5}, format="json")
+        after = self.assert_changed(url, before)
+        self.assertEqual(after.data["data"][0]["repetitions"], 1)
+
+    def test_group_members(self):
+        url = f"/api/group_members/{self.group.id}/"
+        before = self.assert_cached(url)
+        newcomer = Student.objects.create(name="Newcomer", email="newcomer@example.com")
+        with self.captureOnCommitCallbacks(execute=True):
+            newcomer.groups.add(self.group)
+        before = self.assert_changed(url, before)
+        self.assertEqual(len(before.data["data"]), 2)
+
+        self.owner.name = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.owner.save()
+        self.assert_changed(url, before)
+
+    def test_group_list(self):
+        before = self.assert_cached("/api/groups/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.members.clear()
+        after = self.assert_changed("/api/groups/", before)
+        self.assertEqual(after.data["data"][0]["members"], [])
+
+    def test_events(self):
+        list_before = self.assert_cached("/api/events/")
+        detail_before = self.assert_cached(f"/api/events/{self.event.id}/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.participants.add(self.owner)
+        self.assert_changed("/api/events/", list_before)
+        detail_after = self.assert_changed(f"/api/events/{self.event.id}/", detail_before)
+        self.assertEqual(detail_after.data["participants"], [self.owner.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.owner.delete()
+        self.assertEqual(self.client.get(f"/api/events/{self.event.id}/").data["participants"], [])
+
+
+class DeltaSyncTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user("owner", password="owner-password-123")
+        self.owner = Student.objects.create(user=user, name="Owner", email="owner@example.com")
+        self.deck = Deck.objects.create(name="Biology", owner=self.owner)
+        self.card = Flashcard.objects.create(deck=self.deck, front_text="Cell", back_text="Unit of life")
+        self.module = DashboardModule.objects.create(student=self.owner, title="Biology")
+        self.lesson = Lesson.objects.create(dashboard_module=self.module, title="Cells")
+        self.group = Group.objects.create(name="Study group", max_students=5)
+        self.group.members.add(self.owner)
+        self.event = Event.objects.create(
+            event_title="Exam", start_datetime="2030-01-01T09:00:00", end_datetime="2030-01-01T11:00:00"
+        )
+        self.event.groups.add(self.group)
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def sync(self, since=None):
+        response = self.client.get("/api/sync/", {"since": since} if since else {})
+        self.assertEqual(response.status_code, 200, getattr(response, "data", ""))
+        return response.data
+
+    def ids(self, data, key):
+        return [row["id"] for row in data["changes"][key]]
+
+    def advance(self, watermark):
+        """Move every row's updated_at before ``watermark``, as if the last sync was a while ago."""
+        earlier = datetime.fromisoformat(watermark) - timedelta(minutes=1)
+        for model in (Deck, Flashcard, DashboardModule, Lesson, Event):
+            model.objects.update(updated_at=earlier)
+        Tombstone.objects.update(deleted_at=earlier)
+
+    def test_full_snapshot_without_watermark(self):
+        data = self.sync()
+        self.assertTrue(data["full"])
+        self.assertEqual(self.ids(data, "decks"), [self.deck.id])
+        self.assertEqual(self.ids(data, "flashcards"), [self.card.id])
+        self.assertEqual(self.ids(data, "dashboard_modules"), [self.module.id])
+        self.assertEqual(self.ids(data, "lessons"), [self.lesson.id])
+        self.assertEqual(self.ids(data, "events"), [self.event.id])
+
+    def test_delta_returns_only_changed_rows(self):
+        watermark = self.sync()["watermark"]
+        self.advance(watermark)
+        self.assertEqual(self.sync(watermark)["changes"], {key: [] for key in COLLECTIONS})
+
+        self.client.post(f"/api/flashcards/review/{self.card.id}/", {"quality": 5}, format="json")
+        self.lesson.title = "Cell biology"
+        self.lesson.save()
+        data = self.sync(watermark)
+        self.assertFalse(data["full"])
+        self.assertEqual(self.ids(data, "flashcards"), [self.card.id])
+        self.assertEqual(self.ids(data, "lessons"), [self.lesson.id])
+        self.assertEqual(self.ids(data, "decks"), [])
+
+    def test_deletions_are_tombstoned(self):
+        other_deck = Deck.objects.create(name="Chemistry", owner=self.owner)
+        watermark = self.sync()["watermark"]
+        self.advance(watermark)
+
+        expected = {
+            "flashcards": [self.card.id], "decks": [other_deck.id],
+            "dashboard_modules": [self.module.id], "events": [self.event.id],
+        }
+        for instance in (self.card, other_deck, self.module, self.event):
+            instance.delete()
+        deleted = self.sync(watermark)["deleted"]
+        for key, ids in expected.items():
+            self.assertEqual(deleted[key], ids, key)
+        # The module's lessons went with it; no separate tombstones.
+        self.assertEqual(deleted["lessons"], [])
+
+    def test_losing_access_to_an_event_reads_as_a_deletion(self):
+        watermark = self.sync()["watermark"]
+        self.advance(watermark)
+        self.group.members.remove(self.owner)
+        data = self.sync(watermark)
+        self.assertEqual(data["deleted"]["events"], [self.event.id])
+        self.assertEqual(self.ids(data, "events"), [])
+
+    def test_other_students_deletions_are_private(self):
+        other = Student.objects.create(name="Other", email="other@example.com")
+        watermark = self.sync()["watermark"]
+        Deck.objects.create(name="Theirs", owner=other).delete()
+        self.assertEqual(self.sync(watermark)["deleted"]["decks"], [])
+
+    def test_other_students_events_are_not_reported(self):
+        other = Student.objects.create(name="Other", email="other@example.com")
+        private = Event.objects.create(
+            event_title="Private", start_datetime="2030-01-02T09:00:00", end_datetime="2030-01-02T10:00:00"
+        )
+        private.participants.add(other)
+        doomed = Event.objects.create(
+            event_title="Cancelled", start_datetime="2030-01-03T09:00:00", end_datetime="2030-01-03T10:00:00"
+        )
+        doomed.participants.add(other)
+        doomed_id = doomed.id
+        watermark = self.sync()["watermark"]
+        self.advance(watermark)
+
+        private.event_title = "Renamed"
+        private.save()
+        private.participants.remove(other)
+        doomed.delete()
+        data = self.sync(watermark)
+        self.assertEqual(data["deleted"]["events"], [])
+        self.assertEqual(self.ids(data, "events"), [])
+        self.assertEqual(
+            sorted(Tombstone.objects.filter(student=other).values_list("object_id", flat=True)),
+            sorted([private.id, doomed_id]),
+        )
+
+    def test_still_visible_events_are_not_deleted(self):
+        self.event.participants.add(self.owner)
+        watermark = self.sync()["watermark"]
+        self.advance(watermark)
+        # Still a participant, so leaving the group doesn't hide the event.
+        self.group.members.remove(self.owner)
+        self.assertEqual(self.sync(watermark)["deleted"]["events"], [])
+        self.event.participants.clear()
+        self.assertEqual(self.sync(watermark)["deleted"]["events"], [self.event.id])
+
+    def test_deleting_a_group_hides_its_events(self):
+        watermark = self.sync()["watermark"]
+        self.advance(watermark)
+        self.group.delete()
+        self.assertEqual(self.sync(watermark)["deleted"]["events"], [self.event.id])
+
+    def test_expired_watermark_gets_a_full_snapshot(self):
+        data = self.sync((datetime.now() - timedelta(days=365)).isoformat())
+        self.assertTrue(data["full"])
+        self.assertEqual(self.ids(data, "decks"), [self.deck.id])
+
+    def test_invalid_watermark(self):
+        self.assertEqual(self.client.get("/api/sync/", {"since": "yesterday"}).status_code, 400)
+
+
+class RecurrenceTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.client = APIClient()
+        self.weekly = Event.objects.create(
+            event_title="Seminar", start_datetime=datetime(2030, 1, 7, 9), end_datetime=datetime(2030, 1, 7, 11),
+            recurring_rule="FREQ=WEEKLY;BYDAY=MO",
+        )
+
+    def window(self, start, end):
+        response = self.client.get("/api/events/", {"start": start, "end": end})
+        self.assertEqual(response.status_code, 200, getattr(response, "data", ""))
+        return [(row["id"], row["occurrence_start"]) for row in response.data]
+
+    def test_expands_only_inside_the_window(self):
+        once = Event.objects.create(
+            event_title="Exam", start_datetime=datetime(2031, 3, 5, 9), end_datetime=datetime(2031, 3, 5, 12)
+        )
+        occurrences = self.window("2031-03-01T00:00:00", "2031-03-15T00:00:00")
+        self.assertEqual(occurrences, [
+            (self.weekly.id, "2031-03-03T09:00:00"),
+            (once.id, "2031-03-05T09:00:00"),
+            (self.weekly.id, "2031-03-10T09:00:00"),
+        ])
+
+    def test_occurrence_running_into_the_window_is_included(self):
+        self.assertEqual(self.window("2030-01-14T10:00:00", "2030-01-14T10:30:00"), [(self.weekly.id, "2030-01-14T09:00:00")])
+        self.assertEqual(self.window("2030-01-14T11:00:00", "2030-01-14T12:00:00"), [])
+
+    def test_finite_series_records_its_end(self):
+        self.weekly.recurring_rule = "RRULE:FREQ=WEEKLY;COUNT=3\nEXDATE:20300114T090000"
+        self.weekly.save()
+        self.assertEqual(self.weekly.series_end, datetime(2030, 1, 21, 11))
+        self.assertEqual(self.window("2030-01-01T00:00:00", "2030-02-01T00:00:00"), [
+            (self.weekly.id, "2030-01-07T09:00:00"), (self.weekly.id, "2030-01-21T09:00:00"),
+        ])
+        self.assertEqual(self.window("2030-02-01T00:00:00", "2030-03-01T00:00:00"), [])
+
+    def test_expansion_is_cached_until_the_event_changes(self):
+        window = (datetime(2030, 2, 1), datetime(2030, 3, 1))
+        first = expand([self.weekly], *window)
+        with mock.patch("student.recurrence._recurring_starts") as generate:
+            self.assertEqual(expand([self.weekly], *window), first)
+            generate.assert_not_called()
+
+        self.weekly.recurring_rule = "FREQ=WEEKLY;BYDAY=MO,WE"
+        self.weekly.save()
+        self.assertEqual(len(expand([self.weekly], *window)), 2 * len(first))
+
+    def test_invalid_rule_is_rejected(self):
+        response = self.client.post("/api/events/", {
+            "event_title": "Broken", "start_datetime": "2030-01-01T09:00:00", "end_datetime": "2030-01-01T10:00:00",
+            "recurring_rule": "FREQ=SOMETIMES",
+        }, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("recurring_rule", response.data)
+
+    def test_window_must_be_bounded(self):
+        self.assertEqual(self.client.get("/api/events/", {"start": "2030-01-01T00:00:00"}).status_code, 400)
+        response = self.client.get("/api/events/", {"start": "2030-01-01T00:00:00", "end": "2032-01-01T00:00:00"})
+        self.assertEqual(response.status_code, 400)
+
+
+class StreamingTests(TestCase):
+    """Streamed replies must reach ASGI clients token by token, not once the LLM is done."""
+
+    async def assert_first_token_arrives_early(self, path, body, async_target, sync_target):
+        release = asyncio.Event()
+
+        async def slow_reply(*args, **kwargs):
+            yield "First"
+            await release.wait()
+            yield " and the rest"
+
+        with mock.patch(async_target, new=slow_reply), \
+                mock.patch(sync_target, side_effect=AssertionError("sync generator used under ASGI")):
+            response = await AsyncClient().post(path, body, content_type="application/json")
+            chunks = aiter(response)
+            first = await asyncio.wait_for(anext(chunks), timeout=5)
+            self.assertIn(b'"token": "First"', first)
+            release.set()
+            rest = b"".join([chunk async for chunk in chunks])
+        self.assertIn(b"event: done", rest)
+        self.assertIn(b"First and the rest", rest)
+
+    async def test_study_plan_stream(self):
+        await self.assert_first_token_arrives_early(
+            "/api/study_plan/", {"prompt": "Plan my week", "stream": True},
+            "student.views.astream_study_plan", "student.views.stream_study_plan",
+        )
+
+    async def test_wellness_stream(self):
+        await self.assert_first_token_arrives_early(
+            "/api/wellness/", {"query": "I feel stressed", "stream": True},
+            "student.views.astream_wellness_response", "student.views.stream_wellness_response",
+        )
+
+    def test_anonymous_requests_cannot_write_as_a_student(self):
+        victim = Student.objects.create(name="Victim", email="victim@example.com")
+        with mock.patch("student.views.stream_study_plan", return_value=iter(["Plan"])), \
+                mock.patch("student.views.stream_wellness_response", return_value=iter(["Breathe"])):
+            for path, body in (
+                ("/api/study_plan/", {"prompt": "Plan", "stream": True, "student": victim.id}),
+                ("/api/wellness/", {"query": "Hi", "stream": True, "student_id": victim.id}),
+            ):
+                response = APIClient().post(path, body, format="json")
+                b"".join(response.streaming_content)
+        self.assertFalse(StudyChatbox.objects.filter(student=victim).exists())
+        self.assertFalse(WellnessChat.objects.filter(student=victim).exists())
+
+
+class StudyPlanJobTests(TestCase):
+    def test_job_that_keeps_killing_its_worker_is_failed(self):
+        job = StudyPlanJob.objects.create(prompt="Plan", max_attempts=2)
+        for attempt in (1, 2):
+            claimed = claim_next_job()
+            self.assertEqual((claimed.id, claimed.attempts), (job.id, attempt))
+            # The worker dies mid-attempt; the lock goes stale.
+            StudyPlanJob.objects.filter(id=job.id).update(locked_at=datetime.now() - timedelta(days=1))
+        self.assertIsNone(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+
+    def test_anonymous_jobs_need_their_key(self):
+        with mock.patch("student.views.job_settings", return_value={"DEFAULT_BACKGROUND": True}):
+            response = APIClient().post("/api/study_plan/", {"prompt": "Plan"}, format="json")
+        self.assertEqual(response.status_code, 202)
+        path, _, query = response.data["status_url"].partition("?")
+        self.assertTrue(query.startswith("key="))
+        client = APIClient()
+        self.assertEqual(client.get(path).status_code, 404)
+        self.assertEqual(client.get(path, {"key": "guess"}).status_code, 404)
+        self.assertEqual(client.get(response.data["status_url"]).status_code, 200)
+
+    def test_student_jobs_are_private(self):
+        owner = Student.objects.create(name="Owner", email="owner@example.com")
+        job = StudyPlanJob.objects.create(prompt="Plan", student=owner)
+        self.assertEqual(APIClient().get(f"/api/study_plan/jobs/{job.id}/").status_code, 404)
+        intruder = User.objects.create_user("intruder", password="intruder-password-1")
+        Student.objects.create(user=intruder, name="Intruder", email="intruder@example.com")
+        client = APIClient()
+        client.force_authenticate(intruder)
+        self.assertEqual(client.get(f"/api/study_plan/jobs/{job.id}/").status_code, 404)
+
+
+def _rate_limited():
+    response = httpx.Response(429, request=httpx.Request("POST", "https://llm.test/chat/completions"))
+    return openai.RateLimitError("Slow down", response=response, body=None)
+
+
+class LLMClientTests(SimpleTestCase):
+    def make_client(self, **options):
+        client = LLMClient("test-model", "test-key", **options)
+        client._llm = mock.Mock()
+        client._retry_delay = mock.Mock(return_value=0)
+        return client
+
+    def test_retryable_errors_are_retried(self):
+        client = self.make_client(MAX_RETRIES=2)
+        client._llm.invoke.side_effect = [_rate_limited(), _rate_limited(), AIMessage(content="A plan")]
+        self.assertEqual(client.invoke([HumanMessage(content="Plan")]).content, "A plan")
+        self.assertEqual(client._llm.invoke.call_count, 3)
+        self.assertEqual(client.breaker.state, "closed")
+
+    def test_exhausted_retries_open_the_circuit(self):
+        client = self.make_client(MAX_RETRIES=1, CIRCUIT_FAILURE_THRESHOLD=2)
+        client._llm.invoke.side_effect = _rate_limited()
+        with self.assertLogs("student.llm_client", "ERROR"):
+            for _ in range(2):
+                with self.assertRaises(LLMUnavailableError):
+                    client.invoke([HumanMessage(content="Plan")])
+        self.assertEqual(client._llm.invoke.call_count, 4)
+        self.assertEqual(client.breaker.state, "open")
+
+        with self.assertRaises(LLMUnavailableError):
+            client.invoke([HumanMessage(content="Plan")])
+        self.assertEqual(client._llm.invoke.call_count, 4)  # failed fast
+
+        client.breaker.opened_at -= client.breaker.reset_timeout
+        client._llm.invoke.side_effect = None
+        client._llm.invoke.return_value = AIMessage(content="Back")
+        self.assertEqual(client.invoke([HumanMessage(content="Plan")]).content, "Back")
+        self.assertEqual(client.breaker.state, "closed")
+
+    def test_half_open_lets_one_trial_through(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        early = breaker.allow()
+        with self.assertLogs("student.llm_client", "ERROR"):
+            breaker.record("failure", breaker.allow())
+        breaker.opened_at -= 30
+        trial = breaker.allow()
+        self.assertEqual(trial, "trial")
+        self.assertIsNone(breaker.allow())
+        # A call that started before the breaker opened must not free the trial slot.
+        breaker.record(None, early)
+        self.assertIsNone(breaker.allow())
+        with self.assertLogs("student.llm_client", "ERROR"):
+            breaker.record("failure", trial)
+        self.assertEqual(breaker.state, "open")
+
+    def test_concurrency_limit(self):
+        client = self.make_client(MAX_CONCURRENCY=1, ACQUIRE_TIMEOUT=0.05)
+        client._llm.invoke.return_value = AIMessage(content="A plan")
+        with client._slot():
+            with self.assertRaises(LLMUnavailableError):
+                client.invoke([HumanMessage(content="Plan")])
+        self.assertEqual(client.invoke([HumanMessage(content="Plan")]).content, "A plan")
+
+    def test_async_waiters_are_handed_released_slots(self):
+        slots = SlotPool(1)
+
+        async def scenario():
+            self.assertTrue(slots.acquire(timeout=0))
+            waiting = asyncio.ensure_future(slots.aacquire(timeout=5))
+            await asyncio.sleep(0)
+            self.assertFalse(waiting.done())
+            threading.Thread(target=slots.release).start()
+            self.assertTrue(await waiting)
+            self.assertFalse(await slots.aacquire(timeout=0.01))
+            slots.release()
+            self.assertTrue(slots.acquire(timeout=0))
+
+        asyncio.run(scenario())
+
+    def test_async_http_client_is_closed_with_its_loop(self):
+        client = self.make_client()
+        created = []
+        close_on_shutdown = llm_client._close_on_loop_shutdown
+
+        def record(http_client, forget):
+            created.append(http_client)
+            return close_on_shutdown(http_client, forget)
+
+        async def use_client():
+            first = await client._async_llm()
+            self.assertIs(await client._async_llm(), first)
+
+        with mock.patch("student.llm_client._close_on_loop_shutdown", side_effect=record):
+            asyncio.run(use_client())
+            asyncio.run(use_client())
+        self.assertEqual(len(created), 2)
+        self.assertTrue(all(http_client.is_closed for http_client in created))
+        self.assertEqual(len(client._async_llms), 0)
+
+
+class InlineExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+@override_settings(STUDY_CHAT_CONTEXT={"MAX_TURNS": 2, "SUMMARY_CHUNK": 2})
+class ChatContextTests(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(name="Chatty", email="chatty@example.com")
+        StudyChatbox.objects.bulk_create([
+            StudyChatbox(student=self.student, user_message=f"Q{i}", bot_response=f"A{i}", category="GENERAL")
+            for i in range(6)
+        ])
+        # Run the background refresh inline, inside the test transaction.
+        for patch in (
+            mock.patch("student.chat_context._summary_executor", InlineExecutor()),
+            mock.patch("student.chat_context.close_old_connections"),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_summary_is_refreshed_after_the_request(self):
+        with mock.patch("student.chat_context.summarize_conversation", return_value="Earlier: Q0-Q3") as summarize:
+            with self.captureOnCommitCallbacks() as callbacks:
+                context = build_conversation_context(self.student)
+            summarize.assert_not_called()
+            self.assertEqual(context.summary, "")
+            self.assertEqual(context.turns, [("Q4", "A4"), ("Q5", "A5")])
+            for callback in callbacks:
+                callback()
+            summarize.assert_called_once()
+        self.assertEqual(build_conversation_context(self.student).summary, "Earlier: Q0-Q3")
+
+    def test_first_questions_share_the_prompt_cache(self):
+        get_response_cache().clear()
+        clients = []
+        for name in ("first", "second"):
+            user = User.objects.create_user(name, password=f"{name}-password-123")
+            student = Student.objects.create(user=user, name=name, email=f"{name}@example.com")
+            StudyChatbox.objects.create(student=student, user_message=f"{name} Q", bot_response="A", category="GENERAL")
+            client = APIClient()
+            client.force_authenticate(user)
+            clients.append(client)
+
+        body = {"prompt": "Plan my exam week", "background": False}
+        with mock.patch("student.ai_utils.llm.invoke", return_value=AIMessage(content="A plan")) as invoke:
+            for client in clients:
+                self.assertEqual(client.post("/api/study_plan/", body, format="json").data["data"], "A plan")
+            self.assertEqual(invoke.call_count, 1)
+            # A follow-up depends on the student's own history.
+            clients[0].post("/api/study_plan/", {**body, "follow_up": True}, format="json")
+            self.assertEqual(invoke.call_count, 2)
+            self.assertEqual(invoke.call_args.args[0][0].content, "first Q")
+
+    def test_provider_errors_keep_the_previous_summary(self):
+        StudyChatSummary.objects.create(student=self.student, summary="Old summary")
+        request = httpx.Request("POST", "https://llm.test/chat/completions")
+        error = openai.BadRequestError("Bad request", response=httpx.Response(400, request=request), body=None)
+        with mock.patch("student.chat_context.summarize_conversation", side_effect=error), \
+                self.assertLogs("student.chat_context", "WARNING"):
+            with self.captureOnCommitCallbacks(execute=True):
+                context = build_conversation_context(self.student)
+        self.assertEqual(context.summary, "Old summary")
+        self.assertEqual(StudyChatSummary.objects.get(student=self.student).summary, "Old summary")
+
+
+
+class SpacedRepetitionTests(SimpleTestCase):
+    def assertState(self, state, ease_factor, interval_days, repetitions):
+        self.assertAlmostEqual(state[0], ease_factor)
+        self.assertEqual(state[1:], (interval_days, repetitions))
+
+    def test_recalled_cards_move_out_by_one_six_then_ease(self):
+        state = next_state(2.5, 0, 0, 5)
+        self.assertState(state, 2.6, 1, 1)
+        state = next_state(*state, 5)
+        self.assertState(state, 2.7, 6, 2)
+        # The interval grows by the ease factor held before this review.
+        state = next_state(*state, 4)
+        self.assertState(state, 2.7, 16, 3)
+        state = next_state(*state, 3)
+        self.assertState(state, 2.56, 43, 4)
+
+    def test_a_failed_review_starts_the_card_over(self):
+        self.assertState(next_state(2.7, 16, 3, 2), 2.38, 1, 0)
+        self.assertState(next_state(2.5, 6, 2, 0), 1.7, 1, 0)
+        # The next pass after a lapse is one day out again, then six.
+        self.assertState(next_state(2.38, 1, 0, 4), 2.38, 1, 1)
+
+    def test_ease_factor_never_drops_below_the_floor(self):
+        self.assertState(next_state(1.4, 1, 0, 0), MIN_EASE_FACTOR, 1, 0)
+        self.assertState(next_state(MIN_EASE_FACTOR, 6, 2, 3), MIN_EASE_FACTOR, 8, 3)
+
+    def test_quality_outside_zero_to_five_is_rejected(self):
+        for quality in (-1, 6):
+            with self.assertRaises(ValueError):
+                next_state(2.5, 0, 0, quality)
+
+    def test_schedule_sets_the_due_date_from_the_review_time(self):
+        card = Flashcard(ease_factor=2.6, interval_days=1, repetitions=1, times_reviewed=1)
+        reviewed_at = datetime(2030, 1, 1, 9, 0)
+        schedule(card, 5, reviewed_at)
+        self.assertEqual((card.interval_days, card.repetitions, card.times_reviewed), (6, 2, 2))
+        self.assertEqual(card.due_at, datetime(2030, 1, 7, 9, 0))
+        self.assertEqual(card.last_reviewed_date, reviewed_at)
+
+
+class FlashcardImportTests(TestCase):
+    def setUp(self):
+        owner = Student.objects.create(name="Importer", email="importer@example.com")
+        self.deck = Deck.objects.create(name="Biology", owner=owner)
+        self.client = APIClient()
+
+    def upload(self, name, content):
+        return self.client.post(
+            "/api/flashcards/bulk/",
+            {"deck": self.deck.id, "file": SimpleUploadedFile(name, content.encode("utf-8"))},
+            format="multipart",
+        )
+
+    def cards(self):
+        return list(self.deck.flashcards.order_by("id").values_list("front_text", "back_text", "category"))
+
+    def test_csv_header_aliases(self):
+        response = self.upload("cards.csv", 'Question,Answer,Tags\nCell,"Unit of life, smallest",bio\nDNA,Genes,\n')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(self.cards(), [("Cell", "Unit of life, smallest", "bio"), ("DNA", "Genes", "")])
+
+    def test_csv_without_front_and_back_columns_is_rejected(self):
+        response = self.upload("cards.csv", "term,definition\nCell,Unit of life\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.cards(), [])
+
+    def test_anki_tsv_export(self):
+        content = "#separator:tab\n#html:false\nCell\tUnit of life\tbio\nDNA\tGenes\n\nRNA\n"
+        response = self.upload("export.txt", content)
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(self.cards(), [("Cell", "Unit of life", "bio"), ("DNA", "Genes", None)])
+        # The back is required, so the lone "RNA" row is reported, numbered after the directives are dropped.
+        self.assertEqual([error["row"] for error in response.data["errors"]], [3])
+
+    def test_quoted_fields_may_span_lines(self):
+        response = self.upload("cards.csv", 'front,back\nMitosis,"Prophase\n\nMetaphase\nAnaphase"\nDNA,Genes\n')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(self.cards(), [("Mitosis", "Prophase\n\nMetaphase\nAnaphase", None), ("DNA", "Genes", None)])
+
+        response = self.upload("export.txt", '#separator:tab\nKrebs cycle\t"Citrate\nIsocitrate"\tbio\n')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(self.cards()[-1], ("Krebs cycle", "Citrate\nIsocitrate", "bio"))
+
+    def test_cards_starting_with_a_hash_are_kept(self):
+        content = "#separator:tab\n#tags column:3\n#include\tPreprocessor directive\tc\n#1 rule\tBe kind\n"
+        response = self.upload("export.txt", content)
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(self.cards(), [("#include", "Preprocessor directive", "c"), ("#1 rule", "Be kind", None)])
+
+    def test_tab_separated_content_is_detected_without_an_extension(self):
+        response = self.upload("cards", "Cell\tUnit of life\n")
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(self.cards(), [("Cell", "Unit of life", None)])
+
+    def test_non_utf8_upload_is_rejected(self):
+        response = self.client.post(
+            "/api/flashcards/bulk/",
+            {"deck": self.deck.id, "file": SimpleUploadedFile("cards.csv", "front,back\nCaf\xe9,Coffee\n".encode("latin-1"))},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(FLASHCARD_IMPORT={"COPY_THRESHOLD": 2})
+    def test_large_batches_are_copied(self):
+        rows = [
+            {"front_text": 'Say "hello"', "back_text": "Line one\nLine two, with a comma", "category": None},
+            {"front_text": "Backslash \\N", "back_text": "Not NULL", "difficulty_level": "", "category": "bio"},
+        ]
+        with mock.patch.object(flashcard_import, "_copy_flashcards", wraps=flashcard_import._copy_flashcards) as copy:
+            response = self.client.post(
+                "/api/flashcards/bulk/", {"deck": self.deck.id, "flashcards": rows}, format="json"
+            )
+        self.assertEqual((response.status_code, response.data["errors"]), (201, []))
+        copy.assert_called_once()
+        cards = list(self.deck.flashcards.order_by("id"))
+        self.assertEqual(
+            [(card.front_text, card.back_text, card.difficulty_level, card.category) for card in cards],
+            [
+                ('Say "hello"', "Line one\nLine two, with a comma", None, None),
+                ("Backslash \\N", "Not NULL", "", "bio"),
+            ],
+        )
+        for card in cards:
+            # Defaults and auto_now columns are filled as an ORM insert would, and the search trigger runs.
+            self.assertIsNotNone(card.updated_at)
+            self.assertIsNotNone(card.due_at)
+            self.assertEqual((card.ease_factor, card.interval_days, card.repetitions), (2.5, 0, 0))
+            self.assertIsNotNone(card.search_vector)
+
+    def test_small_batches_use_bulk_create(self):
+        with mock.patch.object(flashcard_import, "_copy_flashcards") as copy:
+            response = self.client.post(
+                "/api/flashcards/bulk/",
+                {"deck": self.deck.id, "flashcards": [{"front_text": "Cell", "back_text": "Unit of life"}]},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 201, response.data)
+        copy.assert_not_called()
+        self.assertEqual(self.cards(), [("Cell", "Unit of life", None)])
+
+
+class ReviewSyncTests(TestCase):
+    def setUp(self):
+        owner = Student.objects.create(name="Reviewer", email="reviewer@example.com")
+        deck = Deck.objects.create(name="Biology", owner=owner)
+        self.cell = Flashcard.objects.create(deck=deck, front_text="Cell", back_text="Unit of life")
+        self.dna = Flashcard.objects.create(deck=deck, front_text="DNA", back_text="Genes")
+        self.client = APIClient()
+
+    def sync(self, key, reviews, **headers):
+        return self.client.post(
+            "/api/flashcards/review/sync/",
+            {"idempotency_key": key, "reviews": reviews} if key else {"reviews": reviews},
+            format="json",
+            **headers,
+        )
+
+    def review(self, card, quality, day):
+        return {"flashcard": card.id, "quality": quality, "reviewed_at": f"2030-01-{day:02d}T09:00:00"}
+
+    def test_reviews_are_applied_oldest_first(self):
+        response = self.sync("session-1", [self.review(self.cell, 5, 2), self.review(self.cell, 5, 1)])
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data["applied"], response.data["conflicts"], response.data["replayed"]), (2, [], False))
+        self.cell.refresh_from_db()
+        self.assertEqual((self.cell.repetitions, self.cell.interval_days), (2, 6))
+        self.assertEqual(self.cell.due_at, datetime(2030, 1, 8, 9, 0))
+
+    def test_replaying_a_key_returns_the_stored_result_without_rescheduling(self):
+        reviews = [self.review(self.cell, 5, 1), self.review(self.dna, 1, 1)]
+        first = self.sync("session-1", reviews)
+        self.cell.refresh_from_db()
+        due_at = self.cell.due_at
+
+        # A retried request may reorder the reviews; it is still the same batch.
+        replay = self.sync(None, list(reversed(reviews)), HTTP_IDEMPOTENCY_KEY="session-1")
+        self.assertEqual(replay.status_code, 200, replay.data)
+        self.assertTrue(replay.data["replayed"])
+        self.assertEqual(
+            (replay.data["applied"], replay.data["conflicts"]), (first.data["applied"], first.data["conflicts"])
+        )
+        self.cell.refresh_from_db()
+        self.assertEqual((self.cell.times_reviewed, self.cell.due_at), (1, due_at))
+
+    def test_reusing_a_key_for_a_different_batch_is_a_conflict(self):
+        self.sync("session-1", [self.review(self.cell, 5, 1)])
+        response = self.sync("session-1", [self.review(self.cell, 3, 1)])
+        self.assertEqual(response.status_code, 409)
+        self.cell.refresh_from_db()
+        self.assertEqual(self.cell.times_reviewed, 1)
+        with self.assertRaises(IdempotencyConflict):
+            apply_review_batch("session-1", [
+                {"flashcard": self.dna.id, "quality": 5, "reviewed_at": datetime(2030, 1, 1, 9, 0)},
+            ])
+
+    def test_stale_and_missing_cards_are_reported(self):
+        self.client.post(f"/api/flashcards/review/{self.cell.id}/", {"quality": 4}, format="json")
+        self.cell.refresh_from_db()
+        reviewed_online = self.cell.last_reviewed_date
+        missing = self.dna.id + 1000
+        response = self.sync("session-1", [
+            # Reviewed offline before the online review above.
+            {"flashcard": self.cell.id, "quality": 5, "reviewed_at": (reviewed_online - timedelta(hours=1)).isoformat()},
+            {"flashcard": missing, "quality": 5, "reviewed_at": "2030-01-01T09:00:00"},
+            self.review(self.dna, 5, 1),
+        ])
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data["applied"], 1)
+        self.assertCountEqual(response.data["conflicts"], [
+            {"flashcard": self.cell.id, "reason": "stale"},
+            {"flashcard": missing, "reason": "not_found"},
+        ])
+        self.cell.refresh_from_db()
+        self.assertEqual((self.cell.times_reviewed, self.cell.last_reviewed_date), (1, reviewed_online))
+
+
+class LLMCacheTests(SimpleTestCase):
+    def setUp(self):
+        caches["default"].clear()
+
+    def test_prompts_are_normalized(self):
+        self.assertEqual(normalize_prompt("  Plan my\tWEEK\n\nplease!! "), "plan my week please")
+        self.assertEqual(normalize_prompt("Ｐｌａｎ ｍｙ ｗｅｅｋ."), "plan my week")
+        self.assertEqual(
+            make_cache_key("Plan my week", "model", "v1"), make_cache_key("plan  MY week?", "model", "v1")
+        )
+        self.assertNotEqual(make_cache_key("Plan my week", "model", "v1"), make_cache_key("Plan my week", "model", "v2"))
+        self.assertNotEqual(make_cache_key("Plan my week", "model", "v1"), make_cache_key("Plan my month", "model", "v1"))
+
+    def test_lru_evicts_the_least_recently_used_entry(self):
+        lru = LRUCache(max_entries=2, ttl=60)
+        lru.set("a", 1)
+        lru.set("b", 2)
+        self.assertEqual(lru.get("a"), 1)  # "b" is now the oldest
+        lru.set("c", 3)
+        self.assertEqual((lru.get("a"), lru.get("b"), lru.get("c")), (1, None, 3))
+        self.assertEqual(len(lru), 2)
+
+    def test_lru_entries_expire(self):
+        lru = LRUCache(max_entries=10, ttl=60)
+        with mock.patch("student.llm_cache.time.monotonic", return_value=1000):
+            lru.set("a", 1)
+        with mock.patch("student.llm_cache.time.monotonic", return_value=1059):
+            self.assertEqual(lru.get("a"), 1)
+        with mock.patch("student.llm_cache.time.monotonic", return_value=1061):
+            self.assertIsNone(lru.get("a"))
+        self.assertEqual(len(lru), 0)
+
+    def test_shared_tier_fills_the_local_tier(self):
+        writer = LLMResponseCache(shared_alias="default")
+        writer.set("key", "A plan")
+        # Another worker: empty local LRU, same shared cache.
+        reader = LLMResponseCache(shared_alias="default")
+        self.assertEqual(reader.get("key"), "A plan")
+        self.assertEqual(reader.get("key"), "A plan")
+        self.assertIsNone(reader.get("other"))
+        self.assertEqual(reader.stats(), {
+            "hits": 2, "local_hits": 1, "shared_hits": 1, "misses": 1, "hit_ratio": 2 / 3, "local_entries": 1,
+        })
+
+    def test_shared_tier_errors_count_as_misses(self):
+        cache = LLMResponseCache(shared_alias="default")
+        with mock.patch.object(caches["default"], "get", side_effect=ConnectionError), \
+                self.assertLogs("student.llm_cache", "WARNING"):
+            self.assertIsNone(cache.get("key"))
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_local_only_and_disabled_caches(self):
+        local = LLMResponseCache(shared_alias=None)
+        local.set("key", "A plan")
+        local.set("empty", "")
+        self.assertEqual((local.get("key"), local.get("empty")), ("A plan", None))
+        self.assertIsNone(caches["default"].get("key"))
+
+        disabled = LLMResponseCache(enabled=False, shared_alias="default")
+        disabled.set("key", "A plan")
+        self.assertIsNone(disabled.get("key"))
+        self.assertEqual(disabled.stats()["misses"], 0)
+
+
+class FriendGraphTests(TestCase):
+    def setUp(self):
+        self.students = {}
+        for name in ("me", "a", "b", "x", "y", "z", "pending", "blocked"):
+            user = User.objects.create(username=name)
+            self.students[name] = Student.objects.create(user=user, name=name, email=f"{name}@example.com")
+        self.me = self.students["me"]
+        self.client = APIClient()
+        self.client.force_authenticate(self.me.user)
+
+    def befriend(self, *pairs, status="accepted"):
+        for sender, receiver in pairs:
+            Friendship.objects.create(sender=self.students[sender], receiver=self.students[receiver], status=status)
+
+    def edges(self):
+        names = {student.id: name for name, student in self.students.items()}
+        return {(names[s], names[f]) for s, f in FriendEdge.objects.values_list("student_id", "friend_id")}
+
+    def test_accepting_a_request_adds_both_edges(self):
+        friendship = Friendship.objects.create(sender=self.students["a"], receiver=self.me)
+        self.assertEqual(self.edges(), set())
+        response = self.client.post(f"/api/friendship/respond/{friendship.id}/", {"action": "accepted"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.edges(), {("a", "me"), ("me", "a")})
+        # Saving an accepted friendship again doesn't duplicate the edges.
+        friendship.refresh_from_db()
+        friendship.save()
+        self.assertEqual(FriendEdge.objects.count(), 2)
+
+    def test_blocking_unfriending_and_deleting_remove_the_edges(self):
+        self.befriend(("me", "a"), ("b", "me"), ("x", "me"))
+        a, b, x = (Friendship.objects.get(Q(sender=self.students[name]) | Q(receiver=self.students[name]))
+                   for name in ("a", "b", "x"))
+
+        self.assertEqual(self.client.post(f"/api/friendship/block/{b.id}/").status_code, 200)
+        self.assertEqual(self.client.delete(f"/api/friendship/delete/{a.id}/").status_code, 200)
+        self.assertEqual(self.edges(), {("me", "x"), ("x", "me")})
+        Friendship.objects.filter(pk=x.pk).delete()
+        self.assertEqual(self.edges(), set())
+
+    def test_load_adjacency(self):
+        self.befriend(("me", "a"), ("a", "b"))
+        self.befriend(("me", "x"), status="pending")
+        ids = {name: student.id for name, student in self.students.items()}
+        self.assertEqual(load_adjacency(chunk_size=1), {
+            ids["me"]: {ids["a"]},
+            ids["a"]: {ids["me"], ids["b"]},
+            ids["b"]: {ids["a"]},
+        })
+
+    def test_suggestions_rank_friends_of_friends(self):
+        self.befriend(("me", "a"), ("me", "b"), ("a", "b"))
+        self.befriend(("a", "x"), ("b", "x"), ("a", "y"), ("a", "pending"), ("blocked", "a"))
+        self.befriend(("me", "pending"), status="pending")
+        self.befriend(("blocked", "me"), status="blocked")
+
+        suggestions = [(row["friend_id"], row["mutual_friends"]) for row in friend_suggestions(self.me)]
+        # Not me, not my friends a and b, not pending or blocked.
+        self.assertEqual(suggestions, [(self.students["x"].id, 2), (self.students["y"].id, 1)])
+        self.assertEqual(len(friend_suggestions(self.me, limit=1)), 1)
+
+        response = self.client.get("/api/friendship/suggestions/")
+        self.assertEqual([(row["id"], row["mutual_friends"]) for row in response.data], suggestions)
+
+    def test_mutual_friend_counts(self):
+        self.befriend(("me", "a"), ("me", "b"), ("a", "x"), ("b", "x"), ("a", "y"), ("z", "blocked"))
+        ids = [self.students[name].id for name in ("x", "y", "z")]
+        self.assertEqual(mutual_friend_counts(self.me, ids), dict(zip(ids, [2, 1, 0])))
+
+
+class TypeaheadTests(TestCase):
+    def setUp(self):
+        self.students = {}
+        for name, email in [
+            ("Christopher Me", "me@example.com"),
+            ("Zed Park", "christopherzed@example.com"),
+            ("Cristopher Bell", "bell@example.com"),
+            ("Christopher Blocker", "blocker@example.com"),
+            ("Christopher Blocked", "blocked@example.com"),
+            ("Unrelated", "nobody@example.com"),
+        ]:
+            user = User.objects.create(username=email)
+            self.students[name] = Student.objects.create(user=user, name=name, email=email)
+        self.me = self.students["Christopher Me"]
+        self.client = APIClient()
+        self.client.force_authenticate(self.me.user)
+
+    def names(self, text):
+        response = self.client.get("/api/search/students/", {"q": text})
+        self.assertEqual(response.status_code, 200)
+        return [row["name"] for row in response.data["data"]]
+
+    def test_blocked_students_are_left_out_both_ways(self):
+        self.assertEqual(self.names("christopher blo"), ["Christopher Blocked", "Christopher Blocker"])
+        Friendship.objects.create(sender=self.students["Christopher Blocker"], receiver=self.me, status="blocked")
+        Friendship.objects.create(sender=self.me, receiver=self.students["Christopher Blocked"], status="blocked")
+        self.assertEqual(self.names("christopher blo"), [])
+        # Neither blocked student shows up on a broader lookup either, and the searcher never does.
+        self.assertEqual(self.names("christopher"), ["Zed Park", "Cristopher Bell"])
+
+    def test_prefix_matches_rank_above_similar_names(self):
+        Friendship.objects.create(sender=self.students["Christopher Blocker"], receiver=self.me, status="blocked")
+        Friendship.objects.create(sender=self.me, receiver=self.students["Christopher Blocked"], status="blocked")
+        rows = {student.name: student for student in typeahead_students(self.me, "christopher")}
+        # The fuzzy match is more similar than the email prefix match, yet ranks below it.
+        self.assertEqual(list(rows), ["Zed Park", "Cristopher Bell"])
+        self.assertEqual((rows["Zed Park"].prefix_match, rows["Cristopher Bell"].prefix_match), (1, 0))
+        self.assertGreater(rows["Cristopher Bell"].similarity, rows["Zed Park"].similarity)
+        self.assertEqual(len(typeahead_students(self.me, "christopher", limit=1)), 1)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.owner = Student.objects.create(name="Searcher", email="searcher@example.com")
+        self.deck = Deck.objects.create(name="Biology", description="Cells and genetics", owner=self.owner)
+        self.client = APIClient()
+
+    def matches(self, text):
+        return set(search(Flashcard.objects.all(), text).values_list("front_text", flat=True))
+
+    def test_trigger_fills_the_vector_on_insert_and_update(self):
+        card = Flashcard.objects.create(deck=self.deck, front_text="Mitochondria", back_text="Powerhouse of the cell")
+        self.assertEqual(self.matches("powerhouse"), {"Mitochondria"})
+
+        card.back_text = "Site of respiration"
+        card.save()
+        self.assertEqual(self.matches("powerhouse"), set())
+        self.assertEqual(self.matches("respiration"), {"Mitochondria"})
+
+        Flashcard.objects.filter(pk=card.pk).update(front_text="Chloroplast")
+        self.assertEqual(self.matches("respiration"), {"Chloroplast"})
+        # Stemming comes from the english configuration the triggers use.
+        self.assertEqual(self.matches("respirations"), {"Chloroplast"})
+
+        self.deck.description = "Photosynthesis"
+        self.deck.save()
+        self.assertTrue(search(Deck.objects.all(), "photosynthesis").exists())
+
+    def test_trigger_fills_the_vector_on_bulk_paths(self):
+        Flashcard.objects.bulk_create([Flashcard(deck=self.deck, front_text="Ribosome", back_text="Makes protein")])
+        with override_settings(FLASHCARD_IMPORT={"COPY_THRESHOLD": 1}):
+            with mock.patch.object(flashcard_import, "_copy_flashcards", wraps=flashcard_import._copy_flashcards) as copy:
+                flashcard_import.import_flashcards(self.deck, [{"front_text": "Golgi", "back_text": "Packages protein"}])
+        copy.assert_called_once()
+        self.assertFalse(Flashcard.objects.filter(search_vector=None).exists())
+        self.assertEqual(self.matches("protein"), {"Ribosome", "Golgi"})
+
+    def test_results_are_ordered_by_rank(self):
+        # The front is weighted above the back, and more occurrences rank higher.
+        Flashcard.objects.create(deck=self.deck, front_text="Nucleus", back_text="Holds the genome")
+        Flashcard.objects.create(deck=self.deck, front_text="Genome", back_text="All of the genetic material")
+        Flashcard.objects.create(deck=self.deck, front_text="Genome size", back_text="Genome length in base pairs")
+        Flashcard.objects.create(deck=self.deck, front_text="Unrelated", back_text="Nothing to see")
+
+        response = self.client.get("/api/search/flashcards/", {"q": "genome"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["front_text"] for row in response.data["data"]], ["Genome size", "Genome", "Nucleus"])
+        ranks = list(search(Flashcard.objects.all(), "genome").values_list("rank", flat=True))
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+
+    def test_ranked_pagination_links(self):
+        for i in range(3):
+            Flashcard.objects.create(deck=self.deck, front_text=f"Enzyme {i}", back_text="Catalyst")
+        seen, pages = [], []
+        url = f"/api/search/flashcards/?q=catalyst&deck={self.deck.id}&page_size=1"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response)
+            seen += [row["id"] for row in response.data["data"]]
+            url = response.data["next"]
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(sorted(seen), sorted(Flashcard.objects.values_list("id", flat=True)))
+
+        first, second, third = (page.data for page in pages)
+        self.assertIsNone(first["previous"])
+        self.assertIn("page=2", first["next"])
+        self.assertIn("q=catalyst", first["next"])
+        # Page two links back to the bare URL rather than page=1.
+        self.assertNotRegex(second["previous"], r"[?&]page=")
+        self.assertIn("page_size=1", second["previous"])
+        self.assertIn("page=3", second["next"])
+        self.assertIn("page=2", third["previous"])
+        self.assertIsNone(third["next"])
+        self.assertEqual(pages[1]["Link"], f'<{second["next"]}>; rel="next", <{second["previous"]}>; rel="prev"')
+        self.assertEqual(pages[2]["Link"], f'<{third["previous"]}>; rel="prev"')
+
+
+class CursorPaginationTests(TestCase):
+    LIST_VIEWS = [
+        "/api/get_all_students/", "/api/decks/", "/api/flashcards/", "/api/discussions/",
+        "/api/studychatbox/all/", "/api/wellness_chats/", "/api/groups/",
+    ]
+
+    def setUp(self):
+        caches["default"].clear()
+        self.owner = Student.objects.create(
+            user=User.objects.create(username="pager"), name="Pager", email="pager@example.com"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner.user)
+
+    def add_decks(self, count, start=0):
+        Deck.objects.bulk_create(Deck(name=f"Deck {start + i}", owner=self.owner) for i in range(count))
+
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [row["id"] for row in response.data["data"]]
+
+    def test_next_then_previous_gives_stable_pages(self):
+        self.add_decks(7)
+        forward, url = [], "/api/decks/?page_size=3"
+        while url:
+            response = self.client.get(url)
+            forward.append(self.ids(response))
+            if len(forward) == 1:
+                # A row added mid-walk lands after the cursor instead of shifting later pages.
+                self.add_decks(1, start=7)
+            url = response.data["next"]
+        self.assertEqual([len(page) for page in forward], [3, 3, 2])
+        every_id = [deck_id for page in forward for deck_id in page]
+        self.assertEqual(every_id, sorted(Deck.objects.values_list("id", flat=True)))
+
+        backward = [forward[-1]]
+        url = response.data["previous"]
+        while url:
+            response = self.client.get(url)
+            backward.append(self.ids(response))
+            url = response.data["previous"]
+        self.assertEqual(backward, forward[::-1])
+
+    def test_page_size_is_capped(self):
+        self.add_decks(CursorPagination.max_page_size + 1)
+        self.assertEqual(len(self.ids(self.client.get("/api/decks/"))), CursorPagination.page_size)
+        response = self.client.get("/api/decks/?page_size=100000")
+        self.assertEqual(len(self.ids(response)), CursorPagination.max_page_size)
+        self.assertIsNotNone(response.data["next"])
+        for bad in ("0", "-1", "ten"):
+            self.assertEqual(len(self.ids(self.client.get(f"/api/decks/?page_size={bad}"))), CursorPagination.page_size)
+
+    def test_viewsets_put_page_links_in_the_link_header(self):
+        start = datetime(2026, 1, 1, 9)
+        Event.objects.bulk_create(
+            Event(event_title=f"Event {i}", start_datetime=start, end_datetime=start + timedelta(hours=1))
+            for i in range(3)
+        )
+        response = self.client.get("/api/events/?page_size=2")
+        self.assertEqual([row["event_title"] for row in response.data], ["Event 0", "Event 1"])
+        next_url = re.fullmatch(r'<([^>]+)>; rel="next"', response["Link"]).group(1)
+
+        response = self.client.get(next_url)
+        self.assertEqual([row["event_title"] for row in response.data], ["Event 2"])
+        self.assertRegex(response["Link"], r'^<[^>]+>; rel="prev"$')
+        # A cached copy of the page keeps its Link header.
+        self.assertEqual(self.client.get(next_url)["Link"], response["Link"])
+
+    def test_list_views_return_next_and_previous(self):
+        for url in self.LIST_VIEWS:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual((response.data["next"], response.data["previous"]), (None, None), url)
+            self.assertFalse(response.has_header("Link"), url)
+
+        self.add_decks(2)
+        response = self.client.get("/api/decks/?page_size=1")
+        self.assertEqual(response.data["message"], "All decks fetched successfully")
+        self.assertEqual(len(response.data["data"]), 1)
+        self.assertIsNone(response.data["previous"])
+        self.assertEqual(response["Link"], f'<{response.data["next"]}>; rel="next"')
+        response = self.client.get(response.data["next"])
+        self.assertIsNone(response.data["next"])
+        self.assertEqual(response["Link"], f'<{response.data["previous"]}>; rel="prev"')
+
+
+class RecordingLLM:
+    """Stands in for ``ai_utils.llm.ainvoke``, recording calls and peak concurrency."""
+
+    def __init__(self, fail_on=()):
+        self.fail_on = fail_on
+        self.prompts = []
+        self.in_flight = self.peak = 0
+
+    async def ainvoke(self, messages, operation=None):
+        prompt = messages[-1].content
+        self.prompts.append(prompt)
+        call = len(self.prompts)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if any(text in prompt for text in self.fail_on):
+                raise LLMUnavailableError("model unavailable")
+            return AIMessage(content=f"Plan {call}")
+        finally:
+            self.in_flight -= 1
+
+
+class StudyPlanBatchTests(TestCase):
+    def setUp(self):
+        get_response_cache().clear()
+
+    def run_batch(self, prompts, llm, **kwargs):
+        with mock.patch.object(ai_utils.llm, "ainvoke", llm.ainvoke):
+            return generate_study_plans_batch(prompts, **kwargs)
+
+    def test_normalized_duplicates_are_generated_once(self):
+        llm = RecordingLLM()
+        prompts = ["Plan my week", "  plan MY   week!", "Plan my month", "PLAN MY WEEK."]
+        results = self.run_batch(prompts, llm)
+        self.assertEqual(len(llm.prompts), 2)
+        # One result per input prompt, in order; duplicates share the one generated plan.
+        self.assertEqual([result["prompt"] for result in results], prompts)
+        plans = [result["data"] for result in results]
+        self.assertEqual(plans[0], plans[1])
+        self.assertEqual(plans[0], plans[3])
+        self.assertNotEqual(plans[0], plans[2])
+
+        # A later batch is answered from the cache.
+        self.assertEqual(self.run_batch(["plan my month"], llm)[0]["data"], plans[2])
+        self.assertEqual(len(llm.prompts), 2)
+
+    def test_concurrency_is_bounded(self):
+        llm = RecordingLLM()
+        results = self.run_batch([f"Plan for topic {i}" for i in range(10)], llm, max_concurrency=3)
+        self.assertEqual(len(llm.prompts), 10)
+        self.assertEqual(llm.peak, 3)
+        self.assertTrue(all("data" in result for result in results))
+
+        llm = RecordingLLM()
+        self.run_batch([f"Plan for chapter {i}" for i in range(4)], llm, max_concurrency=1)
+        self.assertEqual(llm.peak, 1)
+
+    def test_a_failed_prompt_does_not_fail_the_batch(self):
+        llm = RecordingLLM(fail_on=["Chemistry"])
+        results = self.run_batch(["Biology", "Chemistry", "Physics", "chemistry "], llm)
+        self.assertEqual(results[1], {"prompt": "Chemistry", "error": "model unavailable"})
+        self.assertEqual(results[3], {"prompt": "chemistry ", "error": "model unavailable"})
+        self.assertTrue(all("data" in results[i] and "error" not in results[i] for i in (0, 2)))
+        # Failures are not cached, so a retry reaches the model again.
+        self.run_batch(["Chemistry"], llm)
+        self.assertEqual(llm.prompts.count(ai_utils.STUDY_PLAN_TEMPLATE.format(prompt="Chemistry")), 2)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(
+            user=User.objects.create(username="exporter"), name="Exporter", email="exporter@example.com"
+        )
+        other = Student.objects.create(name="Other", email="other@example.com")
+        start = datetime(2026, 3, 1, 9)
+        for i in range(3):
+            StudyChatbox.objects.create(
+                student=self.student, user_message=f"Q{i}", bot_response=f"A{i}", category="GENERAL",
+                timestamp=start + timedelta(minutes=i),
+            )
+            WellnessChat.objects.create(student=self.student, message=f"M{i}", is_bot=bool(i % 2),
+                                        timestamp=start + timedelta(minutes=i))
+        StudyChatbox.objects.create(student=other, user_message="Not mine", bot_response="-", category="GENERAL")
+        self.client = APIClient()
+        self.client.force_authenticate(self.student.user)
+        self.chats_url = f"/api/studychatbox/student/{self.student.id}/export/"
+        self.wellness_url = f"/api/wellness_message/{self.student.id}/export/"
+
+    def export(self, url, fmt):
+        response = self.client.get(url, {"type": fmt})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode("utf-8")
+
+    def test_json_export_is_an_array(self):
+        response, body = self.export(self.chats_url, "json")
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response["Content-Disposition"], f'attachment; filename="study-chats-{self.student.id}.json"')
+        rows = json.loads(body)
+        self.assertEqual([row["user_message"] for row in rows], ["Q0", "Q1", "Q2"])
+        self.assertEqual(rows[0]["timestamp"], "2026-03-01T09:00:00")
+
+        response, body = self.export("/api/studychatbox/student/0/export/", "json")
+        self.assertEqual(json.loads(body), [])
+
+    def test_ndjson_export_has_one_object_per_line(self):
+        response, body = self.export(self.wellness_url, "ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(
+            response["Content-Disposition"], f'attachment; filename="wellness-chats-{self.student.id}.ndjson"'
+        )
+        self.assertTrue(body.endswith("\n"))
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([(row["message"], row["is_bot"]) for row in rows], [("M0", False), ("M1", True), ("M2", False)])
+
+        response, body = self.export("/api/wellness_message/0/export/", "ndjson")
+        self.assertEqual(body, "")
+
+    def test_rename_mapping_is_applied(self):
+        for url in (self.chats_url, self.wellness_url):
+            for fmt in ("json", "ndjson"):
+                _, body = self.export(url, fmt)
+                rows = json.loads(body) if fmt == "json" else [json.loads(line) for line in body.splitlines()]
+                self.assertEqual({row["student"] for row in rows}, {self.student.id}, (url, fmt))
+                self.assertFalse(any("student_id" in row for row in rows), (url, fmt))
+
+        _, body = self.export(self.chats_url, "json")
+        self.assertEqual(
+            list(json.loads(body)[0]), ["id", "student", "user_message", "bot_response", "category", "timestamp"]
+        )
+
+    def test_unknown_type_is_rejected(self):
+        self.assertEqual(self.client.get(self.chats_url, {"type": "csv"}).status_code, 400)
+
+    async def test_asgi_export_matches(self):
+        response = await AsyncClient().get(self.wellness_url, {"type": "json"})
+        self.assertEqual(response.status_code, 200)
+        rows = json.loads(b"".join([chunk async for chunk in response]))
+        self.assertEqual([row["message"] for row in rows], ["M0", "M1", "M2"])
+        self.assertEqual({row["student"] for row in rows}, {self.student.id})
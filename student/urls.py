@@ -43,7 +43,9 @@ urlpatterns = [
     path('friendship/respond/<int:friendship_id>/', RespondToFriendRequest.as_view(), name="respond_friend_request"),
     path('friendship/block/<int:friendship_id>/', BlockFriend.as_view(), name="block_friend"),
     path('friendship/', GetFriendships.as_view(), name="get_friendships"),
-    path("friendship/get_blocked/", GetBlockedUsers.as_view()),
+    path("friendship/get_blocked/", GetBlockedUsers.as_view(), name="get_blocked_users"),
+    path('friendship/suggestions/', GetFriendSuggestions.as_view(), name="friend_suggestions"),
+    path('friendship/mutual/', GetMutualFriendCounts.as_view(), name="mutual_friend_counts"),
     path('friendship/unblock/<int:friendship_id>/', UnblockFriend.as_view(), name="unblock_friend"),
     path('friendship/delete/<int:friendship_id>/', DeleteFriendship.as_view(), name='delete_friendship'),
 
@@ -58,14 +60,26 @@ urlpatterns = [
     # Flashcard URLs
     path('flashcards/', GetAllFlashcards.as_view(), name="get_all_flashcards"),
     path('flashcards/deck/<int:deck_id>/', GetFlashcardsByDeck.as_view(), name="get_flashcards_by_deck"),
+    path('flashcards/due/<int:student_id>/', GetDueFlashcards.as_view(), name="get_due_flashcards"),
+    path('flashcards/review/<int:id>/', ReviewFlashcard.as_view(), name="review_flashcard"),
+    path('flashcards/review/sync/', SyncFlashcardReviews.as_view(), name="sync_flashcard_reviews"),
+    path('sync/', DeltaSync.as_view(), name="delta_sync"),
     path('flashcards/create/', CreateFlashcard.as_view(), name="create_flashcard"),
+    path('flashcards/bulk/', BulkCreateFlashcards.as_view(), name="bulk_create_flashcards"),
     path('flashcards/update/<int:id>/', UpdateFlashcard.as_view(), name="update_flashcard"),
     path('flashcards/delete/<int:id>/', DeleteFlashcard.as_view(), name="delete_flashcard"),
 
     path('study_plan/', StudyPlanView.as_view(), name='study_plan'),
+    path('study_plan/async/', AsyncStudyPlanView.as_view(), name='study_plan_async'),
+    path('study_plan/batch/', StudyPlanBatchView.as_view(), name='study_plan_batch'),
+    path('study_plan/jobs/<int:job_id>/', StudyPlanJobView.as_view(), name='study_plan_job'),
     
     # Discussion URLs
     path('discussions/', GetAllDiscussions.as_view(), name="get_all_discussions"),
+    path('search/students/', SearchStudents.as_view(), name="search_students"),
+    path('search/flashcards/', SearchFlashcards.as_view(), name="search_flashcards"),
+    path('search/decks/', SearchDecks.as_view(), name="search_decks"),
+    path('search/discussions/', SearchDiscussions.as_view(), name="search_discussions"),
     path('create_discussion/', CreateDiscussion.as_view(), name="create_discussion"),
     path('get_discussion_by_id/<int:id>/', GetDiscussion.as_view(), name="get_discussion"),
     path('update_discussion/<int:id>/', UpdateDiscussion.as_view(), name="update_discussion"),
@@ -81,28 +95,33 @@ urlpatterns = [
     path('studychatbox/all/', GetAllChatMessages.as_view(), name='get-all-chats'),  # GET only
     path('studychatbox/create/', CreateChatMessage.as_view(), name='create-chat-message'),  # POST only
     path('studychatbox/student/<int:student_id>/', GetChatsByStudent.as_view(), name='get-chats-by-student'),
+    path('studychatbox/student/<int:student_id>/export/', ExportChatsByStudent.as_view(), name='export-chats-by-student'),
     path('studychatbox/delete/<int:id>/', DeleteChatMessage.as_view(), name='delete_chat_message'),
 
     
     # Group URLs
     path('create_group/', CreateGroup.as_view(), name='create-group'),  
     path('groups/', GetAllGroups.as_view(), name='get_all_groups'), 
-    path('get_group_by_id', GetGroupById.as_view(), name='get_group_by_id'), 
+    path('get_group_by_id/<int:group_id>/', GetGroupById.as_view(), name='get_group_by_id'), 
     path('update_group/<int:group_id>/', UpdateGroup.as_view(), name='update-group'), 
     path('delete_group/<int:group_id>/', DeleteGroup.as_view(), name='delete-group'),
 
-    path('add_member/<int:group_id>/', AddGroupMember.as_view()),
-    path('remove_member/<int:group_id>/', RemoveGroupMember.as_view()),
-    path('group_members/<int:group_id>/', GetGroupMembers.as_view()), # Check members for a group 
+    path('add_member/<int:group_id>/', AddGroupMember.as_view(), name='add-group-member'),
+    path('remove_member/<int:group_id>/', RemoveGroupMember.as_view(), name='remove-group-member'),
+    path('group_members/<int:group_id>/', GetGroupMembers.as_view(), name='get_group_members'), # Check members for a group 
 
     # WellnessChatbox URLs (heng)
     path('wellness_chats/', GetAllWellnessChats.as_view(), name="get_all_wellness_messages"),  
     path('wellness_create/', CreateWellnessChatMessage.as_view(), name="create_wellness_message"), 
     path('wellness_message/<int:student_id>/', GetWellnessChatsByStudent.as_view(), name="get_wellness_messages_by_discussion"), 
+    path('wellness_message/<int:student_id>/export/', ExportWellnessChatsByStudent.as_view(), name="export_wellness_messages_by_student"),
     path('wellness_update/<int:id>/', UpdateWellnessChatMessage.as_view(), name="update_wellness_message"), 
     path('wellness_delete/<int:id>/', DeleteWellnessChatMessage.as_view(), name="delete_wellness_message"),  
     path("wellness/", WellnessChatboxView.as_view(), name="wellness-chat"),
+    path("wellness/async/", AsyncWellnessChatboxView.as_view(), name="wellness-chat-async"),
     # AI response api & URL to be written by Fatima (Done and added - Fatima)
+
+    path('metrics/profiling/', ProfilingMetrics.as_view(), name='profiling-metrics'),
 ]
 
 urlpatterns += router.urls
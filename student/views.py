@@ -1,15 +1,17 @@
 from django.http import JsonResponse, response
 from django.shortcuts import render
+from rest_framework.fields import DateTimeField
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from .serializer import *
 from rest_framework import status
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from rest_framework import viewsets
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from .models import *
 from .ai_utils import generate_study_plan, wellness_chatbot_response
 from django.db import models
@@ -19,6 +21,33 @@ from django.core.exceptions import ObjectDoesNotExist
 from django.db.models import Q
 
 from .ai_utils import generate_study_plan, wellness_chatbot_response
+from .ai_utils import stream_study_plan, stream_wellness_response
+from .ai_utils import agenerate_study_plan, astream_study_plan
+from .ai_utils import awellness_chatbot_response, astream_wellness_response
+from .ai_utils import LLMUnavailableError, generate_study_plans_batch
+from .jobs import can_read_job, enqueue_study_plan, job_settings
+from .chat_context import build_conversation_context
+from .pagination import CursorPagination, CursorPaginationMixin, RankedPaginationMixin
+from .eager_loading import eager
+from .authentication import user_for_token
+from .response_cache import cache_response
+from .profiling import profiling_settings, route_stats
+from .search import search, typeahead_students
+from .friend_graph import friend_suggestions, mutual_friend_counts
+from .streaming import event_stream_response, async_event_stream_response, is_asgi_request, is_truthy, wants_stream
+from .streaming import queryset_export_response
+from .recurrence import expand, overlapping, recurrence_settings
+from .delta_sync import InvalidWatermark, collect_changes, parse_watermark
+from .srs import IdempotencyConflict, apply_review_batch, due_cards, review_card
+from .flashcard_import import FlashcardImportError, import_flashcards, parse_rows, validate_rows
+from django.views import View
+from asgiref.sync import sync_to_async
+from django.urls import reverse
+from django.conf import settings
+import json
+from datetime import timedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 
@@ -45,12 +74,49 @@ class EventViewSet(viewsets.ModelViewSet):
     queryset = Event.objects.all()
     serializer_class = EventSerializer
     permission_classes = [AllowAny]  
+    pagination_class = CursorPagination
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "list":
+            # Single events are cheaper to load lazily; writes replace the relations anyway.
+            queryset = EventSerializer.setup_eager_loading(queryset)
+        return queryset
+
+    @cache_response(lambda request: ["events", "student-removals", "group-removals"])
     def list(self, request):
-        """Get all events"""
-        events = self.get_queryset()
+        """Get all events, one page at a time (next/prev links in the Link header)
+
+        With ?start=&end= (ISO 8601), return every occurrence inside that
+        window instead, recurring events expanded, in start order.
+        """
+        if 'start' in request.query_params or 'end' in request.query_params:
+            return self.list_window(request)
+        events = self.paginate_queryset(self.get_queryset())
         serializer = self.get_serializer(events, many=True)
-        return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
+
+    def list_window(self, request):
+        try:
+            start = parse_datetime(request.query_params.get('start') or '')
+            end = parse_datetime(request.query_params.get('end') or '')
+        except ValueError:
+            start = end = None
+        if start is None or end is None:
+            return Response({"message": "start and end must both be ISO 8601 datetimes"}, status=400)
+        start, end = (timezone.make_naive(value) if timezone.is_aware(value) else value for value in (start, end))
+        max_days = recurrence_settings()['MAX_WINDOW_DAYS']
+        if not start < end <= start + timedelta(days=max_days):
+            return Response({"message": f"end must be after start and at most {max_days} days later"}, status=400)
+
+        events = list(overlapping(self.get_queryset(), start, end))
+        data = {event['id']: event for event in self.get_serializer(events, many=True).data}
+        as_text = DateTimeField().to_representation
+        occurrences = [
+            {**data[event.id], 'occurrence_start': as_text(occurrence_start), 'occurrence_end': as_text(occurrence_end)}
+            for event, occurrence_start, occurrence_end in expand(events, start, end)
+        ]
+        return Response(occurrences)
     
     def create(self, request):
         """Create a new event"""
@@ -60,6 +126,7 @@ class EventViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @cache_response(lambda request, pk=None: [f"event:{pk}", "student-removals", "group-removals"])
     def retrieve(self, request, pk=None):
         """Get a specific event"""
         event = self.get_object()
@@ -172,14 +239,13 @@ class GetUserAndStudentDetails(APIView):
 
 
 # An admin method to be implemented later
-class GetAllStudents(APIView):
+class GetAllStudents(CursorPaginationMixin, APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
 
         students = Student.objects.all()
-        student_serializer = StudentSerializer(students, many=True)
-        return Response({"message": "All students fetched successfully", "data": student_serializer.data})
+        return self.paginated_response(students, StudentSerializer, "All students fetched successfully")
 
 
 class GetStudent(APIView):
@@ -355,6 +421,41 @@ class GetFriendships(APIView):
         return Response(data, status=200)
 
         
+class GetFriendSuggestions(APIView):
+    """Friends of friends, most mutual friends first (?limit=)"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        student = request.user.student
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=400)
+        data = [{
+            'id': row['friend_id'],
+            'name': row['friend__name'],
+            'email': row['friend__email'],
+            'mutual_friends': row['mutual_friends'],
+        } for row in friend_suggestions(student, limit)]
+        return Response(data, status=200)
+
+
+class GetMutualFriendCounts(APIView):
+    """Mutual friend counts with each of ?ids=1,2,3"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        student = request.user.student
+        try:
+            ids = [int(i) for i in request.query_params.get('ids', '').split(',') if i.strip()]
+        except ValueError:
+            return Response({"error": "ids must be a comma-separated list of student ids"}, status=400)
+        if not ids or len(ids) > 100:
+            return Response({"error": "Provide between 1 and 100 student ids"}, status=400)
+        counts = mutual_friend_counts(student, ids)
+        return Response([{'id': i, 'mutual_friends': count} for i, count in counts.items()], status=200)
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class BlockFriend(APIView):
     permission_classes = [IsAuthenticated]
@@ -425,18 +526,18 @@ class DeleteFriendship(APIView):
 
 
 # Deck views
-class GetAllDecks(APIView):
+class GetAllDecks(CursorPaginationMixin, APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
         decks = Deck.objects.all()
-        deck_serializer = DeckSerializer(decks, many=True)
-        return Response({"message": "All decks fetched successfully", "data": deck_serializer.data})
+        return self.paginated_response(decks, DeckSerializer, "All decks fetched successfully")
 
 
 class GetDecksByStudent(APIView):
     permission_classes = [AllowAny]
 
+    @cache_response(lambda request, student_id: [f"decks:student:{student_id}"])
     def get(self, request, student_id):
         decks = Deck.objects.filter(owner__id=student_id)
         deck_serializer = DeckSerializer(decks, many=True)
@@ -482,24 +583,53 @@ class DeleteDeck(APIView):
 
 
 # Flashcard views
-class GetAllFlashcards(APIView):
+class GetAllFlashcards(CursorPaginationMixin, APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
         flashcards = Flashcard.objects.all()
-        flashcard_serializer = FlashcardSerializer(flashcards, many=True)
-        return Response({"message": "All flashcards fetched successfully", "data": flashcard_serializer.data})
+        return self.paginated_response(flashcards, FlashcardSerializer, "All flashcards fetched successfully")
 
 
 class GetFlashcardsByDeck(APIView):
     permission_classes = [AllowAny]
 
+    @cache_response(lambda request, deck_id: [f"flashcards:deck:{deck_id}"])
     def get(self, request, deck_id):
         flashcards = Flashcard.objects.filter(deck__id=deck_id)
         flashcard_serializer = FlashcardSerializer(flashcards, many=True)
         return Response({"message": f"Flashcards for deck {deck_id} fetched successfully", "data": flashcard_serializer.data})
 
 
+class GetDueFlashcards(APIView):
+    """The next cards due for review across a student's decks (?limit=, default 20)"""
+    permission_classes = [AllowAny]
+
+    def get(self, request, student_id):
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            return Response({"message": "limit must be an integer"}, status=400)
+        flashcards = due_cards(student_id, max(limit, 1))
+        flashcard_serializer = FlashcardSerializer(flashcards, many=True)
+        return Response({"message": "Due flashcards fetched successfully", "data": flashcard_serializer.data})
+
+
+class ReviewFlashcard(APIView):
+    """Grade a review from 0 (forgot) to 5 (perfect recall) and reschedule the card"""
+    permission_classes = [AllowAny]
+
+    def post(self, request, id):
+        try:
+            quality = int(request.data.get('quality'))
+            flashcard = review_card(id, quality)
+        except (TypeError, ValueError):
+            return Response({"message": "quality must be an integer from 0 to 5"}, status=400)
+        except Flashcard.DoesNotExist:
+            return Response({"message": "Flashcard not found"}, status=404)
+        return Response({"message": "Review recorded", "data": FlashcardSerializer(flashcard).data}, status=200)
+
+
 class CreateFlashcard(APIView):
     permission_classes = [AllowAny]
 
@@ -511,6 +641,70 @@ class CreateFlashcard(APIView):
         return Response({"message": "Failed to create flashcard", "errors": flashcard_serializer.errors}, status=400)
 
 
+class SyncFlashcardReviews(APIView):
+    """Apply a whole offline review session at once.
+
+    The idempotency key may also be sent as an Idempotency-Key header.
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        data = request.data.copy()
+        if request.headers.get('Idempotency-Key'):
+            data.setdefault('idempotency_key', request.headers['Idempotency-Key'])
+        serializer = ReviewBatchSerializer(data=data)
+        if not serializer.is_valid():
+            return Response({"message": "Invalid review batch", "errors": serializer.errors}, status=400)
+        try:
+            result, replayed = apply_review_batch(
+                serializer.validated_data['idempotency_key'], serializer.validated_data['reviews']
+            )
+        except IdempotencyConflict:
+            return Response({"message": "Idempotency key was already used for a different batch"}, status=409)
+        return Response({"message": "Reviews synced", "replayed": replayed, **result}, status=200)
+
+
+class DeltaSync(APIView):
+    """Decks, flashcards, modules, lessons and events changed since ``?since=``, plus deletions.
+
+    Send back the returned watermark as ``since`` on the next call.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            since = parse_watermark(request.query_params.get('since'))
+        except InvalidWatermark as e:
+            return Response({"message": str(e)}, status=400)
+        try:
+            student = request.user.student
+        except ObjectDoesNotExist:
+            return Response({"message": "Student profile not found"}, status=404)
+        return Response(collect_changes(student, since), status=200)
+
+
+class BulkCreateFlashcards(APIView):
+    """Import many cards into one deck from a JSON array or a CSV/TSV upload"""
+    permission_classes = [AllowAny]
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+
+    def post(self, request):
+        try:
+            deck = Deck.objects.get(id=request.data.get('deck'))
+        except (Deck.DoesNotExist, ValueError, TypeError):
+            return Response({"message": "Deck not found"}, status=404)
+        try:
+            rows = parse_rows(request.data, request.FILES)
+        except FlashcardImportError as e:
+            return Response({"message": str(e)}, status=400)
+
+        valid, errors = validate_rows(rows)
+        if not valid:
+            return Response({"message": "No flashcards imported", "created": 0, "errors": errors}, status=400)
+        created = import_flashcards(deck, valid)
+        return Response({"message": f"Imported {created} flashcards", "created": created, "errors": errors}, status=201)
+
+
 class UpdateFlashcard(APIView):
     permission_classes = [AllowAny]
 
@@ -544,16 +738,12 @@ class DeleteStudent(APIView):
         return Response({"message": "Student deleted successfully"}, status=200)
 
 
-class GetAllDiscussions(APIView):
+class GetAllDiscussions(CursorPaginationMixin, APIView):
     """Get all discussions"""
     permission_classes = [AllowAny]
     def get(self, request):
         discussions = Discussion.objects.all()
-        serializer = DiscussionSerializer(discussions, many=True)
-        return Response({
-            "message": "All discussions fetched successfully",
-            "data": serializer.data
-        }, status=status.HTTP_200_OK)
+        return self.paginated_response(discussions, DiscussionSerializer, "All discussions fetched successfully")
 
 
 class GetDiscussion(APIView):
@@ -625,16 +815,12 @@ class DeleteDiscussion(APIView):
 
     
 # StudyChatbox Views# StudyChatbox Views
-class GetAllChatMessages(APIView):
+class GetAllChatMessages(CursorPaginationMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        chats = StudyChatbox.objects.all().order_by('timestamp')
-        serializer = StudyChatboxSerializer(chats, many=True)
-        return Response({
-            "message": "All chat messages fetched successfully",
-            "data": serializer.data
-        }, status=status.HTTP_200_OK)
+        chats = StudyChatbox.objects.all()
+        return self.paginated_response(chats, StudyChatboxSerializer, "All chat messages fetched successfully")
 
 
 class CreateChatMessage(APIView):
@@ -666,6 +852,24 @@ class GetChatsByStudent(APIView):
         }, status=status.HTTP_200_OK)
 
 
+class ExportChatsByStudent(APIView):
+    """Stream a student's whole study chat history (?type=json or ?type=ndjson)"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, student_id):
+        fmt = request.query_params.get('type', 'json')
+        if fmt not in ('json', 'ndjson'):
+            return Response({"error": "type must be json or ndjson"}, status=status.HTTP_400_BAD_REQUEST)
+        chats = StudyChatbox.objects.filter(student__id=student_id).order_by('timestamp', 'id')
+        return queryset_export_response(
+            request, chats,
+            fields=['id', 'student_id', 'user_message', 'bot_response', 'category', 'timestamp'],
+            rename={'student_id': 'student'},
+            filename=f"study-chats-{student_id}",
+            fmt=fmt
+        )
+
+
 class DeleteChatMessage(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -693,6 +897,74 @@ class DeleteChatMessage(APIView):
 
 
 
+def get_request_student(request):
+    """Student of the authenticated user, or None for anonymous requests.
+
+    Never taken from the request body: on AllowAny views that would let
+    anyone write chats and plans as any student.
+    """
+    return getattr(request.user, "student", None)
+
+
+class SearchView(RankedPaginationMixin, APIView):
+    """Ranked full-text search: ?q=<terms> plus optional filters, paginated with ?page="""
+    permission_classes = [AllowAny]
+    queryset = None
+    serializer_class = None
+    filters = {}
+
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({"message": "Missing search query"}, status=400)
+        queryset = self.queryset.all()
+        for param, lookup in self.filters.items():
+            value = request.query_params.get(param)
+            if value:
+                if not value.isdigit():
+                    return Response({"message": f"{param} must be an id"}, status=400)
+                queryset = queryset.filter(**{lookup: value})
+        return self.paginated_response(search(queryset, text), self.serializer_class, "Search results")
+
+
+class SearchFlashcards(SearchView):
+    queryset = Flashcard.objects.all()
+    serializer_class = FlashcardSerializer
+    filters = {'deck': 'deck_id', 'student': 'deck__owner_id'}
+
+
+class SearchDecks(SearchView):
+    queryset = Deck.objects.all()
+    serializer_class = DeckSerializer
+    filters = {'student': 'owner_id'}
+
+
+class SearchDiscussions(SearchView):
+    queryset = Discussion.objects.all()
+    serializer_class = DiscussionSerializer
+    filters = {'group': 'group_id', 'author': 'author_id'}
+
+
+class SearchStudents(APIView):
+    """Typeahead lookup for friend requests: ?q=<name or email>&limit="""
+    permission_classes = [IsAuthenticated]
+    min_query_length = 2
+
+    def get(self, request):
+        student = getattr(request.user, 'student', None)
+        if student is None:
+            return Response({"error": "Student profile not found"}, status=404)
+        text = request.query_params.get('q', '').strip()
+        if len(text) < self.min_query_length:
+            return Response({"message": "Search results", "data": []}, status=200)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 25)
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=400)
+        students = typeahead_students(student, text, limit)
+        return Response({"message": "Search results", "data": StudentSerializer(students, many=True).data}, status=200)
+
+
 class StudyPlanView(APIView):
     permission_classes = [AllowAny]
 
@@ -700,12 +972,109 @@ class StudyPlanView(APIView):
         prompt = request.data.get('prompt')
         if not prompt:
             return Response({"error": "Missing prompt"}, status=400)
+        if wants_stream(request):
+            return self.stream(request, prompt)
+        if is_truthy(request.data.get('background', job_settings()['DEFAULT_BACKGROUND'])):
+            return self.enqueue(request, prompt)
         try:
-            study_plan = generate_study_plan(prompt)
+            study_plan = generate_study_plan(prompt, context=self.get_context(request))
             return Response({"message": "Study plan generated successfully", "data": study_plan}, status=200)
+        except LLMUnavailableError as e:
+            return Response({"error": str(e)}, status=503)
         except Exception as e:
             return Response({"error": str(e)}, status=500)
 
+    def get_context(self, request):
+        """Recent StudyChatbox history, only for prompts sent with "follow_up": true.
+
+        A standalone prompt is answered without history, so students asking the
+        same question share one cached plan.
+        """
+        student = get_request_student(request)
+        if student is None or not is_truthy(request.data.get('follow_up', False)):
+            return None
+        return build_conversation_context(student)
+
+    def stream(self, request, prompt):
+        """Send the plan as Server-Sent Events and store the exchange once it completes."""
+        student = get_request_student(request)
+        context = self.get_context(request)
+
+        def save_chat(text):
+            if student is None:
+                return {}
+            chat = StudyChatbox.objects.create(
+                student=student,
+                user_message=prompt,
+                bot_response=text,
+                category=StudyCategory.STUDY_PLANS.value
+            )
+            return {"chat_id": chat.id}
+
+        if is_asgi_request(request):
+            # A sync generator would be buffered in full under ASGI.
+            return async_event_stream_response(astream_study_plan(prompt, context), on_complete=sync_to_async(save_chat))
+        return event_stream_response(stream_study_plan(prompt, context), on_complete=save_chat)
+
+    def enqueue(self, request, prompt):
+        """Queue the plan for the background worker and return the job id straight away."""
+        student = get_request_student(request)
+        module = None
+        module_id = request.data.get('module_id')
+        if module_id:
+            if student is None:
+                return Response({"error": "module_id requires a student"}, status=400)
+            module = DashboardModule.objects.filter(id=module_id, student=student).first()
+            if module is None:
+                return Response({"error": "Invalid module ID"}, status=404)
+
+        job = enqueue_study_plan(prompt, student=student, dashboard_module=module)
+        status_url = reverse('study_plan_job', args=[job.id])
+        if job.access_key:
+            status_url += f"?key={job.access_key}"
+        return Response({
+            "message": "Study plan queued",
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": status_url,
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class StudyPlanBatchView(APIView):
+    """Generate study plans for a list of prompts (e.g. a whole cohort) in one request."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        prompts = request.data.get('prompts')
+        config = settings.STUDY_PLAN_BATCH
+        if not isinstance(prompts, list) or not prompts:
+            return Response({"error": "prompts must be a non-empty list"}, status=400)
+        if len(prompts) > config['MAX_SIZE']:
+            return Response({"error": f"At most {config['MAX_SIZE']} prompts per batch"}, status=400)
+        if not all(isinstance(prompt, str) and prompt.strip() for prompt in prompts):
+            return Response({"error": "Every prompt must be a non-empty string"}, status=400)
+
+        results = generate_study_plans_batch(prompts, max_concurrency=config['MAX_CONCURRENCY'])
+        failed = sum(1 for result in results if "error" in result)
+        return Response({
+            "message": f"Generated {len(results) - failed} of {len(results)} study plans",
+            "data": results
+        }, status=200)
+
+
+class StudyPlanJobView(APIView):
+    """Status of a queued study plan, with the plan itself once it has been generated.
+
+    Anonymous jobs need the ``?key=`` from the status_url returned on enqueue.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, job_id):
+        job = StudyPlanJob.objects.filter(id=job_id).first()
+        if job is None or not can_read_job(job, get_request_student(request), request.query_params.get('key')):
+            return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"data": StudyPlanJobSerializer(job).data}, status=status.HTTP_200_OK)
+
 # class CreateWellnessSession(APIView):
 #     def post(self, request):
 #         title = request.data.get("title", "New Chat")
@@ -767,24 +1136,137 @@ class WellnessChatboxView(APIView):
         user_query = request.data.get('query')
         if not user_query:
             return Response({"error": "Missing query"}, status=400)
+        if wants_stream(request):
+            return self.stream(request, user_query)
         try:
             response = wellness_chatbot_response(user_query)
             return Response({"message": "Response generated successfully", "data": response}, status=200)
+        except LLMUnavailableError as e:
+            return Response({"error": str(e)}, status=503)
         except Exception as e:
             return Response({"error": str(e)}, status=500)
+
+    def stream(self, request, user_query):
+        """Send the reply as Server-Sent Events and store both messages once it completes."""
+        student = get_request_student(request)
+
+        def save_chat(text):
+            if student is None:
+                return {}
+            WellnessChat.objects.create(student=student, message=user_query, is_bot=False)
+            bot_chat = WellnessChat.objects.create(student=student, message=text, is_bot=True)
+            return {"chat_id": bot_chat.id}
+
+        if is_asgi_request(request):
+            return async_event_stream_response(astream_wellness_response(user_query), on_complete=sync_to_async(save_chat))
+        return event_stream_response(stream_wellness_response(user_query), on_complete=save_chat)
         
 
-class GetAllWellnessChats(APIView):
+async def aget_request_student(request):
+    """Async version of get_request_student for views that bypass DRF.
+
+    Resolves the ``Authorization: Token <key>`` header directly since DRF
+    authentication does not run for plain async Django views.
+    """
+    auth = request.headers.get("Authorization", "")
+    if not auth.startswith("Token "):
+        return None
+    user = await sync_to_async(user_for_token)(auth[6:].strip())
+    return getattr(user, "student", None)
+
+
+def parse_json_body(request):
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncStudyPlanView(View):
+    """
+    Async StudyPlanView for ASGI workers: the LLM call awaits instead of
+    holding a worker for the whole round-trip.
+    """
+
+    async def post(self, request):
+        data = parse_json_body(request)
+        if data is None:
+            return JsonResponse({"error": "Invalid JSON body"}, status=400)
+        prompt = data.get('prompt')
+        if not prompt:
+            return JsonResponse({"error": "Missing prompt"}, status=400)
+
+        student = await aget_request_student(request)
+        context = None
+        if student is not None and is_truthy(data.get('follow_up', False)):
+            context = await sync_to_async(build_conversation_context)(student)
+
+        if is_truthy(data.get('stream', request.GET.get('stream'))):
+
+            async def save_chat(text):
+                if student is None:
+                    return {}
+                chat = await StudyChatbox.objects.acreate(
+                    student=student,
+                    user_message=prompt,
+                    bot_response=text,
+                    category=StudyCategory.STUDY_PLANS.value
+                )
+                return {"chat_id": chat.id}
+
+            return async_event_stream_response(astream_study_plan(prompt, context), on_complete=save_chat)
+
+        try:
+            study_plan = await agenerate_study_plan(prompt, context)
+            return JsonResponse({"message": "Study plan generated successfully", "data": study_plan}, status=200)
+        except LLMUnavailableError as e:
+            return JsonResponse({"error": str(e)}, status=503)
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=500)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncWellnessChatboxView(View):
+    """Async WellnessChatboxView for ASGI workers."""
+
+    async def post(self, request):
+        data = parse_json_body(request)
+        if data is None:
+            return JsonResponse({"error": "Invalid JSON body"}, status=400)
+        user_query = data.get('query')
+        if not user_query:
+            return JsonResponse({"error": "Missing query"}, status=400)
+
+        if is_truthy(data.get('stream', request.GET.get('stream'))):
+            student = await aget_request_student(request)
+
+            async def save_chat(text):
+                if student is None:
+                    return {}
+                await WellnessChat.objects.acreate(student=student, message=user_query, is_bot=False)
+                bot_chat = await WellnessChat.objects.acreate(student=student, message=text, is_bot=True)
+                return {"chat_id": bot_chat.id}
+
+            return async_event_stream_response(astream_wellness_response(user_query), on_complete=save_chat)
+
+        try:
+            response = await awellness_chatbot_response(user_query)
+            return JsonResponse({"message": "Response generated successfully", "data": response}, status=200)
+        except LLMUnavailableError as e:
+            return JsonResponse({"error": str(e)}, status=503)
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=500)
+
+
+class GetAllWellnessChats(CursorPaginationMixin, APIView):
     """Fetch all wellness chat messages"""
     permission_classes = [AllowAny]
 
     def get(self, request):
         chats = WellnessChat.objects.all()
-        serializer = WellnessChatSerializer(chats, many=True)
-        return Response({
-            "message": "All wellness chat messages fetched successfully",
-            "data": serializer.data
-        }, status=status.HTTP_200_OK)
+        return self.paginated_response(chats, WellnessChatSerializer, "All wellness chat messages fetched successfully")
 
 
 class GetWellnessChatsByStudent(APIView):
@@ -792,7 +1274,7 @@ class GetWellnessChatsByStudent(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, student_id):
-        chats = WellnessChat.objects.filter(student__id=student_id)
+        chats = WellnessChat.objects.filter(student__id=student_id).order_by('timestamp', 'id')
         serializer = WellnessChatSerializer(chats, many=True)
         return Response({
             "message": f"Chats for student {student_id} fetched successfully",
@@ -800,6 +1282,24 @@ class GetWellnessChatsByStudent(APIView):
         }, status=status.HTTP_200_OK)
 
 
+class ExportWellnessChatsByStudent(APIView):
+    """Stream a student's whole wellness chat history (?type=json or ?type=ndjson)"""
+    permission_classes = [AllowAny]
+
+    def get(self, request, student_id):
+        fmt = request.query_params.get('type', 'json')
+        if fmt not in ('json', 'ndjson'):
+            return Response({"error": "type must be json or ndjson"}, status=status.HTTP_400_BAD_REQUEST)
+        chats = WellnessChat.objects.filter(student__id=student_id).order_by('timestamp', 'id')
+        return queryset_export_response(
+            request, chats,
+            fields=['id', 'student_id', 'message', 'timestamp', 'is_bot'],
+            rename={'student_id': 'student'},
+            filename=f"wellness-chats-{student_id}",
+            fmt=fmt
+        )
+
+
 class CreateWellnessChatMessage(APIView):
     """Create a new wellness chat message"""
     permission_classes = [AllowAny]
@@ -884,7 +1384,7 @@ class DashboardModuleListView(APIView):
 
     def get(self, request):
         student = request.user.student
-        modules = DashboardModule.objects.filter(student=student, is_active=True)
+        modules = eager(DashboardModuleSerializer, DashboardModule.objects.filter(student=student, is_active=True))
         serializer = DashboardModuleSerializer(modules, many=True)
         return Response({"data": serializer.data}, status=status.HTTP_200_OK)
 
@@ -894,7 +1394,7 @@ class AvailableDashboardModuleView(APIView):
 
     def get(self, request):
         student = request.user.student
-        modules = DashboardModule.objects.filter(student=student, is_active=False)
+        modules = eager(DashboardModuleSerializer, DashboardModule.objects.filter(student=student, is_active=False))
         serializer = DashboardModuleSerializer(modules, many=True)
         return Response({"data": serializer.data}, status=status.HTTP_200_OK)
 
@@ -1078,17 +1578,14 @@ class CreateGroup(APIView):
 
 
 
-class GetAllGroups(APIView):
+class GetAllGroups(CursorPaginationMixin, APIView):
     """Get all groups"""
     permission_classes = [AllowAny]
 
+    @cache_response(lambda request: ["groups", "student-removals"])
     def get(self, request):
         groups = Group.objects.all()
-        serializer = GroupSerializer(groups, many=True)
-        return Response({
-            "message": "All groups fetched successfully",
-            "data": serializer.data
-        }, status=status.HTTP_200_OK)
+        return self.paginated_response(groups, GroupSerializer, "All groups fetched successfully")
 
 
 class GetGroupById(APIView):
@@ -1230,6 +1727,7 @@ class GetGroupMembers(APIView):
     """Get all members of a group"""
     permission_classes = [AllowAny]
 
+    @cache_response(lambda request, group_id: [f"group:{group_id}:members", "student-profiles"])
     def get(self, request, group_id):
         try:
             group = Group.objects.get(id=group_id)
@@ -1251,8 +1749,18 @@ class GetStudyPlanForModule(APIView):
 
     def get(self, request, module_id):
         try:
-            plan = SavedStudyPlan.objects.get(module__id=module_id)
+            plan = SavedStudyPlan.objects.get(dashboard_modules__id=module_id)
             return Response({"plan_content": plan.plan_content})
         except SavedStudyPlan.DoesNotExist:
             return Response({"plan_content": ""})
 
+
+class ProfilingMetrics(APIView):
+    """Per-route request totals collected by ProfilingMiddleware in this process."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            "enabled": profiling_settings()["ENABLED"],
+            "routes": route_stats.snapshot(),
+        }, status=status.HTTP_200_OK)
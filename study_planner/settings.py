@@ -42,6 +42,9 @@ CORS_ALLOW_CREDENTIALS = True
 
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Paginated viewsets put the next page in the Link header.
+CORS_EXPOSE_HEADERS = ['Link']
+
 CORS_ALLOWED_ORIGINS = [ # Vite's dev server
     'https://team76.bham.team',
     'https://team76.dev.bham.team',
@@ -66,12 +69,15 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'corsheaders',
     'student',
 ]
 
 MIDDLEWARE = [
+    'student.metrics.MetricsMiddleware',
+    'student.profiling.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -110,13 +116,29 @@ TEMPLATES = [
 # DRF Authentication Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'student.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
 }
 
+# Token -> user cache for student.authentication.CachedTokenAuthentication.
+# LOCAL_TTL bounds how long another worker may keep serving a user after a
+# logout or profile change. Point TOKEN_AUTH_SHARED_CACHE at a shared cache
+# (e.g. Redis) so workers can warm each other; the database cache costs a query
+# and saves nothing.
+TOKEN_AUTH_CACHE = {
+    'ENABLED': os.getenv('TOKEN_AUTH_CACHE_ENABLED', 'True') == 'True',
+    'TTL': int(os.getenv('TOKEN_AUTH_CACHE_TTL', 300)),
+    'LOCAL_TTL': int(os.getenv('TOKEN_AUTH_CACHE_LOCAL_TTL', 30)),
+    'SHARED_CACHE': os.getenv('TOKEN_AUTH_SHARED_CACHE', '') or None,
+}
+
+# Default page size for student.pagination.CursorPagination; clients may ask
+# for up to 500 with ?page_size=.
+API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', 100))
+
 
 
 WSGI_APPLICATION = 'study_planner.wsgi.application'
@@ -126,15 +148,177 @@ WSGI_APPLICATION = 'study_planner.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-       'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': os.getenv('DB_NAME'),
-        'USER': os.getenv('DB_USER'),
-        'PASSWORD': os.getenv('DB_PASSWORD'),
-        'HOST': os.getenv('DB_HOST'),
-        'PORT': os.getenv('DB_PORT'),
+#
+# Connection handling depends on how gunicorn serves the app (SERVER_MODE, see
+# gunicorn.conf.py):
+#   wsgi - each sync worker keeps its connection open for DB_CONN_MAX_AGE
+#          seconds, so short requests skip the connect/auth handshake.
+#   asgi - Django can't reuse connections across requests under ASGI, so the
+#          default is a fresh connection per request; run PgBouncer
+#          (DB_POOL_MODE=pgbouncer) to make those connections cheap.
+# CONN_HEALTH_CHECKS pings a reused connection before the first query of a
+# request, so a connection dropped by the server or pooler is replaced
+# instead of failing the request.
+#
+# With DB_POOL_MODE=pgbouncer, "default" goes through the transaction pooler
+# (DB_POOLER_HOST/DB_POOLER_PORT). Server-side cursors are turned off because
+# they don't survive transaction pooling. Session-level features (advisory
+# locks in student/llm_client.py) use the "direct" alias, which connects to
+# Postgres itself.
+
+SERVER_MODE = os.getenv('SERVER_MODE', 'asgi').lower()
+DB_POOL_MODE = os.getenv('DB_POOL_MODE', 'direct').lower()
+
+_database = {
+    'ENGINE': 'django.db.backends.postgresql',
+    'NAME': os.getenv('DB_NAME'),
+    'USER': os.getenv('DB_USER'),
+    'PASSWORD': os.getenv('DB_PASSWORD'),
+    'HOST': os.getenv('DB_HOST'),
+    'PORT': os.getenv('DB_PORT'),
+    'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 600 if SERVER_MODE == 'wsgi' else 0)),
+    'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+}
+
+if DB_POOL_MODE == 'pgbouncer':
+    DATABASES = {
+        'default': {
+            **_database,
+            'HOST': os.getenv('DB_POOLER_HOST', 'pgbouncer'),
+            'PORT': os.getenv('DB_POOLER_PORT', '6432'),
+            'DISABLE_SERVER_SIDE_CURSORS': True,
+        },
+        'direct': {
+            **_database,
+            'TEST': {'MIRROR': 'default'},
+        },
     }
+    SESSION_DATABASE_ALIAS = 'direct'
+else:
+    DATABASES = {'default': _database}
+    SESSION_DATABASE_ALIAS = 'default'
+
+
+# Caches
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# The "llm" cache is a database table shared by every worker; create it with
+# `python manage.py createcachetable`.
+
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', 60 * 60 * 24))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'llm': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'llm_response_cache',
+        'TIMEOUT': LLM_CACHE_TTL,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('LLM_CACHE_SHARED_MAX_ENTRIES', 50000)),
+        },
+    },
+}
+
+# GET response cache with ETags (see student/response_cache.py). CACHE must be
+# shared by every worker (e.g. Redis); the in-process default is only correct
+# when gunicorn runs a single worker, and gunicorn.conf.py refuses to start more.
+RESPONSE_CACHE = {
+    'ENABLED': os.getenv('RESPONSE_CACHE_ENABLED', 'True') == 'True',
+    'CACHE': os.getenv('RESPONSE_CACHE_ALIAS', 'default'),
+    'TTL': int(os.getenv('RESPONSE_CACHE_TTL', 300)),
+}
+
+# Delta sync at /api/sync/ (see student/delta_sync.py). Clients whose watermark
+# is older than the tombstone retention get a full snapshot; run
+# "manage.py prune_tombstones" daily to keep the table small.
+SYNC = {
+    'OVERLAP': int(os.getenv('SYNC_OVERLAP_SECONDS', 5)),
+    'TOMBSTONE_RETENTION_DAYS': int(os.getenv('SYNC_TOMBSTONE_RETENTION_DAYS', 30)),
+}
+
+# Recurring event expansion for GET /api/events/?start=&end= (see
+# student/recurrence.py). Expansions are cached per event until it changes.
+RECURRENCE = {
+    'CACHE': os.getenv('RECURRENCE_CACHE_ALIAS', 'default'),
+    'TTL': int(os.getenv('RECURRENCE_CACHE_TTL', 3600)),
+    'MAX_OCCURRENCES': int(os.getenv('RECURRENCE_MAX_OCCURRENCES', 1000)),
+    'MAX_WINDOW_DAYS': int(os.getenv('RECURRENCE_MAX_WINDOW_DAYS', 366)),
+}
+
+# LLM response cache (see student/llm_cache.py). Set LLM_CACHE_SHARED to an
+# empty string to keep the cache process-local.
+LLM_CACHE = {
+    'ENABLED': os.getenv('LLM_CACHE_ENABLED', 'True') == 'True',
+    'TTL': LLM_CACHE_TTL,
+    'MAX_ENTRIES': int(os.getenv('LLM_CACHE_MAX_ENTRIES', 1000)),
+    'SHARED_CACHE': os.getenv('LLM_CACHE_SHARED', 'llm') or None,
+}
+
+
+# LLM provider client (see student/llm_client.py). GLOBAL_MAX_CONCURRENCY caps
+# in-flight calls across every worker using Postgres advisory locks; 0 disables it.
+LLM_CLIENT = {
+    'BASE_URL': os.getenv('LLM_BASE_URL', 'https://api.groq.com/openai/v1'),
+    'CONNECT_TIMEOUT': float(os.getenv('LLM_CONNECT_TIMEOUT', 5)),
+    'READ_TIMEOUT': float(os.getenv('LLM_READ_TIMEOUT', 60)),
+    'MAX_CONNECTIONS': int(os.getenv('LLM_MAX_CONNECTIONS', 20)),
+    'MAX_KEEPALIVE_CONNECTIONS': int(os.getenv('LLM_MAX_KEEPALIVE_CONNECTIONS', 10)),
+    'MAX_CONCURRENCY': int(os.getenv('LLM_MAX_CONCURRENCY', 8)),
+    'GLOBAL_MAX_CONCURRENCY': int(os.getenv('LLM_GLOBAL_MAX_CONCURRENCY', 0)),
+    'ACQUIRE_TIMEOUT': float(os.getenv('LLM_ACQUIRE_TIMEOUT', 30)),
+    'MAX_RETRIES': int(os.getenv('LLM_MAX_RETRIES', 3)),
+    'CIRCUIT_FAILURE_THRESHOLD': int(os.getenv('LLM_CIRCUIT_FAILURE_THRESHOLD', 5)),
+    'CIRCUIT_RESET_TIMEOUT': float(os.getenv('LLM_CIRCUIT_RESET_TIMEOUT', 30)),
+}
+
+# POST /api/study_plan/batch/ limits.
+STUDY_PLAN_BATCH = {
+    'MAX_SIZE': int(os.getenv('STUDY_PLAN_BATCH_MAX_SIZE', 200)),
+    'MAX_CONCURRENCY': int(os.getenv('STUDY_PLAN_BATCH_MAX_CONCURRENCY', 8)),
+}
+
+# Conversation history sent with study plan follow-ups (see student/chat_context.py).
+STUDY_CHAT_CONTEXT = {
+    'MAX_TURNS': int(os.getenv('STUDY_CHAT_CONTEXT_MAX_TURNS', 6)),
+    'TOKEN_BUDGET': int(os.getenv('STUDY_CHAT_CONTEXT_TOKEN_BUDGET', 1500)),
+    'SUMMARY_CHUNK': int(os.getenv('STUDY_CHAT_SUMMARY_CHUNK', 4)),
+}
+
+# Background study plan generation (see student/jobs.py). With
+# DEFAULT_BACKGROUND on, POST /api/study_plan/ queues a job unless the request
+# sends "background": false.
+STUDY_PLAN_JOBS = {
+    'DEFAULT_BACKGROUND': os.getenv('STUDY_PLAN_BACKGROUND', 'False') == 'True',
+    'MAX_ATTEMPTS': int(os.getenv('STUDY_PLAN_JOB_MAX_ATTEMPTS', 3)),
+    'BACKOFF_BASE': int(os.getenv('STUDY_PLAN_JOB_BACKOFF_BASE', 5)),
+    'BACKOFF_MAX': int(os.getenv('STUDY_PLAN_JOB_BACKOFF_MAX', 300)),
+    'LOCK_TIMEOUT': int(os.getenv('STUDY_PLAN_JOB_LOCK_TIMEOUT', 600)),
+}
+
+# Bulk flashcard import (see student/flashcard_import.py). Batches of at least
+# COPY_THRESHOLD cards are written with Postgres COPY instead of bulk_create.
+FLASHCARD_IMPORT = {
+    'MAX_ROWS': int(os.getenv('FLASHCARD_IMPORT_MAX_ROWS', 20000)),
+    'COPY_THRESHOLD': int(os.getenv('FLASHCARD_IMPORT_COPY_THRESHOLD', 1000)),
+    'BATCH_SIZE': 500,
+}
+
+# Request profiling (see student/profiling.py). Off by default; when enabled,
+# responses carry a Server-Timing header, requests slower than SLOW_REQUEST_MS
+# or running SLOW_QUERY_COUNT queries are logged with their SQL, and per-route
+# totals are served at /api/metrics/profiling/ to staff users.
+PROFILING = {
+    'ENABLED': os.getenv('PROFILING_ENABLED', 'False') == 'True',
+    'SLOW_REQUEST_MS': int(os.getenv('PROFILING_SLOW_REQUEST_MS', 500)),
+    'SLOW_QUERY_COUNT': int(os.getenv('PROFILING_SLOW_QUERY_COUNT', 50)),
+}
+
+# Prometheus metrics at /metrics (see student/metrics.py). Set METRICS_TOKEN to
+# require "Authorization: Bearer <token>" on scrapes.
+METRICS = {
+    'ENABLED': os.getenv('METRICS_ENABLED', 'True') == 'True',
+    'TOKEN': os.getenv('METRICS_TOKEN', ''),
 }
 
 
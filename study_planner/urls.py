@@ -19,10 +19,12 @@ from django.urls import path
 from django.urls.conf import include
 from django.conf import settings
 from django.conf.urls.static import static
+from student.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/',include('student.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)